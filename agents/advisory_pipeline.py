@@ -0,0 +1,104 @@
+# The advisory flow as a dependency graph of stages. Each stage declares the outputs it needs, so
+# independent work (e.g. the macro-economic analysis and the customer conversation) runs concurrently.
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Any, Callable, Dict, Iterable, Optional
+from agents.customer_chatbot import run_conversation_customer_chatbot
+from agents.relationship_manager import derive_product_query, define_input_msg_to_relationship_manager, recommend_products
+from agents.macro_snapshot import get_macro_analysis
+from agents.financial_advisor import advise
+from agents.boss_manager import run_conversation_boss_manager
+from utils.llm_cache import log_llm_cache_stats
+from utils.message_events import message_content
+from utils.pipeline import PipelineExecutor, Stage
+from utils.streaming import emit_event
+
+
+def _boss_review(advice: str) -> str:
+    result = run_conversation_boss_manager(advice)
+    return result.summary
+
+
+def _interview_customer() -> str:
+    return message_content(run_conversation_customer_chatbot())
+
+
+def _profile_required() -> str:
+    raise ValueError("Non-interactive runs need the customer profile up front")
+
+
+def build_advisory_pipeline(interactive: bool = True, review_fn: Optional[Callable[[str], str]] = None) -> PipelineExecutor:
+    """Customer profile -> product query -> retrieval -> RM recommendation, and the macro analysis
+    alongside them; the advisor needs both and the boss reviews the advice.
+
+    Non-interactive pipelines never prompt on the console: the customer profile has to be
+    provided, the relationship manager and the advisor answer in a single round, and the advice
+    is reviewed by `review_fn`. Without one there is no `boss_review` stage, so unreviewed advice
+    is never passed off as reviewed.
+    """
+    if review_fn is None and interactive:
+        review_fn = _boss_review
+    stages = [
+        Stage("customer_profile", _interview_customer if interactive else _profile_required),
+        Stage(
+            "product_query",
+            lambda customer_profile: derive_product_query(customer_profile, interactive=interactive),
+            ["customer_profile"],
+        ),
+        Stage(
+            "retrieval",
+            lambda customer_profile, product_query: define_input_msg_to_relationship_manager(customer_profile, product_query),
+            ["customer_profile", "product_query"],
+        ),
+        Stage("rm_recommendation", lambda retrieval: recommend_products(*retrieval), ["retrieval"]),
+        Stage("macro_analysis", get_macro_analysis),
+        Stage(
+            "advice",
+            lambda rm_recommendation, macro_analysis: advise(rm_recommendation, macro_analysis, interactive=interactive),
+            ["rm_recommendation", "macro_analysis"],
+        ),
+    ]
+    if review_fn is not None:
+        stages.append(Stage("boss_review", lambda advice: review_fn(advice), ["advice"]))
+    return PipelineExecutor(stages)
+
+
+def _stage_event(name: str, status: str) -> None:
+    # Stage progress goes to the same event sink as the streamed agent replies
+    emit_event({"type": "stage", "stage": name, "status": status})
+
+
+def run_advisory_pipeline(
+    customer_profile: Optional[str] = None,
+    review_fn: Optional[Callable[[str], str]] = None,
+    targets: Optional[Iterable[str]] = None,
+    provided: Optional[Dict[str, Any]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """Run the stages needed for `targets` (default: the whole flow) and return all stage outputs.
+
+    Without a `customer_profile` the customer is interviewed on the console. Given one (e.g.
+    collected by the webapp), the rest of the flow runs without any console input; see
+    `build_advisory_pipeline`; without a `review_fn` that run ends with the unreviewed `advice`
+    and has no `boss_review` output. The profile may be the text or the chat's reflection summary
+    (a message dict with `content`). The run stops with `PipelineCancelled` before the next
+    stage once `cancelled()` is true, e.g. when the customer has left.
+    """
+    interactive = customer_profile is None
+    provided = dict(provided or {})
+    if customer_profile is not None:
+        provided["customer_profile"] = customer_profile
+    if "customer_profile" in provided:
+        provided["customer_profile"] = message_content(provided["customer_profile"])
+    pipeline = build_advisory_pipeline(interactive=interactive, review_fn=review_fn)
+    outputs = pipeline.run(targets=targets, provided=provided, on_stage=_stage_event, cancelled=cancelled)
+    log_llm_cache_stats()
+    return outputs
+
+
+if __name__ == "__main__":
+    outputs = run_advisory_pipeline()
+    print(outputs["boss_review"])
@@ -1,5 +1,9 @@
 # define boss manager human-in-the-loop as human proxy agent
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from autogen import ConversableAgent
+from agents.registry import agent_registry
 
 def create_boss_human_loop():
     human_proxy = ConversableAgent(
@@ -9,4 +13,21 @@ def create_boss_human_loop():
         is_termination_msg = lambda msg: msg["content"].lower() in ['quit', 'exit', 'bye']
     )
 
-    return human_proxy
\ No newline at end of file
+    return human_proxy
+
+
+agent_registry.register("boss_manager", create_boss_human_loop)
+
+
+def run_conversation_boss_manager(result_summary):
+
+    boss_manager = agent_registry.get("boss_manager")
+
+    relationship_manager = agent_registry.get("relationship_manager")
+
+    result = relationship_manager.initiate_chat(
+        boss_manager,
+        message=result_summary
+    )
+
+    return result
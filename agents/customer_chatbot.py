@@ -7,6 +7,9 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # openai_key = os.environ.get("OPENAI_API_KEY")
 from utils.keys import openai_key, get_anthropic_key
+from utils.streaming import enable_streaming
+from utils.llm_cache import use_llm_cache
+from agents.registry import agent_registry
 
 
 # define human proxy agent
@@ -55,13 +58,22 @@ def create_customer_chatbot():
     },
     is_termination_msg = lambda msg: "relationship manager" in msg["content"].lower()
     )
+    # replies are streamed token by token when a session listens for them (webapp)
+    enable_streaming(customer_chatbot)
+    # the interview is sampled at a high temperature on purpose: never replay cached turns
+    use_llm_cache(customer_chatbot, cache_creative=False)
 
     return customer_chatbot
 
 
+# Built once per process; every conversation gets a reset clone
+agent_registry.register("customer_chatbot", create_customer_chatbot)
+agent_registry.register("human_proxy", create_human_proxy)
+
+
 def run_conversation_customer_chatbot(message="Hello, I'm here to help you with your financial goals and recommend you products that may suit you best."):
-    customer_chatbot = create_customer_chatbot()
-    human_proxy = create_human_proxy()
+    customer_chatbot = agent_registry.get("customer_chatbot")
+    human_proxy = agent_registry.get("human_proxy")
     result = customer_chatbot.initiate_chat(
         human_proxy,
         summary_prompt="Summarize the details of the customer's profile including information about their income, savings, and goals. Do not add any introductory phrases.",
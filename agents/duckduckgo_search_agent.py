@@ -2,11 +2,19 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, wait
 from duckduckgo_search import DDGS
 from autogen import ConversableAgent
 from utils.keys import openai_key
+from utils.http_archive import RECORD, REPLAY, get_http_archive
+from utils.http_client import create_session
+from utils.html_extract import extract_response
+from utils.llm_cache import use_llm_cache
+from agents.registry import agent_registry
+from utils.indicator_extraction import extract_from_results, indicators_for_query
+from utils.retrieval_cache import normalize_query
+from utils.ttl_cache import get_web_cache, parse_domain_ttls, ttl_for_url
+from config import settings
 
 class DuckDuckGoSearchAgent(ConversableAgent):
     def __init__(self, name, system_message="", llm_config=None, **kwargs):
@@ -17,6 +25,15 @@ class DuckDuckGoSearchAgent(ConversableAgent):
             **kwargs
         )
         
+        # Pooled session; goes through the HTTP archive when record/replay is configured
+        self.session = create_session(pool_size=settings.SEARCH_FETCH_WORKERS)
+        self.archive = get_http_archive()
+        # Search results and page text are cached on disk with per-domain TTLs
+        self.web_cache = get_web_cache()
+        self.page_ttls = parse_domain_ttls(settings.PAGE_CACHE_DOMAIN_TTLS)
+        # Result pages are fetched concurrently
+        self._fetch_pool = ThreadPoolExecutor(settings.SEARCH_FETCH_WORKERS, thread_name_prefix="search-fetch")
+
         # Register the search function
         self.register_function(
             function_map={
@@ -26,13 +43,29 @@ class DuckDuckGoSearchAgent(ConversableAgent):
     
     def search_duckduckgo(self, query: str, max_results: int = 3) -> list:
         """
-        Search DuckDuckGo and return results
+        Search DuckDuckGo and return results (served from the web cache while fresh)
         """
+        if self.web_cache is None:
+            return self._search_duckduckgo(query, max_results)
+        return self.web_cache.get_or_fetch(
+            "search",
+            f"{max_results}:{normalize_query(query)}",
+            lambda: self._search_duckduckgo(query, max_results),
+            settings.SEARCH_CACHE_TTL
+        )
+
+    def _search_duckduckgo(self, query: str, max_results: int) -> list:
+        if self.archive is not None and settings.HTTP_ARCHIVE_MODE == REPLAY:
+            results = self.archive.get_search(query, max_results)
+            print(f"Replayed DuckDuckGo search for: {query} ({len(results or [])} results)")
+            return results or []
         try:
             print(f"Starting DuckDuckGo search for: {query}")
             with DDGS() as ddgs:
                 results = list(ddgs.text(query, max_results=max_results))
                 print(f"Search completed. Found {len(results)} results")
+            if self.archive is not None and settings.HTTP_ARCHIVE_MODE == RECORD:
+                self.archive.put_search(query, max_results, results)
             return results if results else []
         except Exception as e:
             print(f"Error during DuckDuckGo search: {str(e)}")
@@ -40,43 +73,95 @@ class DuckDuckGoSearchAgent(ConversableAgent):
 
     def fetch_webpage_content(self, url: str) -> str:
         """
-        Fetch and parse webpage content
+        Fetch and parse webpage content (served from the web cache while fresh)
         """
+        if self.web_cache is None:
+            return self._fetch_webpage_content(url)
+        ttl = ttl_for_url(url, self.page_ttls, settings.PAGE_CACHE_TTL)
+        return self.web_cache.get_or_fetch("page", url, lambda: self._fetch_webpage_content(url), ttl)
+
+    def _fetch_webpage_content(self, url: str) -> str:
         try:
             print(f"Fetching content from: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            # Stream the body and stop reading once enough text has been extracted
+            response = self.session.get(url, timeout=settings.SEARCH_FETCH_TIMEOUT, stream=True)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            text = extract_response(
+                response,
+                max_bytes=settings.SEARCH_PAGE_MAX_BYTES,
+                max_chars=settings.SEARCH_PAGE_MAX_CHARS
+            ).text()
             
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text()
-            
-            # Clean up text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            content_length = len(text[:4000])
-            print(f"Successfully fetched and cleaned content. Length: {content_length}")
-            return text[:4000]  # Limit content length
+            text = text[:settings.SEARCH_PAGE_MAX_CHARS]  # Limit content length
+            print(f"Successfully fetched and cleaned content. Length: {len(text)}")
+            return text
         except Exception as e:
             print(f"Error fetching webpage {url}: {str(e)}")
-            # If it's a Bank of England URL that failed, try to extract info from the search result
-            if "bankofengland.co.uk" in url and hasattr(self, '_current_result'):
-                print("Extracting information from search result instead")
-                return f"Title: {self._current_result.get('title', '')}\nSummary: {self._current_result.get('body', '')}"
             return ""
 
+    @staticmethod
+    def result_snippet(result: dict) -> str:
+        return f"Title: {result.get('title', '')}\nSummary: {result.get('body', '')}"
+
+    def fetch_result_pages(self, search_results: list) -> dict:
+        """
+        Fetch the result pages concurrently within SEARCH_FETCH_DEADLINE seconds and return the
+        content of those that arrived, by url
+        """
+        futures = {}
+        for i, result in enumerate(search_results):
+            link = result.get('href') or result.get('url')
+            if link:
+                print(f"Fetching result {i+1}/{len(search_results)}: {link}")
+                futures[link] = self._fetch_pool.submit(self.fetch_webpage_content, link)
+            else:
+                print(f"No link found in result: {result}")
+
+        done, not_done = wait(list(futures.values()), timeout=settings.SEARCH_FETCH_DEADLINE)
+        for future in not_done:
+            # Stragglers that have not started are dropped; running ones finish in the background
+            future.cancel()
+        if not_done:
+            print(f"{len(not_done)} pages missed the {settings.SEARCH_FETCH_DEADLINE}s deadline, using their snippets")
+        return {link: future.result() for link, future in futures.items() if future in done and future.result()}
+
+    def gather_result_content(self, search_results: list, pages: dict = None) -> list:
+        """
+        Content per search result; results whose page failed or did not arrive in time fall back
+        to the search snippet (title and body)
+        """
+        if pages is None:
+            pages = self.fetch_result_pages(search_results)
+        all_content = []
+        for result in search_results:
+            link = result.get('href') or result.get('url')
+            content = pages.get(link) if link else ""
+            if content:
+                # For Bank of England results, also include the search result summary
+                if "bankofengland.co.uk" in link:
+                    content = f"{self.result_snippet(result)}\n\nDetailed Content:\n{content}"
+                all_content.append(f"Source: {link}\n{content}")
+            elif result.get('title') and result.get('body'):
+                all_content.append(f"Source: {link or 'Search Result'}\n{self.result_snippet(result)}")
+        return all_content
+
+    def gather_content(self, query: str, search_results: list = None) -> str:
+        """
+        Combined page content for a query, searching only if no search results are given
+        """
+        return self.gather_content_and_indicators(query, search_results)[0]
+
+    def gather_content_and_indicators(self, query: str, search_results: list = None) -> tuple:
+        """
+        Combined page content for a query and the indicator figures the extraction rules found in
+        its pages and snippets
+        """
+        if search_results is None:
+            search_results = self.search_duckduckgo(query)
+        pages = self.fetch_result_pages(search_results)
+        content = "\n\n".join(self.gather_result_content(search_results, pages))
+        return content, extract_from_results(query, search_results, pages)
+
     def search_and_summarize(self, query: str) -> str:
         """
         Search DuckDuckGo, fetch webpage content, and return a summary
@@ -88,34 +173,19 @@ class DuckDuckGoSearchAgent(ConversableAgent):
         if not search_results:
             return f"No results found for query: {query}"
         
-        # Collect content from top results
-        all_content = []
-        for i, result in enumerate(search_results):
-            print(f"\nProcessing result {i+1}/{len(search_results)}")
-            # Store current result for potential fallback
-            self._current_result = result
-            link = result.get('href') or result.get('url')
-            if link:
-                print(f"Found link: {link}")
-                content = self.fetch_webpage_content(link)
-                if content:
-                    # For Bank of England results, also include the search result summary
-                    if "bankofengland.co.uk" in link:
-                        content = f"Title: {result.get('title', '')}\nSummary: {result.get('body', '')}\n\nDetailed Content:\n{content}"
-                    all_content.append(f"Source: {link}\n{content}")
-            else:
-                print(f"No link found in result: {result}")
-                # If no link but we have title and body, use that
-                if result.get('title') and result.get('body'):
-                    content = f"Title: {result['title']}\nSummary: {result['body']}"
-                    all_content.append(f"Source: Search Result\n{content}")
+        # Collect and combine content from top results
+        combined_content, indicators = self.gather_content_and_indicators(query, search_results)
+
+        # Known indicators are read straight from the pages; the LLM only handles the rest
+        wanted = indicators_for_query(query)
+        if wanted and all(name in indicators for name in wanted):
+            print(f"Extracted {', '.join(wanted)} without the LLM")
+            return "\n".join(indicators[name].format() for name in wanted)
         
-        if not all_content:
+        if not combined_content:
             print("No content could be fetched from any of the search results")
             return "Could not fetch content from search results."
         
-        # Combine all content
-        combined_content = "\n\n".join(all_content)
         print(f"Combined content length: {len(combined_content)}")
         
         # Use LLM to summarize content
@@ -173,5 +243,11 @@ def create_duckduckgo_search_agent(system_message="", llm_config=None):
         llm_config=llm_config,
         human_input_mode="NEVER"
     )
+    # identical search results are summarised once
+    use_llm_cache(agent)
     
-    return agent 
\ No newline at end of file
+    return agent
+
+
+# Built once per process (with its HTTP session and fetch pool); callers get reset clones
+agent_registry.register("duckduckgo_search_agent", create_duckduckgo_search_agent)
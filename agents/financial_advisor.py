@@ -4,11 +4,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from autogen import ConversableAgent
 from utils.keys import openai_key, get_anthropic_key
-from agents.relationship_manager import run_conversation_relationship_manager, create_relationship_manager
+from utils.streaming import enable_streaming
+from utils.llm_cache import use_llm_cache
+from agents.registry import agent_registry
 # from agents.customer_chatbot import run_conversation_customer_chatbot
 
-# import macro economic analyst
-from agents.macro_economic_analyst import run_conversation_macro_economic_analyst
 from autogen import UserProxyAgent
 
 
@@ -53,31 +53,51 @@ def create_financial_advisor():
         # terminate the conversation 
         # is_termination_msg=lambda x: x["content"].rfind("{") != -1
     )
+    # replies are streamed token by token when a session listens for them (webapp)
+    enable_streaming(financial_advisor)
+    # personalised advice sampled at a non-zero temperature: never replay another customer's reply
+    use_llm_cache(financial_advisor, cache_creative=False)
 
     return financial_advisor
 
-def run_conversation_financial_advisor():
 
-    last_msg_summary = run_conversation_relationship_manager()
+# Built once per process; every conversation gets a reset clone
+agent_registry.register("financial_advisor", create_financial_advisor)
+
 
-    macroeconomic_analysis = run_conversation_macro_economic_analyst()
+def advise(rm_recommendation: str, macroeconomic_analysis: str, interactive: bool = True) -> str:
+    """Review the relationship manager's recommendation against the macro-economic analysis.
 
-    relationship_manager = create_relationship_manager()
+    Non-interactive runs take the advisor's first answer instead of continuing the conversation
+    (which ends with a console prompt).
+    """
 
-    financial_advisor = create_financial_advisor()
+    relationship_manager = agent_registry.get("relationship_manager")
+
+    financial_advisor = agent_registry.get("financial_advisor")
 
 
 
     result = relationship_manager.initiate_chat(
         financial_advisor,
-        message=last_msg_summary + "\n\n Following is the result from macroeconomic analyst: \n\n" + macroeconomic_analysis,
-        summary_method="last_msg"
+        message=rm_recommendation + "\n\n Following is the result from macroeconomic analyst: \n\n" + macroeconomic_analysis,
+        summary_method="last_msg",
+        max_turns=None if interactive else 1,
     )
 
 
     return result.summary
 
 
+def run_conversation_financial_advisor():
+
+    # The relationship manager's conversation and the macro analysis share no inputs and run
+    # concurrently as stages of the advisory pipeline (imported here, it imports this module)
+    from agents.advisory_pipeline import run_advisory_pipeline
+
+    return run_advisory_pipeline(targets=["advice"])["advice"]
+
+
 if __name__ == "__main__":
     
     result = run_conversation_financial_advisor()
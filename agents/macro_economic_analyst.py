@@ -2,51 +2,62 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from concurrent.futures import ThreadPoolExecutor
 from autogen import UserProxyAgent
-from agents.duckduckgo_search_agent import create_duckduckgo_search_agent
+from agents.registry import agent_registry
 from utils.keys import openai_key
-
-def financial_analyst_search_agent():
-    # Create the search agent
-    search_agent = create_duckduckgo_search_agent()
-    
-
-    # Define search queries
-    queries = [
-        "Bank of England current interest rate",
-        "UK inflation rate ONS latest",
-        "UK unemployment rate ONS",
-        "UK GDP growth rate latest",
-        "Bank of England monetary policy update"
-    ]
-    
-    # Collect search results
+from utils.indicator_extraction import indicators_for_query
+from config import settings
+
+# Search queries for the economic indicators
+ECONOMIC_QUERIES = [
+    "Bank of England current interest rate",
+    "UK inflation rate ONS latest",
+    "UK unemployment rate ONS",
+    "UK GDP growth rate latest",
+    "Bank of England monetary policy update"
+]
+
+def gather_economic_data(search_agent, queries=ECONOMIC_QUERIES) -> dict:
+    """Search every indicator query concurrently (once each), fetch its result pages and extract
+    the indicator figures; returns query -> {"content", "indicators"}"""
     print("Searching for economic indicators...")
-    results = []
-    for query in queries:
-        print(f"\nSearching for: {query}")
-        # First get raw search results
-        raw_results = search_agent.search_duckduckgo(query)
-        print(f"Found {len(raw_results)} raw results")
-        if raw_results:
-            print("First result:", raw_results[0] if raw_results else "No results")
-        
-        # Then get summarized results
-        search_result = search_agent.search_and_summarize(query)
-        print(f"Search result length: {len(search_result) if search_result else 0}")
-        results.append(f"Results for {query}:\n{search_result}")
-    
-    if not results:
-        print("No results were collected. Exiting...")
-        return
-    
-    # Combine all results
-    combined_results = "\n\n".join(results)
-    print(f"\nTotal combined results length: {len(combined_results)}")
-    
-    # Create analysis prompt
-    analysis_prompt = f"""Based on the following economic data, provide a comprehensive analysis 
-    of the UK economic situation and its implications for banking products and investment decisions:
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="macro-search") as pool:
+        gathered = list(pool.map(search_agent.gather_content_and_indicators, queries))
+    economic_data = {}
+    for query, (content, indicators) in zip(queries, gathered):
+        print(f"{query}: {len(content)} characters of content, indicators: {', '.join(indicators) or 'none'}")
+        economic_data[query] = {"content": content, "indicators": indicators}
+    return economic_data
+
+
+def build_analysis_prompt(economic_data: dict) -> str:
+    """One prompt that extracts the indicator figures and writes the analysis in the same LLM call.
+
+    Indicators the extraction rules found are passed as compact records; the raw page content is
+    only included for queries they could not fully answer.
+    """
+    figures = []
+    sections = []
+    for query, data in economic_data.items():
+        figures.extend(record.format() for record in data["indicators"].values())
+        if indicators_for_query(query) and set(indicators_for_query(query)) <= set(data["indicators"]):
+            continue
+        # Bound each query's share of the context window
+        content = data["content"][:settings.MACRO_CONTENT_CHARS_PER_QUERY] or "No content could be fetched."
+        sections.append(f"Results for {query}:\n{content}")
+    combined_results = "\n\n".join(sections)
+    print(f"\n{len(figures)} extracted indicators, raw results length: {len(combined_results)}")
+
+    key_figures = "\n".join(f"- {figure}" for figure in figures) or "- None extracted"
+    return f"""Below are the latest UK economic indicators and raw search results for the remaining topics.
+    First extract the key facts and figures from the search results: latest figures and statistics,
+    recent dates and updates, official statements or policies, and current trends or changes. Then,
+    based on all of the economic data, provide a comprehensive analysis of the UK economic situation
+    and its implications for banking products and investment decisions.
+
+    Key indicators (extracted from official sources where available):
+{key_figures}
 
     {combined_results}
 
@@ -57,17 +68,36 @@ def financial_analyst_search_agent():
     4. Investment Recommendations
     """
 
+
+def financial_analyst_search_agent():
+    # Create the search agent
+    search_agent = agent_registry.get("duckduckgo_search_agent")
+
+    # All indicators are searched concurrently and summarized together with the analysis,
+    # so the whole stage is one round of searches and page fetches plus a single LLM call
+    economic_data = gather_economic_data(search_agent)
+    if not any(data["content"] for data in economic_data.values()):
+        print("No results were collected. Exiting...")
+        return
+
+    analysis_prompt = build_analysis_prompt(economic_data)
+
     return search_agent, analysis_prompt
 
 
-def run_conversation_macro_economic_analyst():
+def run_conversation_macro_economic_analyst(interactive: bool = True):
+    """Search the indicators and have the analyst write the macro-economic analysis.
+
+    Non-interactive runs (snapshot builds, the webapp's pipeline) never prompt on the console:
+    the proxy takes the analyst's first answer.
+    """
 
     search_agent, analysis_prompt = financial_analyst_search_agent()
 
         # Create a user proxy agent for testing
     user_proxy = UserProxyAgent(
         name="user_proxy",
-        human_input_mode="TERMINATE",  # Changed to NEVER since we want automatic summarization
+        human_input_mode="TERMINATE" if interactive else "NEVER",
         max_consecutive_auto_reply=0,
         code_execution_config=False,
         # llm_config={
@@ -78,7 +108,8 @@ def run_conversation_macro_economic_analyst():
     # Get final analysis through chat
     chat_result = user_proxy.initiate_chat(
         search_agent,
-        message=analysis_prompt
+        message=analysis_prompt,
+        max_turns=None if interactive else 1
     )
 
     return chat_result.summary
@@ -0,0 +1,196 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import glob
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+from config import settings
+
+
+def build_macro_analysis() -> str:
+    """Run the full macro-economic analysis (searches, page fetches and the analysis LLM call).
+
+    Snapshots are built in the background or inside the advisory pipeline, so nothing may prompt
+    on the console.
+    """
+    # Imported here so snapshots can be read without loading the agent stack
+    from agents.macro_economic_analyst import run_conversation_macro_economic_analyst
+    return run_conversation_macro_economic_analyst(interactive=False)
+
+
+class MacroSnapshotStore:
+    """Versioned macro analysis snapshots stored as JSON files in one directory.
+
+    Every snapshot gets the next version number and its creation time; only the newest
+    `keep` snapshots are kept on disk.
+    """
+
+    def __init__(self, directory: str, keep: int = 10):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, version: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{version:06d}.json")
+
+    def _versions(self):
+        names = glob.glob(os.path.join(self.directory, "snapshot-*.json"))
+        return sorted(int(os.path.basename(name)[9:-5]) for name in names)
+
+    def latest(self) -> Optional[Dict]:
+        for version in reversed(self._versions()):
+            try:
+                with open(self._path(version)) as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable macro snapshot {version}: {e}")
+        return None
+
+    def save(self, analysis: str) -> Dict:
+        versions = self._versions()
+        snapshot = {
+            "version": (versions[-1] if versions else 0) + 1,
+            "created_at": time.time(),
+            "analysis": analysis,
+        }
+        # Write to a temporary file first so readers never see a partial snapshot
+        path = self._path(snapshot["version"])
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+        for version in (versions + [snapshot["version"]])[:-self.keep]:
+            os.remove(self._path(version))
+        return snapshot
+
+
+class MacroSnapshotService:
+    """Serves the latest macro analysis snapshot and keeps it up to date.
+
+    `start` runs a daemon thread that rebuilds the snapshot every `interval` seconds.
+    `get_macro_analysis` returns the latest snapshot if it is younger than `max_age`, and otherwise
+    rebuilds it synchronously; concurrent callers share one rebuild. The lock is only held to
+    claim a rebuild and to save its result, never during the searches and LLM call.
+    """
+
+    def __init__(
+        self,
+        store: MacroSnapshotStore,
+        build: Callable[[], str] = build_macro_analysis,
+        interval: float = 6 * 3600,
+        max_age: float = 12 * 3600,
+    ):
+        self.store = store
+        self.build = build
+        self.interval = interval
+        self.max_age = max_age
+        self._refresh_lock = threading.Lock()
+        # The rebuild in progress, shared by the callers that need it
+        self._building: Optional[Future] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def age(snapshot: Optional[Dict]) -> float:
+        return time.time() - snapshot["created_at"] if snapshot else float("inf")
+
+    def refresh(self, max_age: Optional[float] = None) -> Dict:
+        """Build and save a new snapshot, unless one younger than `max_age` appeared meanwhile.
+
+        A caller arriving while another rebuild runs waits for that one instead of starting its own.
+        """
+        with self._refresh_lock:
+            snapshot = self.store.latest()
+            if max_age is not None and self.age(snapshot) <= max_age:
+                return snapshot
+            building = self._building
+            if building is None:
+                building = self._building = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return building.result()
+
+        started = time.monotonic()
+        try:
+            analysis = self.build()
+            with self._refresh_lock:
+                snapshot = self.store.save(analysis)
+                self._building = None
+        except BaseException as e:
+            with self._refresh_lock:
+                self._building = None
+            building.set_exception(e)
+            raise
+        building.set_result(snapshot)
+        logging.info(f"Built macro snapshot v{snapshot['version']} in {time.monotonic() - started:.1f}s")
+        return snapshot
+
+    def get_macro_analysis(self, max_age: Optional[float] = None) -> str:
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self.store.latest()
+        if self.age(snapshot) > max_age:
+            print("No fresh macro-economic snapshot, running the analysis now...")
+            snapshot = self.refresh(max_age=max_age)
+        return snapshot["analysis"]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Rebuild when the snapshot is due, then sleep until the next one is
+            wait = self.interval - self.age(self.store.latest())
+            if wait <= 0:
+                try:
+                    self.refresh(max_age=self.interval)
+                except Exception as e:
+                    logging.error(f"Macro snapshot refresh failed: {e}")
+                    wait = min(self.interval, 600)
+                else:
+                    wait = self.interval
+            self._stop.wait(wait)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="macro-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_service: Optional[MacroSnapshotService] = None
+_service_lock = threading.Lock()
+
+
+def get_macro_snapshot_service() -> MacroSnapshotService:
+    """Process-wide snapshot service configured from settings"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MacroSnapshotService(
+                MacroSnapshotStore(settings.MACRO_SNAPSHOT_DIR, keep=settings.MACRO_SNAPSHOT_KEEP),
+                interval=settings.MACRO_SNAPSHOT_INTERVAL,
+                max_age=settings.MACRO_SNAPSHOT_MAX_AGE,
+            )
+        return _service
+
+
+def get_macro_analysis(max_age: Optional[float] = None) -> str:
+    """Latest macro analysis no older than `max_age` seconds (default MACRO_SNAPSHOT_MAX_AGE)"""
+    return get_macro_snapshot_service().get_macro_analysis(max_age)
+
+
+if __name__ == "__main__":
+    # Build one snapshot (e.g. from cron), or keep refreshing with --serve
+    logging.basicConfig(level=logging.INFO)
+    service = get_macro_snapshot_service()
+    if "--serve" in sys.argv:
+        service._run()
+    else:
+        snapshot = service.refresh()
+        print(f"Saved macro snapshot v{snapshot['version']}")
@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import importlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+# Where each agent's factory is registered: the module is imported the first time the agent is
+# needed, so callers never depend on having imported it themselves
+AGENT_MODULES = {
+    "customer_chatbot": "agents.customer_chatbot",
+    "human_proxy": "agents.customer_chatbot",
+    "relationship_manager": "agents.relationship_manager",
+    "rm_junior_analyst": "agents.relationship_manager",
+    "financial_advisor": "agents.financial_advisor",
+    "boss_manager": "agents.boss_manager",
+    "duckduckgo_search_agent": "agents.duckduckgo_search_agent",
+}
+
+
+def _rebind(func: Any, template: Any, clone: Any) -> Any:
+    # Methods bound to the template (e.g. tools in a function map) must act on the clone
+    if getattr(func, "__self__", None) is template:
+        return func.__func__.__get__(clone)
+    return func
+
+
+def clone_agent(template: Any) -> Any:
+    """A fresh copy of an autogen agent that shares the template's configuration and LLM client.
+
+    The clone starts with no chat history, reply counters, pending human input or retrieval
+    results; its reply functions, hooks and function map are its own lists, so registering on
+    the clone (e.g. a session's message tap) does not affect the template or other clones.
+    """
+    agent = copy.copy(template)
+    agent._oai_messages = defaultdict(list)
+    agent._oai_system_message = [dict(message) for message in template._oai_system_message]
+    agent._consecutive_auto_reply_counter = defaultdict(int)
+    agent._max_consecutive_auto_reply_dict = defaultdict(agent.max_consecutive_auto_reply)
+    agent.reply_at_receive = defaultdict(bool)
+    agent._human_input = []
+    agent.client_cache = None
+    agent._reply_func_list = [
+        dict(entry, reply_func=_rebind(entry["reply_func"], template, agent), config=copy.copy(entry["init_config"]))
+        for entry in template._reply_func_list
+    ]
+    agent.hook_lists = {
+        name: [_rebind(hook, template, agent) for hook in hooks] for name, hooks in template.hook_lists.items()
+    }
+    agent._function_map = {
+        name: _rebind(func, template, agent) for name, func in (template._function_map or {}).items()
+    }
+    agent._is_termination_msg = _rebind(template._is_termination_msg, template, agent)
+    if hasattr(template, "_retrieve_config"):
+        # RetrieveUserProxyAgent: per-query state
+        agent._retrieve_config = dict(template._retrieve_config)
+        agent._reset()
+        agent._current_docs_in_context = []
+        agent._search_string = ""
+    return agent
+
+
+class AgentRegistry:
+    """Builds each agent type once from its factory and hands out cheap, reset clones.
+
+    The template keeps the expensive parts (LLM client and its connection pool, response cache,
+    streaming setup, retrieval configuration), which all clones share. Clones are independent
+    conversations, so each chat or session can take its own.
+
+    Agents are registered by their own modules; `modules` maps each agent name to that module,
+    which is imported when the agent is first needed and has not been registered yet.
+    """
+
+    def __init__(self, modules: Optional[Dict[str, str]] = None):
+        self.modules = dict(modules or {})
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._templates: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._templates.pop(name, None)
+
+    def template(self, name: str) -> Any:
+        if name not in self._factories and name in self.modules:
+            # Outside the lock: the module registers its agents while it is imported
+            importlib.import_module(self.modules[name])
+        with self._lock:
+            if name not in self._templates:
+                if name not in self._factories:
+                    raise KeyError(f"No agent registered as {name!r}")
+                started = time.monotonic()
+                self._templates[name] = self._factories[name]()
+                logging.info(f"Built agent template {name!r} in {time.monotonic() - started:.2f}s")
+            return self._templates[name]
+
+    def get(self, name: str, **attributes: Any) -> Any:
+        """A reset clone of the agent; `attributes` are set on the clone (e.g. human_input_mode)"""
+        agent = clone_agent(self.template(name))
+        for attribute, value in attributes.items():
+            setattr(agent, attribute, value)
+        return agent
+
+    def clear(self) -> None:
+        """Drop the templates; the next `get` builds them again (e.g. after a settings change)"""
+        with self._lock:
+            self._templates.clear()
+
+
+agent_registry = AgentRegistry(AGENT_MODULES)
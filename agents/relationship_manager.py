@@ -8,8 +8,14 @@ from autogen import ConversableAgent
 import os
 from utils.keys import openai_key
 from utils import rm_data_preprocessing 
+from utils.streaming import enable_streaming
+from utils.llm_cache import use_llm_cache
+from agents.registry import agent_registry
 from agents.rm_junior_analyst import MyRetrieveUserProxyAgent
 from agents.customer_chatbot import run_conversation_customer_chatbot
+from typing import Dict, List, Union
+from utils.multi_query import split_product_needs
+from config import settings
 
 
 def create_relationship_manager():
@@ -38,6 +44,10 @@ health and broader macro-economic conditions of the UK.
             # "temperature": 0.9,
             # },
         )
+    # replies are streamed token by token when a session listens for them (webapp)
+    enable_streaming(relationship_manager)
+    # personalised advice sampled at a non-zero temperature: never replay another customer's reply
+    use_llm_cache(relationship_manager, cache_creative=False)
     
     return relationship_manager 
 
@@ -61,7 +71,7 @@ def create_rm_junior_analyst(analyst_to_rm_prompt: str, update_embeddings: bool
         retrieve_config={
             "task": "banking_products",
             "customized_prompt":analyst_to_rm_prompt,
-            "chunk_token_size": 2000,
+            "chunk_token_size": settings.CHUNK_TOKEN_SIZE,
             "model": "gpt-4o",
             # "vector_db": "chroma",
             # "client": None,
@@ -75,6 +85,11 @@ def create_rm_junior_analyst(analyst_to_rm_prompt: str, update_embeddings: bool
 
     return rag_agent
 
+
+# Built once per process; every conversation gets a reset clone
+agent_registry.register("relationship_manager", create_relationship_manager)
+agent_registry.register("rm_junior_analyst", lambda: create_rm_junior_analyst(analyst_to_rm_prompt=""))
+
 # Non-RAG agent for comparison
 # nonrag_agent = ConversableAgent(
 #             name="Barclays_NonRAG_Agent",
@@ -85,7 +100,28 @@ def create_rm_junior_analyst(analyst_to_rm_prompt: str, update_embeddings: bool
 #         )
 
 
-def define_input_msg_to_relationship_manager(reflection_summary1: str, query_to_analyst: str):
+def format_product_context(documents: List[str], metadatas: List[Dict]) -> str:
+    """Format retrieved product chunks with their source page and section heading"""
+    # Initialize an empty list to store formatted product information
+    product_info = []
+
+    # Loop through each document and its metadata
+    for doc, metadata in zip(documents, metadatas):
+        metadata = metadata or {}
+        source = metadata.get("url", "unknown source")
+        if metadata.get("heading"):
+            source += f" (section: {metadata['heading']})"
+        # Format the product information with metadata source
+        product_entry = f"""Information from {source}:
+    {doc}
+    """
+        product_info.append(product_entry)
+
+    # Join all product information with line breaks
+    return "\n\n".join(product_info)
+
+
+def define_input_msg_to_relationship_manager(reflection_summary1: str, query_to_analyst: Union[str, List[str]]):
 
     analyst_to_rm_prompt = """Hi, I am the Relationship Manager's analyst. I will be providing you with the customer's profile, financial information and information of some products that might be relevant to the customer.
 
@@ -94,14 +130,17 @@ def define_input_msg_to_relationship_manager(reflection_summary1: str, query_to_
     Information of some products that might be relevant to the customer along with their sources:\n {input_context}
     """
 
-    rm_junior_analyst = create_rm_junior_analyst(analyst_to_rm_prompt)
+    rm_junior_analyst = agent_registry.get("rm_junior_analyst", customized_prompt=analyst_to_rm_prompt)
 
-    # Retrieve products information
-    input_context = rm_junior_analyst.retrieve_docs(
-                    problem=query_to_analyst, 
-                    n_results=10, 
-                    search_string=""
-                   )
+    # Retrieve products information. The relationship manager's summary and each product need it
+    # lists are embedded and searched in a single batch and their results merged.
+    queries = split_product_needs(query_to_analyst) if isinstance(query_to_analyst, str) else list(query_to_analyst)
+    input_context = rm_junior_analyst.retrieve_docs_batch(
+        problems=queries,
+        n_results=10,
+        search_string="",
+        max_merged=10
+    )
     
     # print(input_context.keys())
     # print(input_context["ids"][0][0])
@@ -109,19 +148,7 @@ def define_input_msg_to_relationship_manager(reflection_summary1: str, query_to_
     # print(input_context["metadatas"][0][0])
 
     # loop through the metadata and corresponding document in input_context to generate the analyst_to_rm_prompt
-    # Initialize an empty list to store formatted product information
-    product_info = []
-
-    # Loop through each document and its metadata
-    for doc, metadata in zip(input_context["documents"][0], input_context["metadatas"][0]):
-        # Format the product information with metadata source
-        product_entry = f"""Information from {metadata}:
-    {doc}
-    """
-        product_info.append(product_entry)
-
-    # Join all product information with line breaks
-    formatted_products = "\n\n".join(product_info)
+    formatted_products = format_product_context(input_context["documents"][0], input_context["metadatas"][0])
 
     # Create the analyst to RM prompt template
     analyst_to_rm_prompt = analyst_to_rm_prompt.format(reflection_summary1=reflection_summary1, input_context=formatted_products)
@@ -130,24 +157,26 @@ def define_input_msg_to_relationship_manager(reflection_summary1: str, query_to_
     return analyst_to_rm_prompt, rm_junior_analyst
 
 
-def run_conversation_relationship_manager():
+def derive_product_query(reflection_summary1: str, interactive: bool = True) -> str:
+    """Let the relationship manager turn the customer profile into product needs for the RAG agent.
 
-    # get the customer profile from the customer chatbot
-    reflection_summary1 = run_conversation_customer_chatbot()
-
-    # reset the assistant. Always reset the assistant before starting a new conversation.
-    relationship_manager = create_relationship_manager()
+    Interactively a human can keep talking to the relationship manager on the console; otherwise
+    its first reply is used.
+    """
+    # a reset clone: always start a new conversation with a fresh assistant
+    relationship_manager = agent_registry.get("relationship_manager")
 
     # convert the reflection_summary1 to a proper query that can be used by the RAG agent
     # create proxy chat with a user which gives as input the reflection_summary1
     human_proxy = ConversableAgent(
         "Relationship_Manager_Mind",
         llm_config=False,  # no LLM used for human proxy
-        human_input_mode="ALWAYS",
+        human_input_mode="ALWAYS" if interactive else "NEVER",
         is_termination_msg = lambda msg: msg["content"].lower() in ['quit', 'exit', 'bye']
     )
     chat_result = human_proxy.initiate_chat(
         relationship_manager,
+        max_turns=None if interactive else 1,
         message="""From the below provided summary of the customer profile, output only the below:
         1. Customer's goals and objectives (whether short term or long term)
         2. Assess the high level product requirements of the customer (like mortgage, savings account, credit card, insurance, investment account, loan, pension, wealth management etc.).
@@ -157,10 +186,12 @@ def run_conversation_relationship_manager():
 
     query_to_analyst = chat_result.summary
     print("Query to analyst: ", query_to_analyst)
+    return query_to_analyst
 
 
-    # get the analyst_to_rm_prompt and rm_junior_analyst
-    analyst_to_rm_prompt, rm_junior_analyst = define_input_msg_to_relationship_manager(reflection_summary1, query_to_analyst)
+def recommend_products(analyst_to_rm_prompt: str, rm_junior_analyst) -> str:
+    """Hand the retrieved products to a fresh relationship manager and return its recommendation"""
+    relationship_manager = agent_registry.get("relationship_manager")
 
     chat_result =rm_junior_analyst.initiate_chat(
         relationship_manager,
@@ -175,6 +206,19 @@ def run_conversation_relationship_manager():
     return chat_result.summary
 
 
+def run_conversation_relationship_manager():
+
+    # get the customer profile from the customer chatbot
+    reflection_summary1 = run_conversation_customer_chatbot()
+
+    query_to_analyst = derive_product_query(reflection_summary1)
+
+    # get the analyst_to_rm_prompt and rm_junior_analyst
+    analyst_to_rm_prompt, rm_junior_analyst = define_input_msg_to_relationship_manager(reflection_summary1, query_to_analyst)
+
+    return recommend_products(analyst_to_rm_prompt, rm_junior_analyst)
+
+
 
 if __name__ == "__main__":
     result = run_conversation_relationship_manager()
@@ -1,7 +1,8 @@
 from autogen.agentchat.contrib.retrieve_user_proxy_agent import RetrieveUserProxyAgent, UserProxyAgent
-from typing import Dict, List, Union
-import chromadb
-from chromadb.utils import embedding_functions
+from typing import Dict, List, Optional, Union
+from config import settings
+from utils.retrieval_engine import get_retrieval_engine
+from utils.multi_query import merge_query_results
 
 
 class MyRetrieveUserProxyAgent(RetrieveUserProxyAgent):
@@ -10,25 +11,25 @@ class MyRetrieveUserProxyAgent(RetrieveUserProxyAgent):
         query_texts: List[str],
         n_results: int = 10,
         search_string: str = "",
-        db_path: str = "F:/xx/xx/fingenie/data/chromadb",
-        collection_name: str = "barclays_uk_products",
+        db_path: Optional[str] = None,
+        collection_name: Optional[str] = None,
         **kwargs,
     ) -> Dict[str, Union[List[str], List[List[str]]]]:
-        
-        # define your own query function here
-        client = chromadb.PersistentClient(path=db_path)
-        # the collection's embedding function is always the default one, but we want to use the one we used to create the
-        # collection. So we compute the embeddings ourselves and pass it to the query function.
-        collection = client.get_collection(collection_name)
-    
-        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-mpnet-base-v2")
-
-        query_embeddings = embedding_function(query_texts)
-        # Query/search n most similar results. You can also .get by id
-        results = collection.query(
-            query_embeddings=query_embeddings,
+
+        # The engine keeps the client, collection and embedding model loaded for the whole process,
+        # so a query only pays for the embedding and the search itself.
+        engine = get_retrieval_engine(
+            db_path=db_path or self._retrieve_config.get("db_path"),
+            collection_name=collection_name or self._retrieve_config.get("collection_name"),
+        )
+        # Query/search n most similar results, fused with BM25 lexical matches in hybrid mode.
+        # In hybrid mode search_string is the lexical query rather than a substring filter.
+        hybrid = self._retrieve_config.get("hybrid", settings.HYBRID_RETRIEVAL)
+        query = engine.hybrid_query if hybrid else engine.query
+        results = query(
+            query_texts=query_texts,
             n_results=n_results,
-            where_document={"$contains": search_string} if search_string else None,  # optional filter
+            search_string=search_string,
         )
         return results
 
@@ -43,3 +44,29 @@ class MyRetrieveUserProxyAgent(RetrieveUserProxyAgent):
         self._results = results
         print("doc_ids: ", results["ids"])
         return self._results
+
+    def retrieve_docs_batch(
+        self,
+        problems: List[str],
+        n_results: int = 20,
+        search_string: str = "",
+        max_merged: Optional[int] = None,
+        **kwargs,
+    ) -> Dict[str, List]:
+        """Retrieve docs for many queries at once (e.g. several product needs from one profile).
+
+        All queries are embedded in one encoder call and searched with one collection query.
+        Returns the merged, de-duplicated union ordered by distance in the single-query format
+        of `retrieve_docs` (also stored in `_results`).
+        """
+        results = self.query_vector_db(
+            query_texts=problems,
+            n_results=n_results,
+            search_string=search_string,
+            **kwargs,
+        )
+        merged = merge_query_results(results, max_results=max_merged)
+
+        self._results = {key: [merged[key]] for key in ("ids", "documents", "metadatas", "distances")}
+        print("doc_ids: ", merged["ids"])
+        return self._results
@@ -0,0 +1,69 @@
+# Local stand-in for the OpenAI and Anthropic streaming endpoints, for tests and benchmarks.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class FakeLLMServer:
+    """Streams `tokens` as server-sent events, `delay` seconds apart, from
+    /v1/chat/completions (OpenAI format) and /v1/messages (Anthropic format).
+    Request bodies are kept in `requests`."""
+
+    def __init__(self, tokens: List[str], delay: float = 0.0, first_token_delay: float = 0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.first_token_delay = first_token_delay
+        self.requests: List[Dict] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Chunked HTTP/1.1 like the real APIs, so every event reaches the client as it is sent
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+                if self.path.endswith("/chat/completions"):
+                    events = [{"choices": [{"index": 0, "delta": {"content": token}}]} for token in server.tokens]
+                    events = [(None, event) for event in events] + [(None, "[DONE]")]
+                elif self.path.endswith("/v1/messages"):
+                    events = [("message_start", {"type": "message_start"})]
+                    events += [
+                        ("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                 "delta": {"type": "text_delta", "text": token}})
+                        for token in server.tokens
+                    ]
+                    events += [("message_stop", {"type": "message_stop"})]
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(server.first_token_delay)
+                for name, data in events:
+                    payload = data if isinstance(data, str) else json.dumps(data)
+                    event = (f"event: {name}\n" if name else "") + f"data: {payload}\n\n"
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(event.encode()), event.encode()))
+                    self.wfile.flush()
+                    time.sleep(server.delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
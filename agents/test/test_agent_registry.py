@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+from collections import defaultdict
+from agents import registry as registry_module
+from agents.registry import AgentRegistry
+
+
+def generate_reply(agent, messages=None, sender=None, config=None):
+    return True, "reply"
+
+
+class FakeAgent:
+    """The per-conversation state of an autogen ConversableAgent"""
+
+    def __init__(self, name):
+        self.name = name
+        self.client = object()  # stands in for the LLM client and its connection pool
+        self.client_cache = None
+        self._oai_messages = defaultdict(list)
+        self._oai_system_message = [{"role": "system", "content": "You are helpful."}]
+        self._consecutive_auto_reply_counter = defaultdict(int)
+        self._max_consecutive_auto_reply_dict = defaultdict(self.max_consecutive_auto_reply)
+        self.reply_at_receive = defaultdict(bool)
+        self._human_input = []
+        self._reply_func_list = [
+            {"reply_func": generate_reply, "config": None, "init_config": None, "reset_config": None}
+        ]
+        self.hook_lists = {"process_message_before_send": []}
+        self._function_map = {"search": self.search}
+        self._is_termination_msg = lambda message: False
+
+    def max_consecutive_auto_reply(self, sender=None):
+        return 3
+
+    def search(self, query):
+        return self
+
+
+def test_templates_are_built_once_and_clones_are_independent():
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return FakeAgent("Relationship_Manager")
+
+    registry = AgentRegistry()
+    registry.register("relationship_manager", factory)
+    first = registry.get("relationship_manager")
+    first._oai_messages["customer"].append({"content": "Hi"})
+    first._consecutive_auto_reply_counter["customer"] += 1
+    first.hook_lists["process_message_before_send"].append(lambda **kwargs: None)
+    second = registry.get("relationship_manager", human_input_mode="NEVER")
+
+    assert len(builds) == 1
+    template = registry.template("relationship_manager")
+    assert first is not second and first is not template
+    # Shared: the client; per clone: history, counters, hooks
+    assert first.client is second.client is template.client
+    assert not second._oai_messages and not template._oai_messages
+    assert second._consecutive_auto_reply_counter["customer"] == 0
+    assert not second.hook_lists["process_message_before_send"]
+    assert not template.hook_lists["process_message_before_send"]
+    assert second.human_input_mode == "NEVER" and not hasattr(template, "human_input_mode")
+
+
+def test_methods_bound_to_the_template_act_on_the_clone():
+    registry = AgentRegistry()
+    registry.register("search", lambda: FakeAgent("Search"))
+    clone = registry.get("search")
+    assert clone._function_map["search"]("rates") is clone
+    assert registry.template("search")._function_map["search"]("rates") is registry.template("search")
+
+
+def test_unknown_agents_raise():
+    registry = AgentRegistry()
+    try:
+        registry.get("missing")
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("expected a KeyError")
+
+
+def test_agents_are_registered_by_importing_their_module_on_first_use():
+    registry = AgentRegistry(modules={"advisor": "registry_test_agents"})
+    registry_module.test_registry = registry
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "registry_test_agents.py"), "w") as f:
+            f.write(
+                "from agents import registry\n"
+                "from agents.test.test_agent_registry import FakeAgent\n"
+                "registry.test_registry.register('advisor', lambda: FakeAgent('Advisor'))\n"
+            )
+        sys.path.insert(0, directory)
+        try:
+            # Nobody imported the module that registers the advisor
+            assert registry.get("advisor").name == "Advisor"
+        finally:
+            sys.path.remove(directory)
+            sys.modules.pop("registry_test_agents", None)
+            del registry_module.test_registry
+
+
+def test_registry_knows_the_module_of_every_registered_agent():
+    agents_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    registered = {}
+    for filename in os.listdir(agents_dir):
+        if filename.endswith(".py"):
+            with open(os.path.join(agents_dir, filename)) as f:
+                for line in f:
+                    if line.startswith("agent_registry.register("):
+                        registered[line.split('"')[1]] = "agents." + filename[:-3]
+    assert registered == registry_module.AGENT_MODULES
+
+
+if __name__ == "__main__":
+    test_templates_are_built_once_and_clones_are_independent()
+    test_methods_bound_to_the_template_act_on_the_clone()
+    test_unknown_agents_raise()
+    test_agents_are_registered_by_importing_their_module_on_first_use()
+    test_registry_knows_the_module_of_every_registered_agent()
+    print("All agent registry tests passed")
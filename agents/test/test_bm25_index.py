@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+from utils.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def build_index():
+    index = BM25Index()
+    index.upsert(
+        ids=["rainy-day", "isa", "mortgage"],
+        documents=[
+            "Rainy Day Saver pays 5.12% AER on balances up to £5,000",
+            "Cash ISA with a variable rate of 4.1% AER and instant access",
+            "Fixed rate mortgage for first time buyers",
+        ],
+        metadatas=[{"url": "https://www.barclays.co.uk/savings/rainy-day-saver/"}, {"url": "isa"}, {"url": "mortgage"}],
+    )
+    return index
+
+
+def test_tokenize_keeps_rate_terms():
+    assert tokenize("Rate of 5.12% AER") == ["rate", "of", "5.12%", "aer"]
+
+
+def test_product_name_and_rate_lookup():
+    index = build_index()
+    assert index.search("Rainy Day Saver")[0][0] == "rainy-day"
+    assert index.search("4.1%")[0][0] == "isa"
+    assert index.search("pension") == []
+
+
+def test_upsert_and_remove_keep_index_in_sync():
+    index = build_index()
+    index.upsert(ids=["isa"], documents=["Junior ISA for children"])
+    assert index.search("instant access") == []
+    assert index.search("junior")[0][0] == "isa"
+    index.remove(index.ids_for_url("https://www.barclays.co.uk/savings/rainy-day-saver/"))
+    assert "rainy-day" not in index
+    assert len(index) == 2
+
+
+def test_ids_for_url_follows_upserts_and_removals():
+    index = BM25Index()
+    index.upsert(ids=["a", "b"], documents=["first chunk", "second chunk"], metadatas=[{"url": "/x"}, {"url": "/x"}])
+    assert sorted(index.ids_for_url("/x")) == ["a", "b"]
+    # A chunk re-upserted under another page moves with it
+    index.upsert(ids=["b"], documents=["second chunk"], metadatas=[{"url": "/y"}])
+    assert index.ids_for_url("/x") == ["a"] and index.ids_for_url("/y") == ["b"]
+    index.remove(["a"])
+    assert index.ids_for_url("/x") == [] and "/x" not in index._url_ids
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.json")
+        index.save(path)
+        assert BM25Index.load(path).ids_for_url("/y") == ["b"]
+
+
+def test_save_and_load_round_trip():
+    index = build_index()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "index.json")
+        index.save(path)
+        reloaded = BM25Index.load(path)
+    assert reloaded.search("mortgage buyers") == index.search("mortgage buyers")
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+
+
+if __name__ == "__main__":
+    test_tokenize_keeps_rate_terms()
+    test_product_name_and_rate_lookup()
+    test_upsert_and_remove_keep_index_in_sync()
+    test_ids_for_url_follows_upserts_and_removals()
+    test_save_and_load_round_trip()
+    test_reciprocal_rank_fusion_rewards_agreement()
+    print("All BM25 index tests passed")
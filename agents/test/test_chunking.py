@@ -0,0 +1,46 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.chunking import WhitespaceTokenizer, chunk_sections
+
+URL = "https://www.barclays.co.uk/savings/"
+
+
+def words(prefix, n):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_short_sections_are_packed_under_first_heading():
+    sections = [("Savings", "Savings"), ("Savings", words("a", 5)), ("ISAs", words("b", 5))]
+    chunks = chunk_sections(URL, sections, max_tokens=20, overlap_tokens=5, tokenizer=WhitespaceTokenizer())
+    assert len(chunks) == 1
+    assert chunks[0]["metadata"]["heading"] == "Savings"
+    assert chunks[0]["document"].startswith("Savings a0")
+
+
+def test_long_section_is_windowed_with_overlap():
+    sections = [("Rainy Day Saver", words("w", 25))]
+    chunks = chunk_sections(URL, sections, max_tokens=10, overlap_tokens=2, tokenizer=WhitespaceTokenizer())
+    documents = [chunk["document"].split() for chunk in chunks]
+    assert all(len(document) <= 10 for document in documents)
+    assert documents[0][-2:] == documents[1][:2]
+    assert documents[-1][-1] == "w24"
+    assert [chunk["metadata"]["token_offset"] for chunk in chunks] == [0, 8, 16]
+    assert {chunk["metadata"]["chunk_count"] for chunk in chunks} == {len(chunks)}
+
+
+def test_chunk_ids_are_deterministic():
+    sections = [("A", words("x", 30)), ("B", words("y", 3))]
+    first = chunk_sections(URL, sections, max_tokens=12, overlap_tokens=3, tokenizer=WhitespaceTokenizer())
+    second = chunk_sections(URL, sections, max_tokens=12, overlap_tokens=3, tokenizer=WhitespaceTokenizer())
+    assert [chunk["id"] for chunk in first] == [chunk["id"] for chunk in second]
+    assert len({chunk["id"] for chunk in first}) == len(first)
+    assert all(chunk["metadata"]["url"] == URL for chunk in first)
+
+
+if __name__ == "__main__":
+    test_short_sections_are_packed_under_first_heading()
+    test_long_section_is_windowed_with_overlap()
+    test_chunk_ids_are_deterministic()
+    print("All chunking tests passed")
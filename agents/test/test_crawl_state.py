@@ -0,0 +1,138 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+import requests
+from utils.crawl_state import CrawlStateStore, FAILED, SKIPPED, VisitedSet
+from utils.ingest_writer import IngestWriter
+
+BASE_URL = "https://www.example.com"
+
+
+def test_interrupted_run_resumes_with_its_frontier():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.sqlite3")
+        store = CrawlStateStore(path, base_url=BASE_URL)
+        run_id, resumed = store.start_run()
+        assert not resumed
+        store.enqueue([(BASE_URL, 0)])
+        store.enqueue([(BASE_URL + "/a", 1), (BASE_URL + "/b", 1), ("https://other.example.com/c", 1)])
+        store.record_page(BASE_URL, run_id, content_hash="h", links=[BASE_URL + "/a"])
+        store.finish(BASE_URL + "/a", SKIPPED)
+        store.close()
+
+        # The process dies here; a new store picks up the same run
+        store = CrawlStateStore(path, base_url=BASE_URL)
+        resumed_id, resumed = store.start_run(resume=True)
+        assert resumed and resumed_id == run_id
+        assert sorted(store.pending()) == [("https://other.example.com/c", 1), (BASE_URL + "/b", 1)]
+        visited = VisitedSet(store.visited_keys())
+        assert len(visited) == 4 and BASE_URL + "/a" in visited and BASE_URL + "/d" not in visited
+
+        store.finish(BASE_URL + "/b", FAILED, ValueError("boom"), stage="fetch")
+        store.finish("https://other.example.com/c", SKIPPED)
+        store.finish_run()
+        report = store.summary()
+        assert report["status"] == "completed" and report["pending"] == 0
+        assert (report["fetched"], report["indexed"], report["skipped"], report["failed"]) == (3, 1, 2, 1)
+        assert report["errors"] == {BASE_URL + "/b": "fetch: boom"}
+
+        # A completed run is not resumed
+        _, resumed = store.start_run(resume=True)
+        assert not resumed
+        store.close()
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+def _first_run(store):
+    run_id, _ = store.start_run(resume=False)
+    store.record_page(BASE_URL, run_id, content_hash="h", links=[BASE_URL + "/savings", BASE_URL + "/mortgages"])
+    store.record_page(BASE_URL + "/savings", run_id, content_hash="s", links=[])
+    store.record_page(BASE_URL + "/mortgages", run_id, content_hash="m", links=[])
+    store.finish_run()
+
+
+def test_pages_behind_a_failed_fetch_are_not_tombstoned():
+    with tempfile.TemporaryDirectory() as directory:
+        store = CrawlStateStore(os.path.join(directory, "state.sqlite3"), base_url=BASE_URL)
+        _first_run(store)
+
+        # The homepage fails transiently, so the product pages are not reached
+        run_id, _ = store.start_run(resume=False)
+        store.finish(BASE_URL, FAILED, requests.ConnectionError("reset"), stage="fetch")
+        assert store.urls_to_remove(run_id) == []
+        assert not store.can_remove(run_id, min_share=0.8)
+        store.close()
+
+
+def test_only_pages_gone_or_unlinked_are_removed():
+    with tempfile.TemporaryDirectory() as directory:
+        store = CrawlStateStore(os.path.join(directory, "state.sqlite3"), base_url=BASE_URL)
+        _first_run(store)
+        store.record_page(BASE_URL + "/loans", store.run_id, content_hash="l", links=[])
+
+        run_id, _ = store.start_run(resume=False)
+        # The homepage no longer links to the mortgages page; the savings page returns 410
+        store.record_page(BASE_URL, run_id, content_hash="h2", links=[BASE_URL + "/savings"])
+        store.finish(BASE_URL + "/savings", FAILED, _http_error(410), stage="fetch")
+        # /loans was not reached either, but nothing says it was removed
+        assert sorted(store.urls_to_remove(run_id)) == [BASE_URL + "/mortgages", BASE_URL + "/savings"]
+        assert store.summary(run_id)["gone"] == 1 and store.summary(run_id)["failed"] == 0
+        # Far fewer pages than the previous run (3): too little to trust
+        assert not store.can_remove(run_id, min_share=0.8)
+        assert store.can_remove(run_id, min_share=0.3)
+        store.close()
+
+
+class FakeCollection:
+    def __init__(self):
+        self.ids = set()
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.ids.update(ids)
+
+
+def test_page_whose_chunks_were_not_written_is_indexed_again_after_resuming():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.sqlite3")
+        store = CrawlStateStore(path, base_url=BASE_URL)
+        url = BASE_URL + "/savings"
+        run_id, _ = store.start_run(resume=False)
+        store.record_page(url, run_id, content_hash="s", links=[], etag='"v1"')
+        store.finish_run()
+
+        # A full run replaces the page's chunks; the new ones are still buffered when it is interrupted
+        run_id, _ = store.start_run(resume=False)
+        store.enqueue([(url, 1)])
+        writer = IngestWriter(FakeCollection(), lambda documents: [[0.0] for _ in documents], batch_size=64)
+        store.invalidate(url)
+        writer.add(
+            ids=[url + "#0"],
+            documents=["Rainy Day Saver"],
+            metadatas=[{"url": url}],
+            on_written=lambda: store.record_page(url, run_id, content_hash="s", links=[], etag='"v1"'),
+        )
+        store.close()
+
+        # The resumed (incremental) run fetches the page unconditionally and sees no matching hash
+        store = CrawlStateStore(path, base_url=BASE_URL)
+        resumed_id, resumed = store.start_run(resume=True)
+        assert resumed and resumed_id == run_id
+        assert store.pending() == [(url, 1)]
+        assert store.conditional_headers(url) == {}
+        assert store.get(url)["content_hash"] != "s"
+        store.close()
+
+
+if __name__ == "__main__":
+    test_interrupted_run_resumes_with_its_frontier()
+    test_pages_behind_a_failed_fetch_are_not_tombstoned()
+    test_only_pages_gone_or_unlinked_are_removed()
+    test_page_whose_chunks_were_not_written_is_indexed_again_after_resuming()
+    print("All crawl state tests passed")
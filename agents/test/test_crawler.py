@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import functools
+import http.server
+import re
+import tempfile
+import threading
+from utils.crawler import CrawlEngine
+
+LINK_PATTERN = re.compile(r'href="(/[^"]+)"')
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_site(directory):
+    """Serve a chain of pages where page i links to pages i+1 and i+2"""
+    for i in range(6):
+        with open(os.path.join(directory, f"p{i}.html"), "w") as f:
+            f.write(f'<html><body><h1>Page {i}</h1><a href="/p{i + 1}.html">next</a><a href="/p{i + 2}.html">skip</a></body></html>')
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_breadth_first_crawl_respects_depth_limit():
+    with tempfile.TemporaryDirectory() as directory:
+        server, base_url = serve_site(directory)
+        stored = []
+
+        def parse(url, response):
+            return {"url": url}, [base_url + path for path in LINK_PATTERN.findall(response.text)]
+
+        crawler = CrawlEngine(
+            parse=parse,
+            enrich=lambda page: page,
+            sink=lambda page: stored.append(page["url"]),
+            max_depth=2,
+            min_host_interval=0.0,
+        )
+        stats = crawler.crawl([base_url + "/p0.html"])
+        server.shutdown()
+
+    assert sorted(stored) == [base_url + f"/p{i}.html" for i in range(5)]
+    assert stats["fetched"] == 5 and stats["stored"] == 5 and stats["failed"] == 0
+
+
+if __name__ == "__main__":
+    test_breadth_first_crawl_respects_depth_limit()
+    print("All crawler tests passed")
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.html_extract import extract_html
+
+PAGE = """<html><head><title>Savings</title><style>p { color: red }</style></head><body>
+<header><a href="/login">Log in</a></header>
+<nav class="navigation"><ul><li>Home</li><li>Accounts</li></ul></nav>
+<div class="menu"><div><p>Menu text</p></div></div>
+<h1>Savings accounts</h1>
+<p>Earn interest on your savings. Privacy policy</p>
+<p>Unclosed paragraph
+<p>Next paragraph &amp; more</p>
+<h2>Rates</h2>
+<ul><li>Instant access<li>Fixed rate <b>bond</b></ul>
+<img src="/images/rates.png"><a href="/savings/isa">ISA</a>
+<script>var x = "<p>not text</p>";</script>
+<footer><p>Barclays Bank UK PLC</p></footer>
+</body></html>"""
+
+
+def test_sections_skip_boilerplate_in_one_pass():
+    page = extract_html(PAGE, strip_phrases=["Privacy policy"])
+    assert page.sections == [
+        ("Savings accounts", "Savings accounts"),
+        ("Savings accounts", "Earn interest on your savings."),
+        ("Savings accounts", "Unclosed paragraph"),
+        ("Savings accounts", "Next paragraph & more"),
+        ("Rates", "Rates"),
+        ("Rates", "Instant access"),
+        ("Rates", "Fixed rate bond"),
+    ]
+    assert page.links == ["/savings/isa"]
+    assert page.images == ["/images/rates.png"]
+    assert "Menu text" not in page.text() and "not text" not in page.text()
+
+
+def test_budgets_stop_extraction_early():
+    page = extract_html(PAGE, max_chars=30)
+    assert page.done and page.text().startswith("Savings Savings accounts")
+    assert "Rates" not in page.text()
+
+    capped = extract_html(PAGE.encode("utf-8"), max_bytes=PAGE.index("<h2>"), chunk_size=64)
+    assert capped.sections[-1][1] == "Next paragraph & more"
+
+
+if __name__ == "__main__":
+    test_sections_skip_boilerplate_in_one_pass()
+    test_budgets_stop_extraction_early()
+    print("All HTML extraction tests passed")
@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import functools
+import http.server
+import tempfile
+import threading
+import time
+import pytest
+import requests
+from utils.http_archive import HttpArchive, RecordingAdapter, ReplayAdapter
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def session_with(adapter):
+    session = requests.Session()
+    session.mount("http://", adapter)
+    return session
+
+
+def test_recorded_responses_replay_offline():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "page.html"), "w") as f:
+            f.write("<html><body>Savings rates</body></html>")
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/page.html"
+
+        archive = HttpArchive(os.path.join(directory, "archive.sqlite3"))
+        live = session_with(RecordingAdapter(archive)).get(url)
+        archive.put_search("uk inflation", 3, [{"title": "CPI", "href": url}])
+        server.shutdown()
+        server.server_close()
+
+        replay = session_with(ReplayAdapter(archive, latency=0.05))
+        started = time.perf_counter()
+        response = replay.get(url)
+        assert time.perf_counter() - started >= 0.05
+        assert response.status_code == 200 and response.text == live.text
+        assert archive.get_search("uk inflation", 3)[0]["href"] == url
+
+        # Conditional requests see the archived validators
+        not_modified = replay.get(url, headers={"If-Modified-Since": live.headers["Last-Modified"]})
+        assert not_modified.status_code == 304
+
+        with pytest.raises(requests.ConnectionError):
+            replay.get(url.replace("page", "missing"))
+        archive.close()
+
+
+if __name__ == "__main__":
+    test_recorded_responses_replay_offline()
+    print("All HTTP archive tests passed")
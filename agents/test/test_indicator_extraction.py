@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.indicator_extraction import (
+    IndicatorRecord,
+    as_of_key,
+    best_indicators,
+    extract_from_results,
+    extract_indicators,
+    indicators_for_query,
+    parse_as_of,
+)
+
+
+def test_figures_are_extracted_with_dates():
+    text = (
+        "The Bank of England's Monetary Policy Committee voted on 1 August 2024 to reduce Bank Rate to 5% "
+        "to return inflation to the 2% target. "
+        "The Consumer Prices Index (CPI) rose by 2.2% in the 12 months to July 2024, up from 2.0% in June. "
+        "The UK unemployment rate was estimated at 4.2% in April to June 2024. "
+        "GDP fell by 0.1% in Q4 2023."
+    )
+    records = {record.name: record for record in reversed(extract_indicators(text, "example.com"))}
+    assert (records["bank_rate"].value, records["bank_rate"].as_of) == (5.0, "2024-08-01")
+    assert (records["cpi_inflation"].value, records["cpi_inflation"].as_of) == (2.2, "2024-07")
+    assert records["unemployment_rate"].value == 4.2
+    assert (records["gdp_growth"].value, records["gdp_growth"].as_of) == (-0.1, "2023-Q4")
+
+
+def test_official_pages_win_over_snippets():
+    results = [
+        {"href": "https://news.example.com/rates", "title": "Rates", "body": "Bank Rate is 5.25% according to analysts"},
+        {"href": "https://www.bankofengland.co.uk/monetary-policy", "title": "Monetary policy", "body": ""},
+    ]
+    pages = {"https://www.bankofengland.co.uk/monetary-policy": "Current Bank Rate 4.75%. Next due: 19 December 2024"}
+    best = extract_from_results("Bank of England current interest rate", results, pages)
+    assert list(best) == ["bank_rate"]
+    assert best["bank_rate"].value == 4.75 and best["bank_rate"].source == "bankofengland.co.uk"
+    assert best["bank_rate"].format() == "Bank Rate: 4.75% (source: bankofengland.co.uk)"
+
+
+def test_queries_map_to_indicators():
+    assert indicators_for_query("UK inflation rate ONS latest") == ["cpi_inflation"]
+    assert indicators_for_query("Bank of England monetary policy update") == []
+    assert parse_as_of("in the three months to March 2024") == "2024-03"
+
+
+def test_quarters_and_months_are_compared_by_date():
+    assert as_of_key("2024-Q1") == "2024-03" and as_of_key("2024-Q4") == "2024-12"
+    assert as_of_key("2024-12") == "2024-12" and as_of_key("2024-08-01") == "2024-08-01"
+    records = [
+        IndicatorRecord("gdp_growth", "GDP growth", 0.6, "%", "2024-Q1", "ons.gov.uk"),
+        IndicatorRecord("gdp_growth", "GDP growth", 0.1, "%", "2024-12", "ons.gov.uk"),
+        IndicatorRecord("gdp_growth", "GDP growth", 0.4, "%", "2024-Q3", "ons.gov.uk"),
+    ]
+    # The December monthly figure is newer than either quarter
+    assert best_indicators(records)["gdp_growth"].value == 0.1
+    assert best_indicators(records[:1] + records[2:])["gdp_growth"].as_of == "2024-Q3"
+
+
+if __name__ == "__main__":
+    test_figures_are_extracted_with_dates()
+    test_official_pages_win_over_snippets()
+    test_queries_map_to_indicators()
+    test_quarters_and_months_are_compared_by_date()
+    print("All indicator extraction tests passed")
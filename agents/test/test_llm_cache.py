@@ -0,0 +1,123 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import json
+import tempfile
+from types import SimpleNamespace
+from agents.test.fake_llm_server import FakeLLMServer
+from agents.test.test_streaming import FakeAgent
+from utils.llm_cache import CachedClient, LLMResponseCache
+from utils.streaming import stream_events, streaming_reply
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    """Stands in for autogen's OpenAIWrapper: consults `cache` the way it does"""
+
+    def __init__(self, temperature=0):
+        self._config_list = [{"model": "gpt-4o", "temperature": temperature}]
+        self.calls = []
+
+    def create(self, cache=None, **config):
+        self.calls.append(dict(config, cache=cache))
+        key = json.dumps({"messages": config["messages"], "temperature": config.get("temperature")})
+        if cache is not None:
+            with cache as c:
+                response = c.get(key)
+            if response is not None:
+                return response
+        response = SimpleNamespace(text=f"reply {len(self.calls)}", usage=SimpleNamespace(total_tokens=120), cost=0.01)
+        if cache is not None:
+            with cache as c:
+                c.set(key, response)
+        return response
+
+
+def test_hits_count_saved_tokens_and_expire_by_age():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMResponseCache(os.path.join(directory, "llm.sqlite3"), max_age=100, clock=clock)
+        client = CachedClient(FakeClient(), cache)
+        messages = [{"role": "user", "content": "Which ISA suits me?"}]
+
+        assert client.create(messages=messages).text == "reply 1"
+        assert client.create(messages=messages).text == "reply 1"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["saved_tokens"]) == (1, 1, 120)
+        assert stats["hit_rate"] == 0.5
+
+        clock.now += 101
+        assert client.create(messages=messages).text == "reply 3"
+        assert cache.stats()["expired"] == 1
+        cache.close()
+
+
+def test_least_recently_used_entries_are_evicted():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMResponseCache(os.path.join(directory, "llm.sqlite3"), max_entries=2, clock=clock)
+        for key in ("a", "b"):
+            clock.now += 1
+            cache.set(key, key.upper())
+        clock.now += 1
+        assert cache.get("a") == "A"
+        clock.now += 1
+        cache.set("c", "C")
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == ("A", "C")
+        assert cache.stats()["evicted"] == 1 and cache.stats()["entries"] == 2
+        cache.close()
+
+
+def test_creative_turns_can_opt_out():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMResponseCache(os.path.join(directory, "llm.sqlite3"))
+        messages = [{"role": "user", "content": "Hello"}]
+        fake = FakeClient(temperature=0.9)
+        client = CachedClient(fake, cache, cache_creative=False)
+
+        assert client.create(messages=messages).text == "reply 1"
+        assert client.create(messages=messages).text == "reply 2"
+        # neither our cache nor autogen's default disk cache is used
+        assert fake.calls[-1]["cache"] is None and fake.calls[-1]["cache_seed"] is None
+
+        # deterministic requests from the same agent are still cached
+        assert client.create(messages=messages, temperature=0).text == "reply 3"
+        assert client.create(messages=messages, temperature=0).text == "reply 3"
+        # everything else is delegated to the wrapped client
+        assert client._config_list == fake._config_list
+        cache.close()
+
+
+def test_streamed_replies_are_replayed_from_the_cache():
+    with tempfile.TemporaryDirectory() as directory, FakeLLMServer(["Cash", " ISA"]) as server:
+        cache = LLMResponseCache(os.path.join(directory, "llm.sqlite3"))
+        agent = FakeAgent("Relationship_Manager", {
+            "config_list": [{"model": "gpt-4o", "api_key": "k", "base_url": server.url + "/v1"}],
+            "temperature": 0.7,
+        })
+        agent.client = CachedClient(FakeClient(), cache)
+        events = []
+        with stream_events(events.append):
+            first = streaming_reply(agent, [{"role": "user", "content": "Hi"}])
+            second = streaming_reply(agent, [{"role": "user", "content": "Hi"}])
+        assert first == second == (True, "Cash ISA")
+        assert len(server.requests) == 1
+        assert [event["type"] for event in events[-3:]] == ["stream_start", "stream_delta", "stream_end"]
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_hits_count_saved_tokens_and_expire_by_age()
+    test_least_recently_used_entries_are_evicted()
+    test_creative_turns_can_opt_out()
+    test_streamed_replies_are_replayed_from_the_cache()
+    print("All LLM cache tests passed")
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import pytest
+
+autogen = pytest.importorskip("autogen")
+pytest.importorskip("duckduckgo_search")
+
+from agents import macro_economic_analyst
+
+
+def test_non_interactive_analysis_never_asks_for_console_input(monkeypatch):
+    analyst = autogen.ConversableAgent("analyst", llm_config=False, human_input_mode="NEVER")
+    # Answers without an LLM
+    analyst.register_reply([autogen.Agent, None], lambda recipient, messages, sender, config: (True, "UK analysis"))
+    monkeypatch.setattr(macro_economic_analyst, "financial_analyst_search_agent", lambda: (analyst, "Analyse"))
+
+    def no_input(self, prompt):
+        raise AssertionError(f"asked for console input: {prompt}")
+
+    monkeypatch.setattr(autogen.ConversableAgent, "get_human_input", no_input)
+    assert macro_economic_analyst.run_conversation_macro_economic_analyst(interactive=False) == "UK analysis"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
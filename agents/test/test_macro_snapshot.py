@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+import threading
+import time
+from agents.macro_snapshot import MacroSnapshotService, MacroSnapshotStore
+
+
+def test_snapshots_are_versioned_and_pruned():
+    with tempfile.TemporaryDirectory() as directory:
+        store = MacroSnapshotStore(directory, keep=2)
+        assert store.latest() is None
+        for i in range(3):
+            store.save(f"analysis {i}")
+        latest = store.latest()
+        assert latest["version"] == 3 and latest["analysis"] == "analysis 2"
+        assert sorted(os.listdir(directory)) == ["snapshot-000002.json", "snapshot-000003.json"]
+
+
+def test_stale_snapshot_is_rebuilt_once_for_concurrent_readers():
+    with tempfile.TemporaryDirectory() as directory:
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return f"analysis {len(builds)}"
+
+        service = MacroSnapshotService(MacroSnapshotStore(directory), build=build, max_age=60)
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(service.get_macro_analysis())) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        assert results == ["analysis 1"] * 4 and len(builds) == 1
+
+        # Fresh enough for the default age, too old for a stricter caller
+        assert service.get_macro_analysis() == "analysis 1"
+        time.sleep(0.05)
+        assert service.get_macro_analysis(max_age=0.01) == "analysis 2"
+
+
+def test_rebuild_does_not_hold_the_lock_and_failures_reach_every_waiter():
+    with tempfile.TemporaryDirectory() as directory:
+        started = threading.Event()
+        release = threading.Event()
+        lock_free = []
+
+        def build():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("search failed")
+
+        service = MacroSnapshotService(MacroSnapshotStore(directory), build=build, max_age=60)
+        errors = []
+
+        def refresh():
+            try:
+                service.refresh(max_age=60)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=refresh) for _ in range(2)]
+        threads[0].start()
+        assert started.wait(5)
+        # The searches and LLM call run without the lock
+        lock_free.append(service._refresh_lock.acquire(blocking=False))
+        service._refresh_lock.release()
+        threads[1].start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        assert lock_free == [True]
+        assert errors == ["search failed"] * 2
+        # The next caller starts a new rebuild
+        service.build = lambda: "analysis"
+        assert service.get_macro_analysis() == "analysis"
+
+
+if __name__ == "__main__":
+    test_snapshots_are_versioned_and_pruned()
+    test_stale_snapshot_is_rebuilt_once_for_concurrent_readers()
+    test_rebuild_does_not_hold_the_lock_and_failures_reach_every_waiter()
+    print("All macro snapshot tests passed")
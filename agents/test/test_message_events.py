@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.message_events import MessageEventBus, attach_message_tap, message_content
+
+
+class FakeAgent:
+    """Sends messages through its process_message_before_send hooks like an autogen agent"""
+
+    def __init__(self, name):
+        self.name = name
+        self.hooks = []
+        self.received = []
+
+    def register_hook(self, hookable_method, hook):
+        assert hookable_method == "process_message_before_send"
+        self.hooks.append(hook)
+
+    def send(self, message, recipient, silent=False):
+        for hook in self.hooks:
+            message = hook(sender=self, message=message, recipient=recipient, silent=silent)
+        recipient.received.append(message)
+
+
+def test_every_sent_message_is_published_once_to_each_subscriber():
+    bot, human = FakeAgent("bot"), FakeAgent("human")
+    bus = MessageEventBus()
+    first, second = [], []
+    bus.subscribe(first.append)
+    subscription = bus.subscribe(second.append)
+    attach_message_tap([bot, human], bus)
+
+    bot.send("What is your income?", human)
+    human.send({"content": "50k", "role": "user"}, bot)
+    bus.unsubscribe(subscription)
+    bot.send({"content": "Thanks"}, human, silent=True)
+
+    assert [(e.sender, e.recipient, e.content) for e in first] == [
+        ("bot", "human", "What is your income?"),
+        ("human", "bot", "50k"),
+        ("bot", "human", "Thanks"),
+    ]
+    assert len(second) == 2 and first[2].silent
+    assert first[0].sent_at <= first[1].sent_at <= first[2].sent_at
+    # Messages themselves are passed on untouched
+    assert bot.received == [{"content": "50k", "role": "user"}]
+
+
+def test_failing_subscriber_does_not_break_the_conversation():
+    bot, human = FakeAgent("bot"), FakeAgent("human")
+    bus = MessageEventBus()
+    seen = []
+    bus.subscribe(lambda event: 1 / 0)
+    bus.subscribe(seen.append)
+    attach_message_tap([bot], bus)
+    bot.send("Hello", human)
+    assert human.received == ["Hello"] and len(seen) == 1
+
+
+def test_message_content():
+    assert message_content("hi") == "hi"
+    assert message_content({"content": None, "function_call": {}}) == ""
+    assert message_content({"content": [{"type": "text", "text": "a"}, {"type": "image_url"}]}) == "a"
+    # A reflection_with_llm chat summary
+    assert message_content({"content": "Income 40k", "role": "assistant"}) == "Income 40k"
+
+
+if __name__ == "__main__":
+    test_every_sent_message_is_published_once_to_each_subscriber()
+    test_failing_subscriber_does_not_break_the_conversation()
+    test_message_content()
+    print("All message event tests passed")
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.multi_query import merge_query_results, split_product_needs, split_query_results
+
+# Two queries in Chroma's multi-query format; "b" is retrieved by both
+RESULTS = {
+    "ids": [["a", "b", "c"], ["b", "d"]],
+    "documents": [["doc a", "doc b", "doc c"], ["doc b", "doc d"]],
+    "metadatas": [[{"url": "/a"}, {"url": "/b"}, {"url": "/c"}], [{"url": "/b"}, {"url": "/d"}]],
+    "distances": [[0.2, 0.5, 0.9], [0.1, 0.3]],
+}
+
+
+def test_merge_keeps_each_document_once_with_its_best_distance():
+    merged = merge_query_results(RESULTS)
+    assert merged["ids"] == ["b", "a", "d", "c"]
+    assert merged["distances"] == [0.1, 0.2, 0.3, 0.9]
+    assert merged["documents"][0] == "doc b" and merged["metadatas"][2] == {"url": "/d"}
+    assert merged["query_indices"] == [[0, 1], [0], [1], [0]]
+
+    assert merge_query_results(RESULTS, max_results=2)["ids"] == ["b", "a"]
+    assert merge_query_results({"ids": []})["ids"] == []
+
+
+def test_split_gives_one_single_query_result_per_query():
+    first, second = split_query_results(RESULTS)
+    assert first["ids"] == [["a", "b", "c"]] and second["distances"] == [[0.1, 0.3]]
+    assert first["embeddings"] is None
+
+
+def test_product_needs_become_separate_queries():
+    text = """1. Goals: buy a home within five years
+2. Product requirements:
+- **Savings account** for the deposit
+- Mortgage
+- Mortgage"""
+    assert split_product_needs(text) == [
+        text,
+        "Goals: buy a home within five years",
+        "Savings account for the deposit",
+        "Mortgage",
+    ]
+    assert split_product_needs(text, max_needs=2) == [text, "Goals: buy a home within five years", "Savings account for the deposit"]
+    # Prose (or a single item) is searched as it is
+    assert split_product_needs("The customer wants a savings account.") == ["The customer wants a savings account."]
+
+
+if __name__ == "__main__":
+    test_merge_keeps_each_document_once_with_its_best_distance()
+    test_split_gives_one_single_query_result_per_query()
+    test_product_needs_become_separate_queries()
+    print("All multi-query tests passed")
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+
+pytest.importorskip("PIL")
+pytest.importorskip("pytesseract")
+
+from utils import ocr
+from utils.ocr import OCRPipeline
+
+
+class FakeImageServer:
+    """Serves one image url with an ETag and honours If-None-Match"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        etag = f'"{hashlib.md5(self.data).hexdigest()}"'
+        response = requests.Response()
+        response.url = url
+        response.headers["ETag"] = etag
+        if (headers or {}).get("If-None-Match") == etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = self.data
+        return response
+
+
+def test_image_replaced_at_the_same_url_is_ocrd_again(monkeypatch):
+    monkeypatch.setattr(ocr, "_ocr_image", lambda data, timeout: data.decode())
+    with tempfile.TemporaryDirectory() as directory:
+        server = FakeImageServer(b"Cash ISA 4.10% AER")
+        pipeline = OCRPipeline(server, os.path.join(directory, "ocr.sqlite3"), processes=1)
+        pipeline._pool.shutdown()
+        pipeline._pool = ThreadPoolExecutor(1)
+        pipeline.is_too_small = lambda data: False
+        url = "https://www.example.com/banner.png"
+
+        assert pipeline.extract(url) == "Cash ISA 4.10% AER"
+        # Unchanged: revalidated with a 304, not OCR'd again
+        assert pipeline.extract(url) == "Cash ISA 4.10% AER"
+        assert "If-None-Match" in server.requests[-1] and pipeline.stats["ocr"] == 1
+
+        server.data = b"Cash ISA 3.85% AER"
+        assert pipeline.extract(url) == "Cash ISA 3.85% AER"
+        assert pipeline.stats["ocr"] == 2
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
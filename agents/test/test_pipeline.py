@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import time
+import pytest
+from utils.pipeline import PipelineCancelled, PipelineExecutor, Stage, StageError
+
+
+def slow(value, delay=0.2):
+    def run(**inputs):
+        time.sleep(delay)
+        return value if not inputs else f"{value}({','.join(inputs[k] for k in sorted(inputs))})"
+    return run
+
+
+def test_independent_stages_run_concurrently_and_pass_outputs_forward():
+    pipeline = PipelineExecutor([
+        Stage("profile", slow("profile")),
+        Stage("recommendation", slow("rm"), ["profile"]),
+        Stage("macro", slow("macro", delay=0.3)),
+        Stage("advice", slow("advice", delay=0), ["recommendation", "macro"]),
+    ])
+    started = time.monotonic()
+    outputs = pipeline.run()
+    elapsed = time.monotonic() - started
+    assert outputs["advice"] == "advice(macro,rm(profile))"
+    # Critical path is profile + recommendation (0.4s), not the 0.7s sum of all stages
+    assert 0.4 <= elapsed < 0.6
+    assert pipeline.timings["macro"][0] < 0.1
+
+
+def test_targets_and_provided_outputs_limit_what_runs():
+    calls = []
+
+    def stage(name):
+        return lambda **inputs: calls.append(name) or name
+
+    pipeline = PipelineExecutor([
+        Stage("a", stage("a")),
+        Stage("b", stage("b"), ["a"]),
+        Stage("c", stage("c")),
+    ])
+    outputs = pipeline.run(targets=["b"], provided={"a": "given"})
+    assert calls == ["b"] and outputs == {"a": "given", "b": "b"}
+
+
+def test_failure_stops_dependents_and_reports_the_stage():
+    calls = []
+
+    def fail():
+        raise ValueError("no data")
+
+    pipeline = PipelineExecutor([
+        Stage("fetch", fail),
+        Stage("use", lambda fetch: calls.append(fetch), ["fetch"]),
+    ])
+    with pytest.raises(StageError) as info:
+        pipeline.run()
+    assert info.value.stage == "fetch" and isinstance(info.value.error, ValueError)
+    assert calls == []
+
+
+def test_cancelled_run_starts_no_further_stages():
+    calls = []
+    left = []
+
+    pipeline = PipelineExecutor([
+        Stage("chat", lambda: left.append(True) or "profile"),
+        Stage("advice", lambda chat: calls.append(chat), ["chat"]),
+    ])
+    with pytest.raises(PipelineCancelled):
+        pipeline.run(cancelled=lambda: bool(left))
+    assert calls == []
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage"):
+        PipelineExecutor([Stage("a", lambda b: b, ["b"])])
+    with pytest.raises(ValueError, match="cycle"):
+        PipelineExecutor([Stage("a", lambda b: b, ["b"]), Stage("b", lambda a: a, ["a"])])
+
+
+if __name__ == "__main__":
+    test_independent_stages_run_concurrently_and_pass_outputs_forward()
+    test_targets_and_provided_outputs_limit_what_runs()
+    test_failure_stops_dependents_and_reports_the_stage()
+    test_cancelled_run_starts_no_further_stages()
+    test_invalid_graphs_are_rejected()
+    print("All pipeline tests passed")
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+from utils.retrieval_cache import (
+    EmbeddingCache, LRUCache, ResultCache, bump_collection_version, normalize_query, read_collection_version
+)
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" is now the most recently used
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 2
+
+
+def test_embedding_cache_normalizes_and_persists():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "embeddings.json")
+        cache = EmbeddingCache(maxsize=10, path=path)
+        cache.put_embedding("  Saving for a  BABY ", [0.1, 0.2])
+        assert normalize_query("  Saving for a  BABY ") == "saving for a baby"
+        assert cache.get_embedding("saving for a baby") == [0.1, 0.2]
+        cache.save()
+
+        reloaded = EmbeddingCache(maxsize=10, path=path)
+        assert reloaded.get_embedding("Saving for a baby") == [0.1, 0.2]
+
+
+def test_result_cache_dropped_on_new_collection_version():
+    with tempfile.TemporaryDirectory() as db_path:
+        cache = ResultCache(maxsize=10)
+        cache.sync_version(read_collection_version(db_path, "products"))
+        key = ResultCache.make_key([0.1, 0.2], n_results=5)
+        assert key != ResultCache.make_key([0.1, 0.2], n_results=10)
+        cache.put(key, {"ids": ["doc"]})
+
+        cache.sync_version(read_collection_version(db_path, "products"))
+        assert cache.get(key) == {"ids": ["doc"]}
+
+        bump_collection_version(db_path, "products")
+        cache.sync_version(read_collection_version(db_path, "products"))
+        assert cache.get(key) is None
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_counters()
+    test_embedding_cache_normalizes_and_persists()
+    test_result_cache_dropped_on_new_collection_version()
+    print("All retrieval cache tests passed")
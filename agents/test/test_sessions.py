@@ -0,0 +1,235 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import asyncio
+import time
+import pytest
+from utils.pipeline import PipelineExecutor, Stage
+from utils.streaming import emit_event, stream_events
+from webapp.sessions import SessionClosed, SessionLimitError, SessionManager, run_bridge
+
+
+def test_sessions_have_separate_channels_and_closing_ends_the_worker():
+    async def scenario():
+        manager = SessionManager(max_sessions=2)
+        first, second = await manager.open(), await manager.open()
+        answers = {}
+
+        def worker(session):
+            try:
+                answers[session.id] = session.receive()
+                session.receive()
+            except SessionClosed:
+                answers[session.id + " closed"] = True
+
+        for session in (first, second):
+            session.start(worker, session)
+        first.incoming.put("first answer")
+        second.incoming.put("second answer")
+        await manager.close(first)
+        await manager.close(second)
+        first.worker.join(1)
+        second.worker.join(1)
+        return answers, manager.stats()
+
+    answers, stats = asyncio.run(scenario())
+    assert answers == {"1": "first answer", "2": "second answer", "1 closed": True, "2 closed": True}
+    assert stats["active"] == 0 and stats["opened"] == 2
+
+
+def test_sessions_beyond_the_limit_queue_in_order_or_are_rejected():
+    async def scenario():
+        manager = SessionManager(max_sessions=1, max_queued=2, queue_timeout=5)
+        first = await manager.open()
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        waiting = [asyncio.ensure_future(manager.open(on_queued=on_queued)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(SessionLimitError):
+            await manager.open()
+        stats = manager.stats()
+
+        await manager.close(first)
+        second = await waiting[0]
+        assert not waiting[1].done()
+        await manager.close(second)
+        third = await waiting[1]
+        return positions, stats, [second.id, third.id], manager.stats()
+
+    positions, queued_stats, ids, final_stats = asyncio.run(scenario())
+    assert positions == [1, 2]
+    assert queued_stats["active"] == 1 and queued_stats["queued"] == 2 and queued_stats["rejected"] == 1
+    assert ids == ["2", "3"]
+    assert final_stats["active"] == 1 and final_stats["queued"] == 0
+
+
+def test_queued_session_times_out():
+    async def scenario():
+        manager = SessionManager(max_sessions=1, queue_timeout=0.05)
+        await manager.open()
+        with pytest.raises(SessionLimitError):
+            await manager.open()
+        return manager.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1 and stats["queued"] == 0
+
+
+def test_slot_is_held_until_the_worker_has_stopped():
+    async def scenario():
+        manager = SessionManager(max_sessions=1, queue_timeout=5)
+        first = await manager.open()
+        stages = []
+
+        def worker():
+            # Still running the advisory stages after the customer left; stops before the next one
+            for stage in ("rm_recommendation", "advice", "boss_review"):
+                if first.closed.is_set():
+                    return
+                time.sleep(0.1)
+                stages.append(stage)
+
+        first.start(worker)
+        waiting = asyncio.ensure_future(manager.open())
+        await asyncio.sleep(0.05)
+        closing = asyncio.ensure_future(manager.close(first))
+        await asyncio.sleep(0.01)
+        # The websocket is gone but the worker is mid-stage: the slot is not handed on yet
+        assert not waiting.done() and manager.stats()["active"] == 1
+        second = await waiting
+        await closing
+        assert not first.worker.is_alive()
+        await manager.close(second)
+        return stages
+
+    assert asyncio.run(scenario()) == ["rm_recommendation"]
+
+
+def test_bridge_delivers_worker_messages_immediately_and_feeds_answers_back():
+    async def scenario():
+        manager = SessionManager()
+        session = await manager.open()
+        answers = asyncio.Queue()
+        sent = []
+
+        def worker():
+            # Ask two questions, each answered by the "browser", then finish
+            for question in ("income?", "savings?"):
+                session.send({"question": question, "at": time.monotonic()})
+                session.send({"answer": session.receive()})
+            session.send("done")
+
+        async def send(message):
+            if message == "done":
+                return False
+            if "question" in message:
+                sent.append(time.monotonic() - message["at"])
+                await answers.put(message["question"].upper())
+            else:
+                sent.append(message["answer"])
+
+        session.start(worker)
+        started = time.monotonic()
+        await run_bridge(session, send, answers.get)
+        elapsed = time.monotonic() - started
+        await manager.close(session)
+        return sent, elapsed
+
+    sent, elapsed = asyncio.run(scenario())
+    assert sent[1::2] == ["INCOME?", "SAVINGS?"]
+    # No polling interval between the worker and the websocket
+    assert max(sent[0::2]) < 0.05 and elapsed < 0.2
+
+
+def test_bridge_ends_and_reraises_when_the_websocket_goes_away():
+    async def scenario():
+        manager = SessionManager()
+        session = await manager.open()
+        closed = []
+
+        def worker():
+            try:
+                session.receive()
+            except SessionClosed:
+                closed.append(True)
+
+        async def receive():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("disconnected")
+
+        async def send(message):
+            return True
+
+        session.start(worker)
+        try:
+            with pytest.raises(ConnectionError):
+                await run_bridge(session, send, receive)
+        finally:
+            await manager.close(session)
+        session.worker.join(1)
+        return closed
+
+    assert asyncio.run(scenario()) == [True]
+
+
+def test_events_emitted_during_the_pipeline_reach_the_websocket_while_it_runs():
+    async def scenario():
+        manager = SessionManager()
+        session = await manager.open()
+        sent = []
+
+        def stream(name):
+            # A streamed agent reply, emitted from the pipeline's stage threads
+            emit_event({"type": "stream_start", "agent": name})
+            for token in ("a", "b"):
+                time.sleep(0.02)
+                emit_event({"type": "stream_delta", "agent": name, "content": token})
+            emit_event({"type": "stream_end", "agent": name})
+            return name
+
+        pipeline = PipelineExecutor([
+            Stage("rm_recommendation", lambda: stream("relationship_manager")),
+            Stage("advice", lambda rm_recommendation: stream("financial_advisor"), ["rm_recommendation"]),
+        ])
+
+        def worker():
+            # As the webapp's worker: the pipeline runs after the chat and posts its result last
+            with stream_events(session.send):
+                outputs = pipeline.run()
+            session.send(("DONE", outputs))
+
+        async def send(message):
+            sent.append((time.monotonic(), message))
+            return not isinstance(message, tuple)
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        session.start(worker)
+        await run_bridge(session, send, receive)
+        left = session.outgoing.qsize()
+        await manager.close(session)
+        return sent, left
+
+    sent, left = asyncio.run(scenario())
+    messages = [message for _, message in sent]
+    assert messages[-1] == ("DONE", {"rm_recommendation": "relationship_manager", "advice": "financial_advisor"})
+    assert [m["type"] for m in messages[:-1]] == (["stream_start"] + ["stream_delta"] * 2 + ["stream_end"]) * 2
+    assert left == 0
+    # Tokens went out as they were produced, not in one burst at the end
+    assert sent[-1][0] - sent[1][0] >= 0.05
+
+
+if __name__ == "__main__":
+    test_sessions_have_separate_channels_and_closing_ends_the_worker()
+    test_sessions_beyond_the_limit_queue_in_order_or_are_rejected()
+    test_queued_session_times_out()
+    test_slot_is_held_until_the_worker_has_stopped()
+    test_bridge_delivers_worker_messages_immediately_and_feeds_answers_back()
+    test_bridge_ends_and_reraises_when_the_websocket_goes_away()
+    test_events_emitted_during_the_pipeline_reach_the_websocket_while_it_runs()
+    print("All session tests passed")
@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import time
+from agents.test.fake_llm_server import FakeLLMServer
+from utils.pipeline import PipelineExecutor, Stage
+from utils.streaming import emit_event, stream_events, streaming_reply, to_anthropic_messages
+
+
+class FakeAgent:
+    """Just what the streaming reply reads from an autogen agent"""
+
+    def __init__(self, name, llm_config):
+        self.name = name
+        self.llm_config = llm_config
+        self._oai_system_message = [{"role": "system", "content": "You are helpful."}]
+        self._oai_messages = {}
+
+
+def test_openai_reply_is_streamed_as_events():
+    with FakeLLMServer(["Hello", ", ", "world"], delay=0.05) as server:
+        agent = FakeAgent("Relationship_Manager", {
+            "config_list": [{"model": "gpt-4o", "api_key": "k", "base_url": server.url + "/v1"}],
+            "temperature": 0.7,
+        })
+        events = []
+        started = time.monotonic()
+        with stream_events(lambda event: events.append((time.monotonic() - started, event))):
+            final, reply = streaming_reply(agent, [{"role": "user", "content": "Hi"}])
+    assert (final, reply) == (True, "Hello, world")
+    assert [event["type"] for _, event in events] == ["stream_start"] + ["stream_delta"] * 3 + ["stream_end"]
+    # The first token arrives well before the whole reply
+    assert events[-1][0] - events[1][0] >= 0.1
+    request = server.requests[0]
+    assert request["headers"]["Authorization"] == "Bearer k"
+    assert request["body"]["messages"][0]["role"] == "system" and request["body"]["temperature"] == 0.7
+
+
+def test_anthropic_reply_is_streamed_and_turns_alternate():
+    with FakeLLMServer(["Thank ", "you"]) as server:
+        agent = FakeAgent("FinGenie_Customer_Bot", {
+            "api_type": "anthropic", "model": "claude-3-5-sonnet-latest", "api_key": "k", "base_url": server.url,
+        })
+        deltas = []
+        with stream_events(lambda event: deltas.append(event.get("content"))):
+            final, reply = streaming_reply(agent, [{"role": "assistant", "content": "Hello"}])
+    assert reply == "Thank you" and deltas == [None, "Thank ", "you", None]
+    body = server.requests[0]["body"]
+    assert body["system"] == "You are helpful." and body["stream"] is True
+    assert [turn["role"] for turn in body["messages"]] == ["user", "assistant", "user"]
+
+
+def test_without_a_listener_or_endpoint_the_regular_reply_is_used():
+    agent = FakeAgent("Relationship_Manager", {
+        "config_list": [{"model": "gpt-4o", "api_key": "k", "base_url": "http://127.0.0.1:9/v1"}],
+    })
+    assert streaming_reply(agent, [{"role": "user", "content": "Hi"}]) == (False, None)
+    events = []
+    with stream_events(events.append):
+        assert streaming_reply(agent, [{"role": "user", "content": "Hi"}]) == (False, None)
+    assert events == []
+
+
+def test_anthropic_messages_are_merged_into_alternating_turns():
+    system, turns = to_anthropic_messages([
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "a"},
+        {"role": "user", "content": "b"},
+    ])
+    assert system == "Be brief."
+    assert [t["role"] for t in turns] == ["user", "assistant", "user"]
+
+
+def test_pipeline_stages_emit_to_the_callers_listener():
+    events = []
+    pipeline = PipelineExecutor([
+        Stage("profile", lambda: emit_event({"type": "note"}) or "p"),
+        Stage("advice", lambda profile: profile + "!", ["profile"]),
+    ])
+    with stream_events(events.append):
+        pipeline.run(on_stage=lambda name, status: emit_event({"stage": name, "status": status}))
+    assert events == [
+        {"stage": "profile", "status": "started"},
+        {"type": "note"},
+        {"stage": "profile", "status": "finished"},
+        {"stage": "advice", "status": "started"},
+        {"stage": "advice", "status": "finished"},
+    ]
+
+
+if __name__ == "__main__":
+    test_openai_reply_is_streamed_as_events()
+    test_anthropic_reply_is_streamed_and_turns_alternate()
+    test_without_a_listener_or_endpoint_the_regular_reply_is_used()
+    test_anthropic_messages_are_merged_into_alternating_turns()
+    test_pipeline_stages_emit_to_the_callers_listener()
+    print("All streaming tests passed")
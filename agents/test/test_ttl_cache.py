@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import tempfile
+import threading
+from utils.ttl_cache import FRESH, MISS, STALE, TTLCache, parse_domain_ttls, ttl_for_url
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stale_entries_are_served_while_refreshed():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTLCache(os.path.join(directory, "web.sqlite3"), stale_ttl=100, clock=clock)
+        calls = []
+        refreshed = threading.Event()
+
+        def fetch():
+            calls.append(clock.now)
+            if len(calls) > 1:
+                refreshed.set()
+            return f"v{len(calls)}"
+
+        assert cache.get_or_fetch("page", "u", fetch, ttl=10) == "v1"
+        clock.now += 5
+        assert cache.get_or_fetch("page", "u", fetch, ttl=10) == "v1" and len(calls) == 1
+
+        clock.now += 10
+        assert cache.get("page", "u") == ("v1", STALE)
+        assert cache.get_or_fetch("page", "u", fetch, ttl=10) == "v1"
+        assert refreshed.wait(5)
+        cache.close()
+        cache = TTLCache(os.path.join(directory, "web.sqlite3"), stale_ttl=100, clock=clock)
+        assert cache.get("page", "u") == ("v2", FRESH)
+
+        clock.now += 200
+        assert cache.get("page", "u") == (None, MISS)
+        assert cache.get_or_fetch("page", "u", lambda: "", ttl=10) == ""
+        assert cache.get("page", "u") == (None, MISS)
+        cache.close()
+
+
+def test_least_recently_used_entries_are_evicted():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTLCache(os.path.join(directory, "web.sqlite3"), max_entries=2, clock=clock)
+        for key in ("a", "b"):
+            clock.now += 1
+            cache.put("page", key, key, ttl=60)
+        clock.now += 1
+        cache.get("page", "a")
+        clock.now += 1
+        cache.put("page", "c", "c", ttl=60)
+        assert cache.get("page", "b")[1] == MISS
+        assert cache.get("page", "a")[1] == FRESH and cache.get("page", "c")[1] == FRESH
+        cache.close()
+
+
+def test_ttl_for_url_uses_most_specific_domain():
+    ttls = parse_domain_ttls("bankofengland.co.uk=86400, ons.gov.uk=3600,www.ons.gov.uk=60")
+    assert ttl_for_url("https://www.bankofengland.co.uk/monetary-policy", ttls, 10) == 86400
+    assert ttl_for_url("https://www.ons.gov.uk/economy", ttls, 10) == 60
+    assert ttl_for_url("https://ons.gov.uk/economy", ttls, 10) == 3600
+    assert ttl_for_url("https://notons.gov.uk/", ttls, 10) == 10
+
+
+if __name__ == "__main__":
+    test_stale_entries_are_served_while_refreshed()
+    test_least_recently_used_entries_are_evicted()
+    test_ttl_for_url_uses_most_specific_domain()
+    print("All TTL cache tests passed")
@@ -0,0 +1,69 @@
+"""Crawl throughput against the recorded HTTP archive.
+
+Record the site once (live network):
+    python benchmarks/crawl_throughput.py --mode record --workers 8
+Then benchmark offline, with a fixed per-request latency:
+    python benchmarks/crawl_throughput.py --latency 0.1 --workers 1,4,8,16
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+parser.add_argument("--archive", help="archive file (default: FINGENIE_HTTP_ARCHIVE_PATH)")
+parser.add_argument("--latency", type=float, default=0.05, help="replayed seconds per request")
+parser.add_argument("--jitter", type=float, default=0.0, help="extra replayed seconds, up to this much")
+parser.add_argument("--workers", default="1,4,8", help="comma-separated fetch worker counts to compare")
+parser.add_argument("--max-depth", type=int, default=2)
+parser.add_argument("--start", default="https://www.barclays.co.uk")
+args = parser.parse_args()
+
+# The archive settings are read when config.settings is first imported
+os.environ["FINGENIE_HTTP_ARCHIVE_MODE"] = args.mode
+os.environ["FINGENIE_HTTP_ARCHIVE_LATENCY"] = str(args.latency)
+os.environ["FINGENIE_HTTP_ARCHIVE_JITTER"] = str(args.jitter)
+if args.archive:
+    os.environ["FINGENIE_HTTP_ARCHIVE_PATH"] = args.archive
+
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from utils.crawler import CrawlEngine
+from utils.http_archive import get_http_archive
+from utils.http_client import create_session
+
+
+def parse(url, response):
+    """Same link rules as BarclayScraper: site-relative hrefs only"""
+    soup = BeautifulSoup(response.text, 'html.parser')
+    links = [urljoin(args.start, a['href']) for a in soup.find_all('a', href=True) if a['href'].startswith('/')]
+    return {"url": url, "bytes": len(response.content)}, links
+
+
+def run(workers):
+    crawler = CrawlEngine(
+        parse=parse,
+        sink=lambda page: None,
+        max_depth=args.max_depth,
+        fetch_workers=workers,
+        # Politeness delay is for the live site; replays only pay the simulated latency
+        min_host_interval=0.25 if args.mode == "record" else 0.0,
+        session=create_session(pool_size=workers)
+    )
+    return crawler.crawl([args.start])
+
+
+if __name__ == "__main__":
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    if args.mode == "record":
+        stats = run(worker_counts[-1])
+        print(f"Recorded {len(get_http_archive())} responses ({stats['fetched']} pages, {stats['failed']} failed)")
+        sys.exit(0)
+
+    print(f"Replaying {len(get_http_archive())} archived responses at {args.latency * 1000:.0f} ms latency")
+    print(f"{'workers':>8} {'pages':>7} {'failed':>7} {'seconds':>8} {'pages/s':>8}")
+    for workers in worker_counts:
+        stats = run(workers)
+        print(f"{workers:>8} {stats['fetched']:>7} {stats['failed']:>7} {stats['elapsed_s']:>8.2f} {stats['pages_per_s']:>8.1f}")
@@ -0,0 +1,112 @@
+"""Micro-benchmark of page extraction: the streaming extractor against the BeautifulSoup code
+it replaced, for the crawler (all sections of a page) and the search agent (first 4000 chars).
+
+Uses pages from the HTTP archive when it has any, otherwise a synthetic product page:
+    python benchmarks/html_extraction.py --archive data/http_archive.sqlite3 --number 20
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import sqlite3
+import timeit
+from bs4 import BeautifulSoup
+from utils.html_extract import extract_html
+from utils.rm_data_preprocessing import FOOTER_PATTERNS
+
+
+def bs4_scraper_extract(html):
+    """BarclayScraper.parse_page before the streaming extractor"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(['footer', 'nav', 'header']):
+        element.decompose()
+    unwanted_selectors = [
+        'footer', '.footer', '#footer',
+        'nav', '.navigation', '#navigation',
+        '.site-info', '.legal-info', '.copyright',
+        '.menu', '.site-header'
+    ]
+    for selector in unwanted_selectors:
+        for element in soup.select(selector):
+            element.decompose()
+    sections = []
+    heading = ""
+    for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'li']):
+        text = element.get_text()
+        for pattern in FOOTER_PATTERNS:
+            text = text.replace(pattern, '')
+        text = text.strip()
+        if element.name in ('h1', 'h2', 'h3'):
+            heading = text
+        if text:
+            sections.append((heading, text))
+    images = [img.get('src', '') for img in soup.find_all('img')]
+    links = [link['href'] for link in soup.find_all('a', href=True)]
+    return sections, images, links
+
+
+def bs4_search_extract(html):
+    """DuckDuckGoSearchAgent.fetch_webpage_content before the streaming extractor"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    return text[:4000]
+
+
+def synthetic_page(products=200):
+    chrome = '<header class="site-header"><nav class="navigation"><ul>' + \
+        ''.join(f'<li><a href="/menu/{i}">Menu {i}</a></li>' for i in range(80)) + '</ul></nav></header>'
+    body = ''.join(
+        f'<h2>Product {i}</h2><p>Product {i} pays {i % 7}.{i % 10}% AER on balances up to £{i * 1000}.</p>'
+        f'<ul><li>Feature one of {i}</li><li>Feature two of {i}</li></ul>'
+        f'<img src="/images/product-{i}.png"><a href="/products/{i}">More</a>'
+        for i in range(products)
+    )
+    scripts = '<script>' + 'var tracking = {};' * 2000 + '</script>'
+    footer = '<footer class="footer"><p>Barclays Bank UK PLC and Barclays Bank PLC are each authorised</p></footer>'
+    return f'<html><head>{scripts}</head><body>{chrome}<main>{body}</main>{footer}</body></html>'
+
+
+def archived_pages(path, limit):
+    if not path or not os.path.exists(path):
+        return []
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT body FROM responses WHERE status = 200 AND headers LIKE '%text/html%' LIMIT ?", (limit,)
+    ).fetchall()
+    conn.close()
+    return [row[0].decode('utf-8', errors='replace') for row in rows]
+
+
+def best_ms(func, pages, number):
+    # Best of 3 repeats, per page
+    return min(timeit.repeat(lambda: [func(page) for page in pages], number=number, repeat=3)) * 1000 / (number * len(pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", help="HTTP archive to take pages from")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    pages = archived_pages(args.archive, args.pages) or [synthetic_page()]
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB on average")
+
+    cases = [
+        ("crawler sections", bs4_scraper_extract,
+         lambda html: extract_html(html, strip_phrases=FOOTER_PATTERNS)),
+        ("search text (4000 chars)", bs4_search_extract,
+         lambda html: extract_html(html, max_chars=4000).text()[:4000]),
+    ]
+    print(f"{'case':<26} {'bs4 ms':>8} {'stream ms':>10} {'speedup':>8}")
+    for name, before, after in cases:
+        before_ms = best_ms(before, pages, args.number)
+        after_ms = best_ms(after, pages, args.number)
+        print(f"{name:<26} {before_ms:>8.2f} {after_ms:>10.2f} {before_ms / after_ms:>7.1f}x")
@@ -0,0 +1,48 @@
+"""Latency of the macro-economic analysis data gathering against the recorded HTTP archive.
+
+Times the concurrent DuckDuckGo searches and page fetches for all economic queries, which is
+the part of the macro analysis that depends on live sites. Record once, then replay offline:
+    python benchmarks/macro_latency.py --mode record
+    python benchmarks/macro_latency.py --latency 0.2 --repeat 3
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+parser.add_argument("--archive", help="archive file (default: FINGENIE_HTTP_ARCHIVE_PATH)")
+parser.add_argument("--latency", type=float, default=0.2, help="replayed seconds per request")
+parser.add_argument("--jitter", type=float, default=0.0, help="extra replayed seconds, up to this much")
+parser.add_argument("--repeat", type=int, default=1)
+args = parser.parse_args()
+
+# The archive settings are read when config.settings is first imported
+os.environ["FINGENIE_HTTP_ARCHIVE_MODE"] = args.mode
+os.environ["FINGENIE_HTTP_ARCHIVE_LATENCY"] = str(args.latency)
+os.environ["FINGENIE_HTTP_ARCHIVE_JITTER"] = str(args.jitter)
+if args.archive:
+    os.environ["FINGENIE_HTTP_ARCHIVE_PATH"] = args.archive
+
+import statistics
+import time
+from agents.duckduckgo_search_agent import DuckDuckGoSearchAgent
+from agents.macro_economic_analyst import ECONOMIC_QUERIES, gather_economic_data
+
+
+if __name__ == "__main__":
+    # No LLM is needed to gather the data, so the benchmark runs without API keys
+    agent = DuckDuckGoSearchAgent(name="Benchmark_Search_Agent", llm_config=False, human_input_mode="NEVER")
+    totals = []
+    for _ in range(args.repeat if args.mode == "replay" else 1):
+        started = time.perf_counter()
+        economic_data = gather_economic_data(agent, ECONOMIC_QUERIES)
+        totals.append(time.perf_counter() - started)
+
+    print(f"\n{'query':<45} {'chars':>7}  indicators")
+    for query, data in economic_data.items():
+        figures = "; ".join(record.format() for record in data["indicators"].values())
+        print(f"{query:<45} {len(data['content']):>7}  {figures}")
+    print(f"Gathered {len(ECONOMIC_QUERIES)} indicators in {statistics.median(totals):.2f}s (median of {len(totals)})")
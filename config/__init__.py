@@ -0,0 +1 @@
+# Empty file to make config a Python package
@@ -0,0 +1,119 @@
+# Runtime settings for FinGenie.
+# Every value can be overridden with an environment variable (see env.example).
+
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("FINGENIE_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Product knowledge base (ChromaDB)
+CHROMA_DB_PATH = os.getenv("FINGENIE_CHROMA_DB_PATH", os.path.join(DATA_DIR, "chromadb"))
+CHROMA_COLLECTION_NAME = os.getenv("FINGENIE_CHROMA_COLLECTION", "barclays_uk_products")
+EMBEDDING_MODEL_NAME = os.getenv("FINGENIE_EMBEDDING_MODEL", "all-mpnet-base-v2")
+
+# Pages are split into overlapping token windows at ingest
+CHUNK_TOKEN_SIZE = int(os.getenv("FINGENIE_CHUNK_TOKEN_SIZE", "300"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("FINGENIE_CHUNK_OVERLAP_TOKENS", "50"))
+
+# Barclays crawler
+CRAWL_MAX_DEPTH = int(os.getenv("FINGENIE_CRAWL_MAX_DEPTH", "2"))
+CRAWL_FETCH_WORKERS = int(os.getenv("FINGENIE_CRAWL_FETCH_WORKERS", "8"))
+CRAWL_MIN_HOST_INTERVAL = float(os.getenv("FINGENIE_CRAWL_MIN_HOST_INTERVAL", "0.25"))
+CRAWL_TIMEOUT = float(os.getenv("FINGENIE_CRAWL_TIMEOUT", "15"))
+CRAWL_STATE_PATH = os.getenv("FINGENIE_CRAWL_STATE_PATH", os.path.join(DATA_DIR, "crawl_state.sqlite3"))
+# Removed pages are only tombstoned after a run without failed fetches that reached at least this
+# share of the previous run's pages
+CRAWL_MIN_REMOVAL_SHARE = float(os.getenv("FINGENIE_CRAWL_MIN_REMOVAL_SHARE", "0.8"))
+HTML_MAX_BYTES = int(os.getenv("FINGENIE_HTML_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Web search: result pages are fetched concurrently; pages not back within the deadline
+# (seconds, for all pages of one query) are replaced by their search snippet
+SEARCH_FETCH_WORKERS = int(os.getenv("FINGENIE_SEARCH_FETCH_WORKERS", "8"))
+SEARCH_FETCH_TIMEOUT = float(os.getenv("FINGENIE_SEARCH_FETCH_TIMEOUT", "10"))
+SEARCH_FETCH_DEADLINE = float(os.getenv("FINGENIE_SEARCH_FETCH_DEADLINE", "8"))
+# Result pages are streamed and only read until this much text has been extracted
+SEARCH_PAGE_MAX_BYTES = int(os.getenv("FINGENIE_SEARCH_PAGE_MAX_BYTES", str(1024 * 1024)))
+SEARCH_PAGE_MAX_CHARS = int(os.getenv("FINGENIE_SEARCH_PAGE_MAX_CHARS", "4000"))
+
+# Macro analysis: characters of fetched content per indicator query sent to the analysis LLM call
+MACRO_CONTENT_CHARS_PER_QUERY = int(os.getenv("FINGENIE_MACRO_CONTENT_CHARS_PER_QUERY", "6000"))
+
+# Macro analysis snapshots: rebuilt in the background every MACRO_SNAPSHOT_INTERVAL seconds and
+# served to the advisor while younger than MACRO_SNAPSHOT_MAX_AGE (otherwise rebuilt inline)
+MACRO_SNAPSHOT_DIR = os.getenv("FINGENIE_MACRO_SNAPSHOT_DIR", os.path.join(DATA_DIR, "macro_snapshots"))
+MACRO_SNAPSHOT_KEEP = int(os.getenv("FINGENIE_MACRO_SNAPSHOT_KEEP", "10"))
+MACRO_SNAPSHOT_INTERVAL = float(os.getenv("FINGENIE_MACRO_SNAPSHOT_INTERVAL", str(6 * 3600)))
+MACRO_SNAPSHOT_MAX_AGE = float(os.getenv("FINGENIE_MACRO_SNAPSHOT_MAX_AGE", str(12 * 3600)))
+MACRO_SNAPSHOT_REFRESHER = _env_bool("FINGENIE_MACRO_SNAPSHOT_REFRESHER", True)
+
+# Record/replay of HTTP traffic for offline benchmarks and tests: "record" saves live responses
+# (and DuckDuckGo results) to the archive, "replay" serves them back with the given latency.
+HTTP_ARCHIVE_MODE = os.getenv("FINGENIE_HTTP_ARCHIVE_MODE", "").lower()
+HTTP_ARCHIVE_PATH = os.getenv("FINGENIE_HTTP_ARCHIVE_PATH", os.path.join(DATA_DIR, "http_archive.sqlite3"))
+HTTP_ARCHIVE_LATENCY = float(os.getenv("FINGENIE_HTTP_ARCHIVE_LATENCY", "0"))
+HTTP_ARCHIVE_JITTER = float(os.getenv("FINGENIE_HTTP_ARCHIVE_JITTER", "0"))
+
+# OCR of product images. TESSERACT_CMD is only needed when tesseract is not on the PATH,
+# e.g. C:\Program Files\Tesseract-OCR\tesseract.exe on Windows.
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+OCR_CACHE_PATH = os.getenv("FINGENIE_OCR_CACHE_PATH", os.path.join(DATA_DIR, "ocr_cache.sqlite3"))
+OCR_PROCESSES = int(os.getenv("FINGENIE_OCR_PROCESSES", str(os.cpu_count() or 2)))
+OCR_MIN_BYTES = int(os.getenv("FINGENIE_OCR_MIN_BYTES", "2048"))
+OCR_MIN_SIDE = int(os.getenv("FINGENIE_OCR_MIN_SIDE", "64"))
+OCR_TIMEOUT = float(os.getenv("FINGENIE_OCR_TIMEOUT", "20"))
+
+# Ingestion: chunks are embedded and upserted in batches. Full reindexes (--full) can spread
+# the encoder over several processes.
+INGEST_BATCH_SIZE = int(os.getenv("FINGENIE_INGEST_BATCH_SIZE", "64"))
+INGEST_EMBED_PROCESSES = int(os.getenv("FINGENIE_INGEST_EMBED_PROCESSES", "0"))
+
+# Retrieval caches: query text -> embedding (persisted) and query -> results (in memory)
+CACHE_DIR = os.getenv("FINGENIE_CACHE_DIR", os.path.join(DATA_DIR, "cache"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("FINGENIE_EMBEDDING_CACHE_SIZE", "2048"))
+RESULT_CACHE_SIZE = int(os.getenv("FINGENIE_RESULT_CACHE_SIZE", "1024"))
+PERSIST_EMBEDDING_CACHE = _env_bool("FINGENIE_PERSIST_EMBEDDING_CACHE", True)
+
+# Disk cache for web search results and fetched pages. Entries are fresh for their TTL (seconds,
+# per domain for pages) and then served stale for up to WEB_CACHE_STALE_TTL while refreshed.
+WEB_CACHE_ENABLED = _env_bool("FINGENIE_WEB_CACHE", True)
+WEB_CACHE_PATH = os.getenv("FINGENIE_WEB_CACHE_PATH", os.path.join(CACHE_DIR, "web_cache.sqlite3"))
+WEB_CACHE_MAX_ENTRIES = int(os.getenv("FINGENIE_WEB_CACHE_MAX_ENTRIES", "2000"))
+WEB_CACHE_STALE_TTL = float(os.getenv("FINGENIE_WEB_CACHE_STALE_TTL", str(7 * 86400)))
+SEARCH_CACHE_TTL = float(os.getenv("FINGENIE_SEARCH_CACHE_TTL", str(6 * 3600)))
+PAGE_CACHE_TTL = float(os.getenv("FINGENIE_PAGE_CACHE_TTL", str(6 * 3600)))
+PAGE_CACHE_DOMAIN_TTLS = os.getenv(
+    "FINGENIE_PAGE_CACHE_DOMAIN_TTLS", "bankofengland.co.uk=86400,ons.gov.uk=86400"
+)
+
+# Hybrid retrieval: fuse dense results with a BM25 index of the same documents
+HYBRID_RETRIEVAL = _env_bool("FINGENIE_HYBRID_RETRIEVAL", True)
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("FINGENIE_HYBRID_CANDIDATE_FACTOR", "3"))
+
+# Load the embedding model and open the collection when the webapp starts
+WARM_UP_RETRIEVAL = _env_bool("FINGENIE_WARM_UP_RETRIEVAL", True)
+
+# Webapp: concurrent chat sessions per process; further connections wait in a queue (up to
+# WEBAPP_MAX_QUEUED_SESSIONS, for WEBAPP_SESSION_QUEUE_TIMEOUT seconds) or are turned away
+WEBAPP_MAX_SESSIONS = int(os.getenv("FINGENIE_WEBAPP_MAX_SESSIONS", "8"))
+WEBAPP_MAX_QUEUED_SESSIONS = int(os.getenv("FINGENIE_WEBAPP_MAX_QUEUED_SESSIONS", "16"))
+WEBAPP_SESSION_QUEUE_TIMEOUT = float(os.getenv("FINGENIE_WEBAPP_SESSION_QUEUE_TIMEOUT", "120"))
+
+# Stream agent replies token by token to the webapp (seconds to wait for the LLM between tokens)
+LLM_STREAMING = _env_bool("FINGENIE_LLM_STREAMING", True)
+LLM_STREAM_TIMEOUT = float(os.getenv("FINGENIE_LLM_STREAM_TIMEOUT", "60"))
+
+# Shared cache of LLM responses for identical requests (model, messages, sampling parameters);
+# least recently used entries beyond LLM_CACHE_MAX_ENTRIES and entries older than
+# LLM_CACHE_MAX_AGE seconds are dropped
+LLM_CACHE_ENABLED = _env_bool("FINGENIE_LLM_CACHE", True)
+LLM_CACHE_PATH = os.getenv("FINGENIE_LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("FINGENIE_LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_AGE = float(os.getenv("FINGENIE_LLM_CACHE_MAX_AGE", str(7 * 86400)))
@@ -2,20 +2,19 @@ import sys
 import os
 from utils.keys import openai_key
 from autogen import GroupChat, GroupChatManager
-from agents.customer_chatbot import create_customer_chatbot, create_human_proxy
-from agents.relationship_manager import create_relationship_manager, create_rm_junior_analyst
-from agents.financial_advisor import create_financial_advisor
-from agents.boss_manager import create_boss_human_loop
+from utils.llm_cache import use_llm_cache
+from agents.registry import agent_registry
+from agents.relationship_manager import format_product_context
 from agents.macro_economic_analyst import create_macro_economic_analyst
 
 def create_sequential_group_chat():
-    # Create agents
-    human_proxy = create_human_proxy()
-    customer_chatbot = create_customer_chatbot()
-    relationship_manager = create_relationship_manager()
+    # Create agents (reset clones of the process-wide templates)
+    human_proxy = agent_registry.get("human_proxy")
+    customer_chatbot = agent_registry.get("customer_chatbot")
+    relationship_manager = agent_registry.get("relationship_manager")
     macro_analyst = create_macro_economic_analyst()
-    financial_advisor = create_financial_advisor()
-    boss_manager = create_boss_human_loop()
+    financial_advisor = agent_registry.get("financial_advisor")
+    boss_manager = agent_registry.get("boss_manager")
 
     # Custom speaker selection function to enforce sequence and handle context
     def select_next_speaker(
@@ -38,10 +37,7 @@ def create_sequential_group_chat():
             Information of some products that might be relevant to the customer along with their sources: {input_context}
             """
             
-            rm_junior_analyst = create_rm_junior_analyst(
-                analyst_to_rm_prompt=analyst_to_rm_prompt,
-                update_embeddings=False
-            )
+            rm_junior_analyst = agent_registry.get("rm_junior_analyst", customized_prompt=analyst_to_rm_prompt)
             
             # Retrieve relevant products
             input_context = rm_junior_analyst.retrieve_docs(
@@ -51,13 +47,7 @@ def create_sequential_group_chat():
             )
             
             # Format the retrieved context
-            product_info = []
-            for doc, metadata in zip(input_context["documents"][0], input_context["metadatas"][0]):
-                product_entry = f"""Information from {metadata}:
-                {doc}
-                """
-                product_info.append(product_entry)
-            formatted_products = "\n\n".join(product_info)
+            formatted_products = format_product_context(input_context["documents"][0], input_context["metadatas"][0])
             
             # Store the formatted message for relationship manager
             agent_states["rm_context"] = analyst_to_rm_prompt.format(
@@ -113,6 +103,7 @@ def create_sequential_group_chat():
         groupchat=group_chat,
         llm_config={"config_list": [{"model": "gpt-4", "api_key": openai_key}]},
     )
+    use_llm_cache(manager)
 
     # Start the conversation
     chat_result = customer_chatbot.initiate_chat(manager,
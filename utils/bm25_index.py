@@ -0,0 +1,149 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Words, plus numbers with their decimal part and an optional percent sign, so rate terms
+# such as "5.25%" or "4.1% AER" stay a single token.
+TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*%?|[a-z]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into BM25 terms"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-process inverted index scored with Okapi BM25.
+
+    Documents are kept in sync with the Chroma collection through `upsert` and `remove`; a query
+    only visits the postings of its own terms instead of scanning every stored document.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}  # doc_id -> {term: term frequency}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_urls: Dict[str, Optional[str]] = {}
+        self._url_ids: Dict[str, Set[str]] = defaultdict(set)  # url -> doc_ids, so a page's chunks are found without a scan
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict]]] = None,
+    ) -> None:
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                self._remove(doc_id)
+                term_counts = Counter(tokenize(document or ""))
+                self._add(doc_id, dict(term_counts), (metadata or {}).get("url"))
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def ids_for_url(self, url: str) -> List[str]:
+        with self._lock:
+            return list(self._url_ids.get(url, ()))
+
+    def _add(self, doc_id: str, term_counts: Dict[str, int], url: Optional[str]) -> None:
+        length = sum(term_counts.values())
+        self._doc_terms[doc_id] = term_counts
+        self._doc_lengths[doc_id] = length
+        self._doc_urls[doc_id] = url
+        if url is not None:
+            self._url_ids[url].add(doc_id)
+        self._total_length += length
+        for term, tf in term_counts.items():
+            self._postings[term][doc_id] = tf
+
+    def _remove(self, doc_id: str) -> None:
+        term_counts = self._doc_terms.pop(doc_id, None)
+        if term_counts is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        url = self._doc_urls.pop(doc_id, None)
+        url_ids = self._url_ids.get(url)
+        if url_ids is not None:
+            url_ids.discard(doc_id)
+            if not url_ids:
+                del self._url_ids[url]
+        for term in term_counts:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Return up to n_results (doc_id, score) pairs, best first"""
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            state = {
+                "k1": self.k1,
+                "b": self.b,
+                "docs": {
+                    doc_id: {"terms": term_counts, "url": self._doc_urls.get(doc_id)}
+                    for doc_id, term_counts in self._doc_terms.items()
+                },
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        index = cls(k1=state.get("k1", 1.5), b=state.get("b", 0.75))
+        for doc_id, doc in state["docs"].items():
+            index._add(doc_id, doc["terms"], doc.get("url"))
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists with reciprocal-rank fusion, best first"""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += weight / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,108 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class WhitespaceTokenizer:
+    """Fallback tokenizer that treats whitespace-separated words as tokens"""
+
+    def encode(self, text: str) -> List[str]:
+        return text.split()
+
+    def decode(self, tokens: Sequence[str]) -> str:
+        return " ".join(tokens)
+
+
+class TiktokenTokenizer:
+    """Tokenizer backed by tiktoken (installed with autogen)"""
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        import tiktoken
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: Sequence[int]) -> str:
+        return self.encoding.decode(list(tokens))
+
+
+_default_tokenizer = None
+
+
+def get_tokenizer():
+    """Return a process-wide tokenizer, preferring tiktoken and falling back to whitespace words"""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        try:
+            _default_tokenizer = TiktokenTokenizer()
+        except Exception as e:
+            logging.warning(f"tiktoken unavailable, chunking on whitespace words instead: {e}")
+            _default_tokenizer = WhitespaceTokenizer()
+    return _default_tokenizer
+
+
+def chunk_id(url: str, index: int) -> str:
+    """Deterministic chunk id, so re-ingesting a page overwrites its chunks in place"""
+    return f"{url}::chunk-{index}"
+
+
+def chunk_sections(
+    url: str,
+    sections: Sequence[Tuple[str, str]],
+    max_tokens: int = 300,
+    overlap_tokens: int = 50,
+    tokenizer=None,
+) -> List[Dict]:
+    """Split a page's (heading, text) sections into overlapping token-bounded chunks.
+
+    Consecutive short sections are packed together into one chunk; a section longer than
+    `max_tokens` is cut into windows that overlap by `overlap_tokens`. Each chunk is returned as
+    {"id", "document", "metadata"} with the page url, its position and the heading it falls under.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    tokenizer = tokenizer or get_tokenizer()
+    chunks: List[Dict] = []
+    token_offset = 0
+    buffer: List = []
+    buffer_heading: Optional[str] = None
+    buffer_offset = 0
+
+    def emit(tokens, heading, offset):
+        index = len(chunks)
+        chunks.append({
+            "id": chunk_id(url, index),
+            "document": tokenizer.decode(tokens).strip(),
+            "metadata": {
+                "url": url,
+                "chunk_index": index,
+                "heading": heading or "",
+                "token_offset": offset,
+                "token_count": len(tokens),
+            },
+        })
+
+    for heading, text in sections:
+        tokens = tokenizer.encode(text)
+        if not tokens:
+            continue
+        if buffer and len(buffer) + len(tokens) > max_tokens:
+            emit(buffer, buffer_heading, buffer_offset)
+            buffer = []
+        if len(tokens) > max_tokens:
+            step = max_tokens - overlap_tokens
+            for start in range(0, len(tokens) - overlap_tokens, step):
+                emit(tokens[start:start + max_tokens], heading, token_offset + start)
+        else:
+            if not buffer:
+                buffer_heading = heading
+                buffer_offset = token_offset
+            buffer = buffer + list(tokens)
+        token_offset += len(tokens)
+
+    if buffer:
+        emit(buffer, buffer_heading, buffer_offset)
+
+    for chunk in chunks:
+        chunk["metadata"]["chunk_count"] = len(chunks)
+    return chunks
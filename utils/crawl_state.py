@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Per-url status of the current run
+PENDING = "pending"
+INDEXED = "indexed"
+SKIPPED = "skipped"
+FAILED = "failed"
+# The server answered 404/410: the page was removed from the site
+GONE = "gone"
+
+
+def url_key(url: str) -> int:
+    """Compact 64-bit key for a url, used for the visited set instead of the full string"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class VisitedSet:
+    """Set of urls held as 64-bit keys, so memory stays bounded on large crawls"""
+
+    def __init__(self, keys: Iterable[int] = ()):
+        self._keys: Set[int] = set(keys)
+
+    def add(self, url: str) -> None:
+        self._keys.add(url_key(url))
+
+    def update(self, keys: Iterable[int]) -> None:
+        self._keys.update(keys)
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CrawlStateStore:
+    """Per-url crawl state kept in a local SQLite file.
+
+    For every page it remembers the validators needed for conditional requests (ETag and
+    Last-Modified), a hash of the last indexed body, the page's outgoing links (so an unchanged
+    page can be skipped without parsing it) and the last run that saw it. A page is only
+    tombstoned on evidence that it was removed: the server answered 404/410, or a parent fetched
+    in the run no longer links to it (see `urls_to_remove`).
+
+    It also checkpoints the run itself: the frontier of urls still to crawl, the visited set (as
+    64-bit url keys) and each url's status and last error, so an interrupted run can be resumed
+    where it stopped with `start_run(resume=True)`.
+    """
+
+    def __init__(self, path: str, base_url: str = ""):
+        self.path = path
+        # Frontier urls on the base host are stored as paths to keep the table small
+        self.base_url = base_url.rstrip("/")
+        self.run_id: Optional[str] = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    links TEXT,
+                    last_seen_run TEXT,
+                    updated_at REAL,
+                    tombstoned INTEGER NOT NULL DEFAULT 0,
+                    status TEXT,
+                    status_run TEXT,
+                    last_error TEXT
+                )"""
+            )
+            # State files written before run checkpoints existed lack the status columns
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            for column in ("status", "status_run", "last_error"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE pages ADD COLUMN {column} TEXT")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at REAL,
+                    finished_at REAL,
+                    status TEXT,
+                    fetched INTEGER
+                )"""
+            )
+            if "fetched" not in {row["name"] for row in self._conn.execute("PRAGMA table_info(runs)")}:
+                self._conn.execute("ALTER TABLE runs ADD COLUMN fetched INTEGER")
+            # Links that a page fetched in the run had before and no longer has
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS dropped_links (
+                    run_id TEXT,
+                    url TEXT,
+                    PRIMARY KEY (run_id, url)
+                ) WITHOUT ROWID"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS frontier (
+                    run_id TEXT,
+                    url_key INTEGER,
+                    url TEXT,
+                    depth INTEGER,
+                    PRIMARY KEY (run_id, url_key)
+                ) WITHOUT ROWID"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS visited (
+                    run_id TEXT,
+                    url_key INTEGER,
+                    PRIMARY KEY (run_id, url_key)
+                ) WITHOUT ROWID"""
+            )
+
+    def _compact(self, url: str) -> str:
+        if self.base_url and url.startswith(self.base_url + "/"):
+            return url[len(self.base_url):]
+        return url
+
+    def _expand(self, url: str) -> str:
+        return self.base_url + url if url.startswith("/") else url
+
+    def start_run(self, resume: bool = True) -> Tuple[str, bool]:
+        """Return `(run_id, resumed)`: the last unfinished run if resuming, otherwise a new run"""
+        with self._lock, self._conn:
+            row = None
+            if resume:
+                row = self._conn.execute(
+                    "SELECT run_id FROM runs WHERE status = 'running' ORDER BY started_at DESC LIMIT 1"
+                ).fetchone()
+            if row is not None:
+                self.run_id = row["run_id"]
+                return self.run_id, True
+            # Abandoned runs are closed so their checkpoints do not linger
+            self._conn.execute("UPDATE runs SET status = 'abandoned' WHERE status = 'running'")
+            self._conn.execute("DELETE FROM frontier")
+            self._conn.execute("DELETE FROM visited")
+            self._conn.execute("DELETE FROM dropped_links")
+            self.run_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO runs (run_id, started_at, status) VALUES (?, ?, 'running')",
+                (self.run_id, time.time()),
+            )
+        return self.run_id, False
+
+    def finish_run(self) -> None:
+        """Mark the current run complete (with its number of fetched pages) and drop its checkpoint"""
+        fetched = self.summary(self.run_id)["fetched"]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = 'completed', finished_at = ?, fetched = ? WHERE run_id = ?",
+                (time.time(), fetched, self.run_id),
+            )
+            self._conn.execute("DELETE FROM frontier WHERE run_id = ?", (self.run_id,))
+            self._conn.execute("DELETE FROM visited WHERE run_id = ?", (self.run_id,))
+            self._conn.execute("DELETE FROM dropped_links WHERE run_id = ?", (self.run_id,))
+
+    def previous_run_fetched(self) -> Optional[int]:
+        """Pages fetched by the last completed run before the current one (None if there is none)"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT fetched FROM runs WHERE status = 'completed' AND run_id != ? AND fetched IS NOT NULL
+                   ORDER BY finished_at DESC LIMIT 1""",
+                (self.run_id,),
+            ).fetchone()
+        return row["fetched"] if row else None
+
+    def enqueue(self, items: Iterable[Tuple[str, int]]) -> None:
+        """Checkpoint urls added to the frontier (they are visited from now on)"""
+        rows = [(self.run_id, url_key(url), self._compact(url), depth) for url, depth in items]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO frontier VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO visited VALUES (?, ?)", [(run_id, key) for run_id, key, _, _ in rows]
+            )
+
+    def pending(self) -> List[Tuple[str, int]]:
+        """Frontier urls of the current run that were not finished, shallowest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, depth FROM frontier WHERE run_id = ? ORDER BY depth", (self.run_id,)
+            ).fetchall()
+        return [(self._expand(row["url"]), row["depth"]) for row in rows]
+
+    def visited_keys(self) -> Set[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url_key FROM visited WHERE run_id = ?", (self.run_id,)).fetchall()
+        return {row["url_key"] for row in rows}
+
+    def finish(self, url: str, status: str, error: Optional[BaseException] = None, stage: str = "") -> None:
+        """Record a url's outcome in the current run and take it off the frontier.
+
+        A failed url still counts as seen so a transient error does not tombstone the page, unless
+        the server said it is gone (404/410); its status is then GONE rather than FAILED.
+        """
+        http_status = getattr(getattr(error, "response", None), "status_code", None)
+        seen = http_status not in (404, 410)
+        if not seen and status == FAILED:
+            status = GONE
+        if error is not None:
+            error = f"{stage}: {error}" if stage else str(error)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO pages (url, last_seen_run, updated_at, status, status_run, last_error)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       last_seen_run = COALESCE(excluded.last_seen_run, pages.last_seen_run),
+                       updated_at = excluded.updated_at,
+                       status = excluded.status,
+                       status_run = excluded.status_run,
+                       last_error = excluded.last_error""",
+                (url, self.run_id if seen else None, time.time(), status, self.run_id, error),
+            )
+            self._conn.execute("DELETE FROM frontier WHERE run_id = ? AND url_key = ?", (self.run_id, url_key(url)))
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM pages WHERE url = ? AND tombstoned = 0", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        page = dict(row)
+        page["links"] = json.loads(page["links"] or "[]")
+        return page
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers that let the server answer 304 Not Modified for an unchanged page"""
+        page = self.get(url)
+        headers = {}
+        if page and page["etag"]:
+            headers["If-None-Match"] = page["etag"]
+        if page and page["last_modified"]:
+            headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def record_page(
+        self,
+        url: str,
+        run_id: str,
+        content_hash: str,
+        links: List[str],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Remember an indexed page; this also completes the url in the run's checkpoint"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT links FROM pages WHERE url = ?", (url,)).fetchone()
+            dropped = set(json.loads(row["links"] or "[]")) - set(links) if row is not None else set()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO dropped_links VALUES (?, ?)", [(run_id, link) for link in dropped]
+            )
+            self._conn.execute(
+                """INSERT INTO pages (url, etag, last_modified, content_hash, links, last_seen_run, updated_at,
+                                      tombstoned, status, status_run, last_error)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, NULL)
+                   ON CONFLICT(url) DO UPDATE SET
+                       etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       content_hash = excluded.content_hash,
+                       links = excluded.links,
+                       last_seen_run = excluded.last_seen_run,
+                       updated_at = excluded.updated_at,
+                       tombstoned = 0,
+                       status = excluded.status,
+                       status_run = excluded.status_run,
+                       last_error = NULL""",
+                (url, etag, last_modified, content_hash, json.dumps(links), run_id, time.time(), INDEXED, run_id),
+            )
+            self._conn.execute("DELETE FROM frontier WHERE run_id = ? AND url_key = ?", (run_id, url_key(url)))
+
+    def mark_seen(self, url: str, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE pages SET last_seen_run = ? WHERE url = ?", (run_id, url))
+
+    def invalidate(self, url: str) -> None:
+        """Forget a page's validators and content hash before its chunks are replaced, so a crawl
+        interrupted before the new chunks are written fetches and indexes the page again"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET etag = NULL, last_modified = NULL, content_hash = NULL WHERE url = ?", (url,)
+            )
+
+    def can_remove(self, run_id: str, min_share: float) -> bool:
+        """Whether the run is complete enough to tombstone pages: no failed fetches and at least
+        `min_share` of the pages the previous completed run fetched"""
+        report = self.summary(run_id)
+        previous = self.previous_run_fetched()
+        return not report[FAILED] and not (previous and report["fetched"] < min_share * previous)
+
+    def urls_to_remove(self, run_id: str) -> List[str]:
+        """Live pages the given run did not reach and has evidence were removed from the site: the
+        server answered 404/410, or a parent fetched in the run dropped its link to them.
+
+        Pages that were merely not reached (e.g. their parent failed to load) are kept.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT url FROM pages
+                   WHERE tombstoned = 0 AND (last_seen_run IS NULL OR last_seen_run != ?)
+                     AND ((status_run = ? AND status = ?)
+                          OR url IN (SELECT url FROM dropped_links WHERE run_id = ?))""",
+                (run_id, run_id, GONE, run_id),
+            ).fetchall()
+        return [row["url"] for row in rows]
+
+    def urls_for_run(self, run_id: str) -> List[str]:
+        """Urls the given run has finished, whatever their status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM pages WHERE status_run = ?", (run_id,)).fetchall()
+        return [row["url"] for row in rows]
+
+    def tombstone(self, urls: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE pages SET tombstoned = 1, updated_at = ? WHERE url = ?",
+                [(time.time(), url) for url in urls],
+            )
+
+    def summary(self, run_id: Optional[str] = None) -> Dict:
+        """Report of a run: pages fetched (indexed or unchanged), failed, gone, still pending, and recent errors"""
+        run_id = run_id or self.run_id
+        with self._lock:
+            run = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM pages WHERE status_run = ? GROUP BY status", (run_id,)
+            ).fetchall())
+            pending = self._conn.execute("SELECT COUNT(*) FROM frontier WHERE run_id = ?", (run_id,)).fetchone()[0]
+            errors = self._conn.execute(
+                "SELECT url, last_error FROM pages WHERE status_run = ? AND status = ? ORDER BY updated_at DESC LIMIT 20",
+                (run_id, FAILED),
+            ).fetchall()
+        return {
+            "run_id": run_id,
+            "status": run["status"] if run else None,
+            "started_at": run["started_at"] if run else None,
+            "finished_at": run["finished_at"] if run else None,
+            "fetched": counts.get(INDEXED, 0) + counts.get(SKIPPED, 0),
+            INDEXED: counts.get(INDEXED, 0),
+            SKIPPED: counts.get(SKIPPED, 0),
+            FAILED: counts.get(FAILED, 0),
+            GONE: counts.get(GONE, 0),
+            PENDING: pending,
+            "errors": {row["url"]: row["last_error"] for row in errors},
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
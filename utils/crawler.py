@@ -0,0 +1,198 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from utils.crawl_state import FAILED, SKIPPED, VisitedSet
+from utils.http_client import create_session
+
+_STOP = object()
+
+
+class HostRateLimiter:
+    """Per-host politeness: requests to the same host are spaced at least `min_interval` seconds apart"""
+
+    def __init__(self, min_interval: float = 0.25):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CrawlEngine:
+    """Breadth-first crawler with a bounded pool of concurrent fetchers.
+
+    Pages flow through separate stages so a slow stage does not hold up the others:
+        fetch (thread pool, pooled keep-alive session, per-host rate limit, retries)
+        -> parse (thread pool) -> enrich, e.g. OCR (thread pool) -> sink (single writer thread)
+
+    `parse(url, response)` returns `(page, links)`; links are added to the frontier one level deeper
+    as long as the page's depth is below `max_depth`. `enrich(page)` returns the enriched page and
+    `sink(page)` stores it. Returning `None` as the page skips the remaining stages for that url
+    (e.g. an unchanged page in an incremental crawl) while its links are still followed.
+
+    `request_headers(url)` can add per-url request headers such as conditional-GET validators;
+    a 304 Not Modified response is handed to `parse` like any other response. `on_error(url, stage,
+    error)` is called when a url fails in any stage.
+
+    With a `checkpoint` (e.g. a `CrawlStateStore` after `start_run`) every url added to the frontier
+    is recorded with `checkpoint.enqueue(items)`, and failed or skipped urls are completed with
+    `checkpoint.finish(url, status, error, stage)`. Pages handed to the sink are completed by the sink once
+    they are durably stored. `crawl(..., pending=...)` resumes from a saved frontier.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[str, requests.Response], Tuple[Any, List[str]]],
+        sink: Callable[[Any], None],
+        enrich: Optional[Callable[[Any], Any]] = None,
+        max_depth: int = 2,
+        fetch_workers: int = 8,
+        parse_workers: int = 2,
+        enrich_workers: int = 4,
+        min_host_interval: float = 0.25,
+        timeout: float = 15,
+        session: Optional[requests.Session] = None,
+        should_follow: Optional[Callable[[str], bool]] = None,
+        request_headers: Optional[Callable[[str], Dict[str, str]]] = None,
+        on_error: Optional[Callable[[str, str, Exception], None]] = None,
+        checkpoint=None,
+    ):
+        self.parse = parse
+        self.sink = sink
+        self.enrich = enrich
+        self.max_depth = max_depth
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.enrich_workers = enrich_workers
+        self.timeout = timeout
+        self.session = session or create_session(pool_size=fetch_workers)
+        self.rate_limiter = HostRateLimiter(min_host_interval)
+        self.should_follow = should_follow or (lambda url: True)
+        self.request_headers = request_headers
+        self.on_error = on_error
+        self.checkpoint = checkpoint
+        self.seen = VisitedSet()
+        self.stats = {"fetched": 0, "failed": 0, "parsed": 0, "skipped": 0, "stored": 0}
+
+    def fetch(self, url: str) -> requests.Response:
+        self.rate_limiter.wait(url)
+        headers = self.request_headers(url) if self.request_headers else None
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def _write(self, sink_queue: "queue.Queue") -> None:
+        while True:
+            page = sink_queue.get()
+            if page is _STOP:
+                return
+            try:
+                self.sink(page)
+                self.stats["stored"] += 1
+            except Exception as e:
+                url = page.get("url") if isinstance(page, dict) else None
+                logging.error(f"Failed to store page {url}: {e}")
+                self.stats["failed"] += 1
+                if self.on_error is not None:
+                    self.on_error(url, "store", e)
+                if self.checkpoint is not None and url:
+                    self.checkpoint.finish(url, FAILED, e, stage="store")
+
+    def _enqueue(self, frontier: deque, items: List[Tuple[str, int]]) -> None:
+        for url, _ in items:
+            self.seen.add(url)
+        if self.checkpoint is not None:
+            self.checkpoint.enqueue(items)
+        frontier.extend(items)
+
+    def crawl(
+        self, start_urls: Iterable[str], pending: Optional[List[Tuple[str, int]]] = None
+    ) -> Dict[str, float]:
+        """Crawl from the start urls until the frontier is exhausted and return crawl statistics.
+
+        `pending` is the `(url, depth)` frontier of an interrupted run; when given, the start urls
+        are only crawled if they were never visited.
+        """
+        started = time.monotonic()
+        frontier = deque(pending or [])
+        self._enqueue(frontier, [(url, 0) for url in dict.fromkeys(start_urls) if url not in self.seen])
+
+        sink_queue: "queue.Queue" = queue.Queue()
+        writer = threading.Thread(target=self._write, args=(sink_queue,), name="crawl-writer", daemon=True)
+        writer.start()
+
+        inflight = {}  # future -> (stage, url, depth)
+        fetching = 0
+        with ThreadPoolExecutor(self.fetch_workers, thread_name_prefix="crawl-fetch") as fetch_pool, \
+                ThreadPoolExecutor(self.parse_workers, thread_name_prefix="crawl-parse") as parse_pool, \
+                ThreadPoolExecutor(self.enrich_workers, thread_name_prefix="crawl-enrich") as enrich_pool:
+            while frontier or inflight:
+                # Keep every fetcher busy, plus a small backlog so a finished fetch is replaced immediately
+                while frontier and fetching < self.fetch_workers * 2:
+                    url, depth = frontier.popleft()
+                    inflight[fetch_pool.submit(self.fetch, url)] = ("fetch", url, depth)
+                    fetching += 1
+
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, url, depth = inflight.pop(future)
+                    if stage == "fetch":
+                        fetching -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        logging.error(f"Failed to {stage} {url}: {e}")
+                        if self.on_error is not None:
+                            self.on_error(url, stage, e)
+                        if self.checkpoint is not None:
+                            self.checkpoint.finish(url, FAILED, e, stage=stage)
+                        continue
+
+                    if stage == "fetch":
+                        self.stats["fetched"] += 1
+                        inflight[parse_pool.submit(self.parse, url, result)] = ("parse", url, depth)
+                    elif stage == "parse":
+                        self.stats["parsed"] += 1
+                        page, links = result
+                        if depth < self.max_depth:
+                            new_links = [
+                                link for link in dict.fromkeys(links)
+                                if link not in self.seen and self.should_follow(link)
+                            ]
+                            self._enqueue(frontier, [(link, depth + 1) for link in new_links])
+                        if page is None:
+                            self.stats["skipped"] += 1
+                            if self.checkpoint is not None:
+                                self.checkpoint.finish(url, SKIPPED)
+                            continue
+                        if self.enrich is not None:
+                            inflight[enrich_pool.submit(self.enrich, page)] = ("enrich", url, depth)
+                        else:
+                            sink_queue.put(page)
+                    elif result is not None:
+                        sink_queue.put(result)
+                    elif self.checkpoint is not None:
+                        self.checkpoint.finish(url, SKIPPED)
+
+        sink_queue.put(_STOP)
+        writer.join()
+
+        elapsed = time.monotonic() - started
+        stats = dict(self.stats)
+        stats["elapsed_s"] = elapsed
+        stats["pages_per_s"] = stats["fetched"] / elapsed if elapsed else 0.0
+        return stats
@@ -0,0 +1,186 @@
+import codecs
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import requests
+
+# Text blocks kept as sections, and the headings among them
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "li"}
+HEADING_TAGS = {"h1", "h2", "h3"}
+LIST_TAGS = {"ul", "ol"}
+# Subtrees dropped entirely: code, and site chrome repeated on every page
+SKIP_TAGS = {"script", "style", "noscript", "template", "footer", "nav", "header"}
+SKIP_CLASSES = {"footer", "navigation", "site-info", "legal-info", "copyright", "menu", "site-header"}
+SKIP_IDS = {"footer", "navigation"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class HTMLExtractor(HTMLParser):
+    """Single-pass extractor for page text, sections, links and images.
+
+    Feed it markup incrementally; boilerplate subtrees are skipped as they stream past, so no tree
+    is built. `sections` holds `(heading, text)` for every p/h1/h2/h3/li block (text of nested
+    blocks belongs to the innermost one), `text()` all visible text. Once `max_chars` of visible
+    text has been seen `done` is set and further input is ignored.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, strip_phrases: Sequence[str] = ()):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.strip_phrases = strip_phrases
+        self.sections: List[Tuple[str, str]] = []
+        self.links: List[str] = []
+        self.images: List[str] = []
+        self.chars = 0
+        self.done = False
+        self._parts: List[str] = []
+        self._heading = ""
+        # Open blocks as [tag, list depth when opened, text parts]
+        self._blocks: List[list] = []
+        self._list_depth = 0
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+
+    def _is_boilerplate(self, tag: str, attrs: dict) -> bool:
+        if tag in SKIP_TAGS:
+            return True
+        classes = set((attrs.get("class") or "").split())
+        return bool(classes & SKIP_CLASSES) or attrs.get("id") in SKIP_IDS
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+        if tag not in VOID_TAGS and self._is_boilerplate(tag, attrs):
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+
+        if tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+        elif tag == "img":
+            self.images.append(attrs.get("src") or "")
+        elif tag in LIST_TAGS:
+            self._list_depth += 1
+        elif tag in BLOCK_TAGS:
+            # Unclosed <p> and <li> end where the next one starts
+            if self._blocks and (
+                (tag != "li" and self._blocks[-1][0] == "p")
+                or (tag == "li" and self._blocks[-1][0] == "li" and self._blocks[-1][1] == self._list_depth)
+            ):
+                self._close_block()
+            self._blocks.append([tag, self._list_depth, []])
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags have no content to open a block or skipped subtree for
+        if tag in ("a", "img"):
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag in LIST_TAGS:
+            # Close any list items left open inside the list
+            while self._blocks and self._blocks[-1][0] == "li" and self._blocks[-1][1] == self._list_depth:
+                self._close_block()
+            self._list_depth = max(0, self._list_depth - 1)
+        elif tag in BLOCK_TAGS and any(block[0] == tag for block in self._blocks):
+            while self._blocks:
+                if self._close_block() == tag:
+                    break
+
+    def handle_data(self, data):
+        if self.done or self._skip_tag is not None:
+            return
+        text = data.strip()
+        if not text:
+            return
+        self._parts.append(text)
+        if self._blocks:
+            self._blocks[-1][2].append(text)
+        self.chars += len(text)
+        if self.max_chars is not None and self.chars >= self.max_chars:
+            self.done = True
+
+    def _close_block(self) -> str:
+        tag, _, parts = self._blocks.pop()
+        text = " ".join(" ".join(parts).split())
+        for phrase in self.strip_phrases:
+            text = text.replace(phrase, "")
+        text = text.strip()
+        if tag in HEADING_TAGS:
+            self._heading = text
+        if text:
+            self.sections.append((self._heading, text))
+        return tag
+
+    def close(self):
+        super().close()
+        while self._blocks:
+            self._close_block()
+
+    def text(self) -> str:
+        return " ".join(" ".join(self._parts).split())
+
+
+def extract_html(
+    source: Union[str, bytes, Iterable[bytes]],
+    max_bytes: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    encoding: str = "utf-8",
+    strip_phrases: Sequence[str] = (),
+    chunk_size: int = 16384,
+) -> HTMLExtractor:
+    """Extract a page from markup or an iterable of byte chunks, reading at most `max_bytes` and
+    stopping once `max_chars` of text have been found"""
+    if isinstance(source, str):
+        source = source.encode(encoding)
+    if isinstance(source, bytes):
+        body = source
+        source = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    extractor = HTMLExtractor(max_chars=max_chars, strip_phrases=strip_phrases)
+    read = 0
+    for chunk in source:
+        if max_bytes is not None and read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done or (max_bytes is not None and read >= max_bytes):
+            break
+    else:
+        extractor.feed(decoder.decode(b"", final=True))
+    extractor.close()
+    return extractor
+
+
+def extract_response(
+    response: requests.Response,
+    max_bytes: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    strip_phrases: Sequence[str] = (),
+) -> HTMLExtractor:
+    """Extract a streamed response (`stream=True`) without downloading more than needed"""
+    try:
+        return extract_html(
+            response.iter_content(chunk_size=16384),
+            max_bytes=max_bytes,
+            max_chars=max_chars,
+            encoding=response.encoding or "utf-8",
+            strip_phrases=strip_phrases,
+        )
+    finally:
+        # Drops the connection if the body was not read to the end
+        response.close()
@@ -0,0 +1,171 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config import settings
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Hop-by-hop and encoding headers no longer describe the stored (already decoded) body
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+
+class HttpArchive:
+    """Recorded HTTP responses and search results kept in a local SQLite file.
+
+    Responses are keyed by method and url; DuckDuckGo results, which do not go through
+    `requests`, are keyed by query and result count.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    method TEXT,
+                    url TEXT,
+                    status INTEGER,
+                    reason TEXT,
+                    headers TEXT,
+                    body BLOB,
+                    recorded_at REAL,
+                    PRIMARY KEY (method, url)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS search_results (
+                    query TEXT,
+                    max_results INTEGER,
+                    results TEXT,
+                    recorded_at REAL,
+                    PRIMARY KEY (query, max_results)
+                )"""
+            )
+
+    def put_response(self, method: str, url: str, response: requests.Response) -> None:
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (method, url, response.status_code, response.reason, json.dumps(headers), response.content, time.time()),
+            )
+
+    def get_response(self, method: str, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, reason, headers, body FROM responses WHERE method = ? AND url = ?", (method, url)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"status": row["status"], "reason": row["reason"], "headers": json.loads(row["headers"]), "body": row["body"]}
+
+    def put_search(self, query: str, max_results: int, results: List[Dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?)",
+                (query, max_results, json.dumps(results), time.time()),
+            )
+
+    def get_search(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results FROM search_results WHERE query = ? AND max_results = ?", (query, max_results)
+            ).fetchone()
+        return json.loads(row["results"]) if row else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Live transport adapter that also writes every full response into the archive"""
+
+    def __init__(self, archive: HttpArchive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # A 304 has no body to replay; keep the full response recorded earlier
+        if response.status_code != 304:
+            self.archive.put_response(request.method, request.url, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves archived responses instead of going to the network.
+
+    Each response is delayed by `latency` seconds plus up to `jitter` seconds, drawn
+    deterministically from the url so replays are repeatable. Conditional requests are answered
+    with 304 when the archived validators match, and urls missing from the archive raise a
+    ConnectionError as an unreachable host would.
+    """
+
+    def __init__(self, archive: HttpArchive, latency: float = 0.0, jitter: float = 0.0):
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        delay = self.latency + self.jitter * random.Random(request.url).random()
+        if delay:
+            time.sleep(delay)
+
+        record = self.archive.get_response(request.method, request.url)
+        if record is None:
+            raise requests.ConnectionError(f"{request.method} {request.url} is not in the HTTP archive", request=request)
+
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.reason = record["reason"]
+        response.headers = CaseInsensitiveDict(record["headers"])
+        response._content = record["body"]
+        response._content_consumed = True
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if (etag and request.headers.get("If-None-Match") == etag) or \
+                (last_modified and request.headers.get("If-Modified-Since") == last_modified):
+            response.status_code, response.reason, response._content = 304, "Not Modified", b""
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+_archive: Optional[HttpArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_http_archive() -> Optional[HttpArchive]:
+    """The process-wide archive when FINGENIE_HTTP_ARCHIVE_MODE is record or replay, otherwise None"""
+    global _archive
+    if settings.HTTP_ARCHIVE_MODE not in (RECORD, REPLAY):
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = HttpArchive(settings.HTTP_ARCHIVE_PATH)
+        return _archive
+
@@ -0,0 +1,44 @@
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import settings
+from utils.http_archive import REPLAY, RecordingAdapter, ReplayAdapter, get_http_archive
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+
+def create_session(
+    pool_size: int = 10,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    headers: Optional[Dict[str, str]] = None,
+) -> requests.Session:
+    """Create a requests session with pooled keep-alive connections and retries with backoff.
+
+    With FINGENIE_HTTP_ARCHIVE_MODE set, responses are recorded into (record) or served from
+    (replay) the local HTTP archive instead.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+    )
+    archive = get_http_archive()
+    if archive is None:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    elif settings.HTTP_ARCHIVE_MODE == REPLAY:
+        adapter = ReplayAdapter(archive, latency=settings.HTTP_ARCHIVE_LATENCY, jitter=settings.HTTP_ARCHIVE_JITTER)
+    else:
+        adapter = RecordingAdapter(archive, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+    return session
@@ -0,0 +1,171 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+
+class IndicatorRecord(NamedTuple):
+    name: str
+    label: str
+    value: float
+    unit: str
+    as_of: Optional[str]
+    source: str
+
+    def format(self) -> str:
+        as_of = f" as of {self.as_of}" if self.as_of else ""
+        return f"{self.label}: {self.value:g}{self.unit}{as_of} (source: {self.source})"
+
+
+MONTHS = {
+    m: i + 1 for i, m in enumerate(
+        ["january", "february", "march", "april", "may", "june", "july",
+         "august", "september", "october", "november", "december"]
+    )
+}
+_MONTH = r"(January|February|March|April|May|June|July|August|September|October|November|December)"
+# A figure followed by "target" is the inflation target, not a reading
+_NUMBER = r"(?<![\d.])(-?\d{1,2}(?:\.\d{1,2})?)\s?(?:%|per ?cent)(?!\s*(?:inflation\s+)?target)"
+# Keep a rule's label and figure within one sentence, skipping figures without a percent sign
+_GAP = r"[^.%]{0,80}?"
+
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{1,2})\s+" + _MONTH + r"\s+(\d{4})\b", re.I), "day"),
+    (re.compile(r"\b" + _MONTH + r"\s+(\d{4})\b", re.I), "month"),
+    (re.compile(r"\b(Q[1-4])\s+(\d{4})\b", re.I), "quarter"),
+    (re.compile(r"\b(\d{4})\s+(Q[1-4])\b", re.I), "year_quarter"),
+]
+
+# name -> (label, query keywords, patterns). A pattern's first group is the figure; words like
+# "fell" or "contracted" before the figure make it negative.
+INDICATOR_RULES = {
+    "bank_rate": (
+        "Bank Rate",
+        ("interest rate", "bank rate", "base rate"),
+        [
+            r"Bank Rate" + _GAP + _NUMBER,
+            r"(?:base|interest) rate" + _GAP + _NUMBER,
+        ],
+    ),
+    "cpi_inflation": (
+        "CPI inflation",
+        ("inflation", "cpi"),
+        [
+            r"\b(?:CPI|Consumer Prices? Index)\b(?! including)" + _GAP + _NUMBER,
+            r"inflation(?: rate)?" + _GAP + _NUMBER,
+        ],
+    ),
+    "unemployment_rate": (
+        "Unemployment rate",
+        ("unemployment", "jobless"),
+        [
+            r"unemployment rate" + _GAP + _NUMBER,
+        ],
+    ),
+    "gdp_growth": (
+        "GDP growth",
+        ("gdp", "gross domestic product", "economic growth"),
+        [
+            r"(?:GDP|gross domestic product)" + _GAP + _NUMBER,
+        ],
+    ),
+}
+COMPILED_RULES = {
+    name: [re.compile(pattern, re.I) for pattern in patterns]
+    for name, (_, _, patterns) in INDICATOR_RULES.items()
+}
+NEGATIVE_WORDS = re.compile(r"\b(fell|fall|falls|contracted|contraction|shrank|decreased|declined)\b", re.I)
+# Official sources win over news sites and search snippets
+PREFERRED_SOURCES = ("bankofengland.co.uk", "ons.gov.uk")
+
+
+def indicators_for_query(query: str) -> List[str]:
+    """Indicator names a search query is about, by keyword"""
+    query = query.lower()
+    return [name for name, (_, keywords, _) in INDICATOR_RULES.items() if any(k in query for k in keywords)]
+
+
+def parse_as_of(text: str) -> Optional[str]:
+    """First date in the text as YYYY-MM-DD, YYYY-MM or YYYY-Qn"""
+    found = []
+    for pattern, kind in DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        if kind == "day":
+            date = f"{match.group(3)}-{MONTHS[match.group(2).lower()]:02d}-{int(match.group(1)):02d}"
+        elif kind == "month":
+            date = f"{match.group(2)}-{MONTHS[match.group(1).lower()]:02d}"
+        elif kind == "quarter":
+            date = f"{match.group(2)}-{match.group(1).upper()}"
+        else:
+            date = f"{match.group(1)}-{match.group(2).upper()}"
+        found.append((match.start(), date))
+    return min(found)[1] if found else None
+
+
+def _sentence_around(text: str, start: int, end: int) -> str:
+    left = max(text.rfind(". ", 0, start), text.rfind("\n", 0, start))
+    right_candidates = [i for i in (text.find(". ", end), text.find("\n", end)) if i != -1]
+    right = min(right_candidates) if right_candidates else len(text)
+    return text[left + 1:right]
+
+
+def extract_indicators(text: str, source: str, names: Optional[List[str]] = None) -> List[IndicatorRecord]:
+    """All indicator figures the rules find in the text, in order of appearance"""
+    records = []
+    for name in names or list(INDICATOR_RULES):
+        label = INDICATOR_RULES[name][0]
+        for pattern in COMPILED_RULES[name]:
+            for match in pattern.finditer(text):
+                value = float(match.group(1))
+                sentence = _sentence_around(text, match.start(), match.end())
+                if value > 0 and NEGATIVE_WORDS.search(text[match.start():match.start(1)]):
+                    value = -value
+                records.append((match.start(), IndicatorRecord(name, label, value, "%", parse_as_of(sentence), source)))
+    return [record for _, record in sorted(records, key=lambda item: item[0])]
+
+
+def source_name(url: Optional[str]) -> str:
+    if not url:
+        return "search snippet"
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def as_of_key(as_of: str) -> str:
+    """Sortable form of an as-of date: a quarter counts as its end month ("2024-Q1" -> "2024-03")"""
+    year, _, period = as_of.partition("-")
+    if period.startswith("Q"):
+        return f"{year}-{int(period[1]) * 3:02d}"
+    return as_of
+
+
+def _rank(record: IndicatorRecord):
+    official = any(record.source.endswith(domain) for domain in PREFERRED_SOURCES)
+    return (official, record.as_of is not None, as_of_key(record.as_of) if record.as_of else "")
+
+
+def best_indicators(records: List[IndicatorRecord]) -> Dict[str, IndicatorRecord]:
+    """One record per indicator: official sources first, then the most recent as-of date"""
+    best: Dict[str, IndicatorRecord] = {}
+    for record in records:
+        current = best.get(record.name)
+        # Ties keep the earlier record, which is the headline figure of its page
+        if current is None or _rank(record) > _rank(current):
+            best[record.name] = record
+    return best
+
+
+def extract_from_results(query: str, search_results: List[Dict], pages: Dict[str, str]) -> Dict[str, IndicatorRecord]:
+    """Indicators a query asks about, from its fetched pages (by url) and its search snippets"""
+    names = indicators_for_query(query)
+    if not names:
+        return {}
+    records = []
+    for result in search_results:
+        link = result.get("href") or result.get("url")
+        if link and pages.get(link):
+            records.extend(extract_indicators(pages[link], source_name(link), names))
+        snippet = f"{result.get('title', '')}. {result.get('body', '')}"
+        records.extend(extract_indicators(snippet, source_name(link) + " (snippet)" if link else "search snippet", names))
+    return best_indicators(records)
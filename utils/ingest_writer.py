@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class IngestWriter:
+    """Buffers chunks and writes them to the collection in large batches.
+
+    Each batch is embedded with one vectorized encoder call (or spread over a pool of encoder
+    processes for full reindexes) and written with a single bulk upsert, together with the
+    matching BM25 index update. Call `flush` at the end of an ingestion run and `close` when done.
+
+    `add` takes an optional `on_written` callback that fires once all of the added chunks have
+    been upserted, which lets callers checkpoint a page only after it is durably stored.
+    """
+
+    def __init__(
+        self,
+        collection,
+        embedding_function: Callable[[List[str]], List],
+        batch_size: int = 64,
+        lexical_index=None,
+        processes: int = 0,
+        model_name: Optional[str] = None,
+    ):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.batch_size = batch_size
+        self.lexical_index = lexical_index
+        self.processes = processes
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._added = 0
+        self._written = 0
+        self._callbacks: List[Tuple[int, Callable[[], None]]] = []
+        self._model = None
+        self._pool = None
+        self._stats = {"docs": 0, "batches": 0, "embed_s": 0.0, "upsert_s": 0.0}
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        on_written: Optional[Callable[[], None]] = None,
+    ) -> None:
+        with self._lock:
+            self._ids.extend(ids)
+            self._documents.extend(documents)
+            self._metadatas.extend(metadatas)
+            self._added += len(ids)
+            if on_written is not None:
+                self._callbacks.append((self._added, on_written))
+            while len(self._ids) >= self.batch_size:
+                self._write_batch(self.batch_size)
+            self._run_callbacks()
+
+    def _run_callbacks(self) -> None:
+        while self._callbacks and self._callbacks[0][0] <= self._written:
+            _, callback = self._callbacks.pop(0)
+            try:
+                callback()
+            except Exception as e:
+                logging.error(f"Ingest callback failed: {e}")
+
+    def flush(self) -> None:
+        with self._lock:
+            while self._ids:
+                self._write_batch(self.batch_size)
+            self._run_callbacks()
+
+    def close(self) -> None:
+        self.flush()
+        if self._pool is not None:
+            self._model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def _embed(self, documents: List[str]) -> List[List[float]]:
+        if self.processes > 1:
+            if self._pool is None:
+                # Full reindexes spread the encoder over several worker processes
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+                self._pool = self._model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            embeddings = self._model.encode_multi_process(documents, self._pool, batch_size=32)
+        else:
+            embeddings = self.embedding_function(documents)
+        return [[float(x) for x in embedding] for embedding in embeddings]
+
+    def _write_batch(self, size: int) -> None:
+        ids, self._ids = self._ids[:size], self._ids[size:]
+        documents, self._documents = self._documents[:size], self._documents[size:]
+        metadatas, self._metadatas = self._metadatas[:size], self._metadatas[size:]
+
+        started = time.perf_counter()
+        embeddings = self._embed(documents)
+        embedded = time.perf_counter()
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        if self.lexical_index is not None:
+            # Keep the BM25 index in sync with the collection
+            self.lexical_index.upsert(ids=ids, documents=documents, metadatas=metadatas)
+        finished = time.perf_counter()
+
+        self._written += len(ids)
+        self._stats["docs"] += len(ids)
+        self._stats["batches"] += 1
+        self._stats["embed_s"] += embedded - started
+        self._stats["upsert_s"] += finished - embedded
+        logging.debug(f"Wrote batch of {len(ids)} chunks in {(finished - started) * 1000:.0f} ms")
+
+    def stats(self) -> Dict[str, float]:
+        """Throughput of the writer: documents per second and average embed/upsert time per batch"""
+        docs, batches = self._stats["docs"], self._stats["batches"]
+        busy = self._stats["embed_s"] + self._stats["upsert_s"]
+        return {
+            "docs": docs,
+            "batches": batches,
+            "docs_per_s": docs / busy if busy else 0.0,
+            "embed_ms_per_batch": self._stats["embed_s"] * 1000 / batches if batches else 0.0,
+            "upsert_ms_per_batch": self._stats["upsert_s"] * 1000 / batches if batches else 0.0,
+        }
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import settings
+
+
+def _usage(value: Any) -> Tuple[int, float]:
+    """Total tokens and cost of a completion object (zero for e.g. plain streamed text)"""
+    tokens = getattr(getattr(value, "usage", None), "total_tokens", None)
+    return tokens or 0, getattr(value, "cost", None) or 0.0
+
+
+class LLMResponseCache:
+    """LLM responses kept in a local SQLite file, shared by every agent of the process.
+
+    It follows autogen's cache protocol (`get`, `set`, used as a context manager), so it can be
+    passed as `cache=` to any OpenAI or Anthropic client; autogen derives the key from the model,
+    messages and sampling parameters. Entries older than `max_age` seconds are not served and the
+    least recently used entries are evicted beyond `max_entries`. `stats()` reports the hit rate
+    and the tokens and cost the hits saved.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 5000,
+        max_age: float = 7 * 86400,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value BLOB,
+                    tokens INTEGER,
+                    cost REAL,
+                    created_at REAL,
+                    last_access REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.counters = {"hits": 0, "misses": 0, "saved_tokens": 0, "saved_cost": 0.0, "evicted": 0, "expired": 0}
+
+    @staticmethod
+    def _hash(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        now = self.clock()
+        digest = self._hash(key)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, tokens, cost, created_at FROM responses WHERE key = ?", (digest,)
+            ).fetchone()
+            if row is not None and now - row[3] > self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (digest,))
+                self.counters["expired"] += 1
+                row = None
+            if row is None:
+                self.counters["misses"] += 1
+                return default
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, digest))
+            self.counters["hits"] += 1
+            self.counters["saved_tokens"] += row[1] or 0
+            self.counters["saved_cost"] += row[2] or 0.0
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        now = self.clock()
+        tokens, cost = _usage(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (self._hash(key), pickle.dumps(value), tokens, cost, now, now),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+                self.counters["evicted"] += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    # autogen enters and leaves the cache around every lookup; the connection stays open
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedClient:
+    """Wraps an agent's OpenAIWrapper so its completions go through the shared response cache.
+
+    With `cache_creative=False` requests sampled at a non-zero temperature are neither served
+    from nor stored in any cache (including autogen's default one), so creative turns stay fresh.
+    Everything else is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, cache: LLMResponseCache, cache_creative: bool = True):
+        self._client = client
+        self.cache = cache
+        self.cache_creative = cache_creative
+
+    def caches(self, temperature: Optional[float]) -> bool:
+        return self.cache_creative or not temperature
+
+    def create(self, **config: Any):
+        temperature = config.get("temperature", self._temperature())
+        if not self.caches(temperature):
+            config.setdefault("cache_seed", None)
+            config["cache"] = None
+        elif config.get("cache") is None:
+            config["cache"] = self.cache
+        return self._client.create(**config)
+
+    def _temperature(self) -> Optional[float]:
+        configs: List[Dict] = getattr(self._client, "_config_list", None) or [{}]
+        return configs[0].get("temperature")
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+def use_llm_cache(agent, cache_creative: bool = True) -> None:
+    """Route the agent's LLM calls through the shared response cache (no-op when it is disabled)"""
+    cache = get_llm_cache()
+    if cache is None or getattr(agent, "client", None) is None or isinstance(agent.client, CachedClient):
+        return
+    agent.client = CachedClient(agent.client, cache, cache_creative=cache_creative)
+
+
+def streaming_cache_key(config: Dict, messages: List[Dict]) -> str:
+    """Cache key of a streamed completion: model, messages and sampling parameters"""
+    params = {key: config.get(key) for key in ("api_type", "model", "temperature", "max_tokens", "top_p")}
+    return json.dumps({"stream": True, "messages": messages, **params}, sort_keys=True, default=str)
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """The process-wide LLM response cache, or None when it is disabled"""
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(
+                settings.LLM_CACHE_PATH,
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                max_age=settings.LLM_CACHE_MAX_AGE,
+            )
+        return _llm_cache
+
+
+def log_llm_cache_stats() -> None:
+    cache = get_llm_cache()
+    if cache is not None:
+        stats = cache.stats()
+        logging.info(
+            f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"saved {stats['saved_tokens']} tokens (${stats['saved_cost']:.4f})"
+        )
@@ -0,0 +1,72 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Union
+
+
+class MessageEvent(NamedTuple):
+    sender: str
+    recipient: str
+    content: str
+    sent_at: float
+    silent: bool
+
+
+class MessageEventBus:
+    """Delivers every message sent by the tapped agents once to each subscriber, in order.
+
+    Subscribers are called on the sending agent's thread; an error in one is logged and does not
+    reach the agents or the other subscribers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Callable[[MessageEvent], None]] = {}
+        self._ids = itertools.count()
+
+    def subscribe(self, subscriber: Callable[[MessageEvent], None]) -> int:
+        with self._lock:
+            subscription = next(self._ids)
+            self._subscribers[subscription] = subscriber
+        return subscription
+
+    def unsubscribe(self, subscription: int) -> None:
+        with self._lock:
+            self._subscribers.pop(subscription, None)
+
+    def publish(self, event: MessageEvent) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for subscriber in subscribers:
+            try:
+                subscriber(event)
+            except Exception as e:
+                logging.error(f"Message subscriber failed on a message from {event.sender}: {e}")
+
+
+def message_content(message: Union[Dict, str, None]) -> str:
+    """Text of an autogen message, which is either a string or a dict with `content`"""
+    if isinstance(message, dict):
+        message = message.get("content")
+    if isinstance(message, list):
+        # Multimodal content: keep the text parts
+        message = " ".join(part["text"] for part in message if isinstance(part, dict) and part.get("text"))
+    return message or ""
+
+
+def attach_message_tap(agents: List[Any], bus: MessageEventBus) -> None:
+    """Publish every message the agents send on `bus`, via autogen's process_message_before_send hook"""
+
+    def tap(sender, message, recipient, silent):
+        bus.publish(MessageEvent(sender.name, recipient.name, message_content(message), time.time(), bool(silent)))
+        return message
+
+    for agent in agents:
+        agent.register_hook("process_message_before_send", tap)
+
+
+def log_message_event(event: MessageEvent) -> None:
+    """Subscriber that logs the conversation, one line per message"""
+    content = event.content if len(event.content) <= 200 else event.content[:200] + "..."
+    logging.info(f"{event.sender} -> {event.recipient}: {content}")
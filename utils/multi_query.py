@@ -0,0 +1,72 @@
+import re
+from typing import Dict, List, Optional
+
+# A bulleted or numbered list item: "- ...", "* ...", "• ...", "1. ...", "2) ..."
+_LIST_ITEM = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+(.*\S)\s*$")
+
+
+def split_product_needs(text: str, max_needs: int = 6) -> List[str]:
+    """Retrieval queries for a relationship manager's list of customer needs.
+
+    The whole text is the first query (it carries the context); every list item that is not just a
+    heading (e.g. "Product requirements:") becomes a query of its own, up to `max_needs`. Text
+    without at least two such items is returned as the only query.
+    """
+    needs = []
+    for line in text.splitlines():
+        match = _LIST_ITEM.match(line)
+        if match and not match.group(1).endswith(":"):
+            # Markdown emphasis only gets in the way of the embedding and BM25 match
+            needs.append(re.sub(r"[*_`]+", "", match.group(1)).strip())
+    needs = list(dict.fromkeys(need for need in needs if need))[:max_needs]
+    return [text] + needs if len(needs) >= 2 else [text]
+
+
+def merge_query_results(results: Dict[str, List], max_results: Optional[int] = None) -> Dict[str, List]:
+    """Merge the per-query lists of a multi-query Chroma result into one de-duplicated union.
+
+    A document returned for several queries is kept once with its best (smallest) distance, and
+    `query_indices` records which queries retrieved it. The union is ordered by distance.
+    """
+    merged: Dict[str, Dict] = {}
+    n_queries = len(results.get("ids") or [])
+    for query_index in range(n_queries):
+        ids = results["ids"][query_index]
+        documents = (results.get("documents") or [[]] * n_queries)[query_index] or [None] * len(ids)
+        metadatas = (results.get("metadatas") or [[]] * n_queries)[query_index] or [None] * len(ids)
+        distances = (results.get("distances") or [[]] * n_queries)[query_index] or [0.0] * len(ids)
+        for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances):
+            entry = merged.get(doc_id)
+            if entry is None:
+                merged[doc_id] = {
+                    "document": document,
+                    "metadata": metadata,
+                    "distance": distance,
+                    "query_indices": [query_index],
+                }
+            else:
+                entry["distance"] = min(entry["distance"], distance)
+                entry["query_indices"].append(query_index)
+
+    ranked = sorted(merged.items(), key=lambda item: item[1]["distance"])
+    if max_results is not None:
+        ranked = ranked[:max_results]
+    return {
+        "ids": [doc_id for doc_id, _ in ranked],
+        "documents": [entry["document"] for _, entry in ranked],
+        "metadatas": [entry["metadata"] for _, entry in ranked],
+        "distances": [entry["distance"] for _, entry in ranked],
+        "query_indices": [entry["query_indices"] for _, entry in ranked],
+    }
+
+
+def split_query_results(results: Dict[str, List]) -> List[Dict[str, List]]:
+    """Split a multi-query Chroma result into one single-query result per query"""
+    per_query = []
+    for query_index in range(len(results.get("ids") or [])):
+        single = {}
+        for key in ("ids", "documents", "metadatas", "distances", "embeddings"):
+            value = results.get(key)
+            single[key] = [value[query_index]] if value else value
+        per_query.append(single)
+    return per_query
@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional
+from PIL import Image
+import pytesseract
+import requests
+
+
+def _init_ocr_worker(tesseract_cmd: Optional[str]) -> None:
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _ocr_image(data: bytes, timeout: float) -> str:
+    """Runs in a worker process; tesseract is killed if it exceeds the timeout"""
+    img = Image.open(BytesIO(data))
+    return pytesseract.image_to_string(img, timeout=timeout)
+
+
+class OCRCache:
+    """Persistent OCR results keyed by image content hash, plus each url's last content hash and
+    its validators (ETag, Last-Modified) for revalidating the url"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results (content_hash TEXT PRIMARY KEY, text TEXT, created_at REAL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS image_urls (url TEXT PRIMARY KEY, content_hash TEXT)")
+            # Cache files written before urls were revalidated lack the validator columns
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(image_urls)")}
+            for column in ("etag", "last_modified"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE image_urls ADD COLUMN {column} TEXT")
+
+    def lookup_url(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """The url's cached text and the validators it was served with, if its text is known"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT r.text, u.etag, u.last_modified FROM image_urls u
+                   JOIN ocr_results r ON r.content_hash = u.content_hash WHERE u.url = ?""",
+                (url,),
+            ).fetchone()
+        return {"text": row[0], "etag": row[1], "last_modified": row[2]} if row else None
+
+    def text_for_hash(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM ocr_results WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        url: str,
+        content_hash: str,
+        text: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            if text is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ocr_results (content_hash, text, created_at) VALUES (?, ?, ?)",
+                    (content_hash, text, time.time()),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_urls (url, content_hash, etag, last_modified) VALUES (?, ?, ?, ?)",
+                (url, content_hash, etag, last_modified),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OCRPipeline:
+    """OCR stage for crawled product images.
+
+    OCR results are cached by image content hash. A known url is revalidated with a conditional
+    GET, so an image replaced at the same url (e.g. a new rate banner) is OCR'd again while an
+    unchanged one costs a 304. Images too small to carry useful text are skipped, and the remaining
+    ones are OCR'd in a process pool with a per-image timeout. Concurrent requests for the same
+    image share one OCR job.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        cache_path: str,
+        processes: Optional[int] = None,
+        min_bytes: int = 2048,
+        min_side: int = 64,
+        timeout: float = 20,
+        request_timeout: float = 15,
+        tesseract_cmd: Optional[str] = None,
+    ):
+        self.session = session
+        self.cache = OCRCache(cache_path)
+        self.min_bytes = min_bytes
+        self.min_side = min_side
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes or os.cpu_count(),
+            initializer=_init_ocr_worker,
+            initargs=(tesseract_cmd,),
+        )
+        self._download_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ocr-download")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"url_hits": 0, "hash_hits": 0, "skipped": 0, "ocr": 0, "failed": 0}
+
+    def is_too_small(self, data: bytes) -> bool:
+        if len(data) < self.min_bytes:
+            return True
+        # Only the header is read here, the image is not decoded
+        width, height = Image.open(BytesIO(data)).size
+        return min(width, height) < self.min_side
+
+    def extract(self, img_url: str) -> str:
+        """Return the text in an image, running OCR only for image contents not seen before"""
+        known = self.cache.lookup_url(img_url)
+        headers = {}
+        if known is not None and known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known is not None and known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        try:
+            response = self.session.get(img_url, headers=headers, timeout=self.request_timeout)
+            if known is not None and response.status_code == 304:
+                self.stats["url_hits"] += 1
+                return known["text"]
+            response.raise_for_status()
+            data = response.content
+            content_hash = hashlib.sha256(data).hexdigest()
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+
+            text = self.cache.text_for_hash(content_hash)
+            if text is not None:
+                # Unchanged image, or the same logo or banner served from another url
+                self.stats["hash_hits"] += 1
+                self.cache.put(img_url, content_hash, **validators)
+                return text
+
+            if self.is_too_small(data):
+                self.stats["skipped"] += 1
+                self.cache.put(img_url, content_hash, "", **validators)
+                return ""
+
+            with self._lock:
+                future = self._inflight.get(content_hash)
+                if future is None:
+                    future = self._pool.submit(_ocr_image, data, self.timeout)
+                    self._inflight[content_hash] = future
+                    self.stats["ocr"] += 1
+            try:
+                text = future.result(timeout=self.timeout + 5)
+                self.cache.put(img_url, content_hash, text, **validators)
+            finally:
+                with self._lock:
+                    self._inflight.pop(content_hash, None)
+            return text
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.warning(f"Failed to extract text from image {img_url}: {e}")
+            return ""
+
+    def extract_many(self, img_urls: List[str]) -> List[str]:
+        """OCR a page's images concurrently, each distinct url once"""
+        return list(self._download_pool.map(self.extract, dict.fromkeys(img_urls)))
+
+    def close(self) -> None:
+        self._download_pool.shutdown()
+        self._pool.shutdown()
+        self.cache.close()
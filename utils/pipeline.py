@@ -0,0 +1,151 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+
+class Stage:
+    """A pipeline step: `func` is called with the outputs of the stages named in `inputs` as
+    keyword arguments, and its return value becomes this stage's output"""
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={list(self.inputs)})"
+
+
+class StageError(RuntimeError):
+    """Raised by `PipelineExecutor.run` when a stage fails; the original error is the cause"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage {stage!r} failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class PipelineCancelled(RuntimeError):
+    """Raised by `PipelineExecutor.run` when its `cancelled` check turned true before all stages ran"""
+
+
+class PipelineExecutor:
+    """Runs stages in dependency order on a thread pool, each as soon as all its inputs are ready.
+
+    Independent stages run concurrently, so a run takes about as long as its critical path rather
+    than the sum of its stages. Stages run in a copy of the caller's context (e.g. its event sink).
+    `timings` holds `(start, end)` offsets in seconds of every stage of the last run.
+    """
+
+    def __init__(self, stages: Iterable[Stage], max_workers: int = 4):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        self.max_workers = max_workers
+        self.timings: Dict[str, tuple] = {}
+        self._check_graph()
+
+    def _check_graph(self) -> None:
+        for stage in self.stages.values():
+            for name in stage.inputs:
+                if name not in self.stages:
+                    raise ValueError(f"Stage {stage.name!r} depends on unknown stage {name!r}")
+        # Depth-first search for cycles
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dep in self.stages[name].inputs:
+                visit(dep, path + [name])
+            state[name] = 2
+
+        for name in self.stages:
+            visit(name, [])
+
+    def required(self, targets: Iterable[str], provided: Iterable[str] = ()) -> Set[str]:
+        """Stages that must run to produce `targets` when the `provided` outputs are given"""
+        provided = set(provided)
+        needed: Set[str] = set()
+        todo = [name for name in targets if name not in provided]
+        while todo:
+            name = todo.pop()
+            if name in needed:
+                continue
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name!r}")
+            needed.add(name)
+            todo.extend(dep for dep in self.stages[name].inputs if dep not in provided)
+        return needed
+
+    def run(
+        self,
+        targets: Optional[Iterable[str]] = None,
+        provided: Optional[Dict[str, Any]] = None,
+        on_stage: Optional[Callable[[str, str], None]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """Run the stages needed for `targets` (default: all) and return every output by stage name.
+
+        `provided` supplies outputs up front; those stages are not run. `on_stage(name, status)` is
+        called when a stage is started, finished or failed. The first failing stage raises
+        `StageError` once the stages already running have finished; nothing new is started.
+        `cancelled()` is checked before stages are started; once it is true the run stops the same
+        way and raises `PipelineCancelled`.
+        """
+        outputs: Dict[str, Any] = dict(provided or {})
+        todo = self.required(self.stages if targets is None else targets, outputs)
+        self.timings = {}
+        started = time.monotonic()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as pool:
+            while todo or running:
+                if todo and cancelled is not None and cancelled():
+                    for future in running:
+                        future.cancel()
+                    raise PipelineCancelled(f"Pipeline cancelled before {', '.join(sorted(todo))}")
+                for name in sorted(todo):
+                    stage = self.stages[name]
+                    if all(dep in outputs for dep in stage.inputs):
+                        todo.discard(name)
+                        kwargs = {dep: outputs[dep] for dep in stage.inputs}
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, self._call, stage, kwargs, started, on_stage)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                failed = None
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except Exception as e:
+                        failed = failed or StageError(name, e)
+                if failed is not None:
+                    for future in running:
+                        future.cancel()
+                    raise failed from failed.error
+        logging.info(
+            f"Pipeline finished in {time.monotonic() - started:.2f}s: "
+            + ", ".join(f"{name} {end - start:.2f}s" for name, (start, end) in self.timings.items())
+        )
+        return outputs
+
+    def _call(self, stage: Stage, kwargs: Dict[str, Any], started: float, on_stage=None) -> Any:
+        start = time.monotonic() - started
+        status = "failed"
+        if on_stage is not None:
+            on_stage(stage.name, "started")
+        try:
+            output = stage.func(**kwargs)
+            status = "finished"
+            return output
+        finally:
+            self.timings[stage.name] = (start, time.monotonic() - started)
+            if on_stage is not None:
+                on_stage(stage.name, status)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different summaries share a cache entry"""
+    return " ".join(text.lower().split())
+
+
+class LRUCache:
+    """Thread-safe LRU cache with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class EmbeddingCache(LRUCache):
+    """First level: normalized query text -> embedding, optionally persisted to a JSON file"""
+
+    def __init__(self, maxsize: int = 2048, path: Optional[str] = None):
+        super().__init__(maxsize)
+        self.path = path
+        if path and os.path.exists(path):
+            self.load()
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        return self.get(normalize_query(text))
+
+    def put_embedding(self, text: str, embedding: Sequence[float]) -> None:
+        self.put(normalize_query(text), [float(x) for x in embedding])
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load embedding cache from {self.path}: {e}")
+            return
+        with self._lock:
+            for text, embedding in entries[-self.maxsize:]:
+                self._data[text] = embedding
+
+    def save(self) -> None:
+        """Write the cache to disk, least recently used first, so a reload keeps the LRU order"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._data.items())
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def embedding_key(embedding: Sequence[float]) -> str:
+    """Stable digest of an embedding vector"""
+    return hashlib.sha1(struct.pack(f"{len(embedding)}f", *embedding)).hexdigest()
+
+
+class ResultCache(LRUCache):
+    """Second level: (embedding, n_results, filter) -> single-query result, tied to a collection version.
+
+    When the collection version changes (the collection was re-ingested) every entry is dropped.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__(maxsize)
+        self.version: Optional[str] = None
+
+    def sync_version(self, version: Optional[str]) -> None:
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._data.clear()
+
+    @staticmethod
+    def make_key(embedding: Sequence[float], n_results: int, search_string: str = "", **filters) -> str:
+        filter_part = json.dumps({"search_string": search_string, **filters}, sort_keys=True, default=str)
+        return f"{embedding_key(embedding)}:{n_results}:{filter_part}"
+
+
+def _version_path(db_path: str, collection_name: str) -> str:
+    return os.path.join(db_path, f"{collection_name}.version")
+
+
+def read_collection_version(db_path: str, collection_name: str) -> Optional[str]:
+    """Return the version stamp written by the last ingestion, or None if it was never stamped"""
+    try:
+        with open(_version_path(db_path, collection_name), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def bump_collection_version(db_path: str, collection_name: str) -> str:
+    """Stamp the collection with a new version so cached retrieval results are invalidated"""
+    version = uuid.uuid4().hex
+    os.makedirs(db_path, exist_ok=True)
+    path = _version_path(db_path, collection_name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
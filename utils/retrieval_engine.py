@@ -0,0 +1,266 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import chromadb
+from chromadb.utils import embedding_functions
+from config import settings
+from utils.retrieval_cache import EmbeddingCache, ResultCache, read_collection_version
+from utils.bm25_index import BM25Index, reciprocal_rank_fusion
+from utils.multi_query import merge_query_results, split_query_results
+
+RESULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+
+class RetrievalEngine:
+    """Keeps a ChromaDB client, collection handle and embedding model warm for one collection.
+
+    Everything is loaded lazily on first use (or eagerly with `warm_up`) and then shared by every
+    agent and request in the process. Use `get_retrieval_engine` instead of constructing this directly.
+
+    Queries go through two caches: normalized query text -> embedding, and
+    (embedding, n_results, filter) -> results. The result cache is dropped whenever the collection's
+    version stamp changes, i.e. after a re-ingestion.
+
+    `hybrid_query` additionally ranks the documents with an in-process BM25 index and fuses both
+    rankings with reciprocal-rank fusion, so exact product names and rate terms are found through
+    an index lookup rather than a `$contains` scan.
+    """
+
+    def __init__(self, db_path: str, collection_name: str, model_name: str):
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.model_name = model_name
+        self._lock = threading.RLock()
+        self._client = None
+        self._embedding_function = None
+        self._collection = None
+
+        embedding_cache_path = None
+        if settings.PERSIST_EMBEDDING_CACHE:
+            embedding_cache_path = os.path.join(settings.CACHE_DIR, "query_embeddings_" + model_name.replace("/", "_") + ".json")
+        self.embedding_cache = EmbeddingCache(maxsize=settings.EMBEDDING_CACHE_SIZE, path=embedding_cache_path)
+        self.result_cache = ResultCache(maxsize=settings.RESULT_CACHE_SIZE)
+        self._lexical_index = None
+        self._lexical_index_version = None
+        if embedding_cache_path:
+            atexit.register(self.save_caches)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = chromadb.PersistentClient(path=self.db_path)
+        return self._client
+
+    @property
+    def embedding_function(self):
+        if self._embedding_function is None:
+            with self._lock:
+                if self._embedding_function is None:
+                    self._embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                        model_name=self.model_name
+                    )
+        return self._embedding_function
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    # Use the same embedding function the collection is built with during ingestion
+                    self._collection = self.client.get_or_create_collection(
+                        name=self.collection_name,
+                        embedding_function=self.embedding_function
+                    )
+        return self._collection
+
+    @property
+    def lexical_index_path(self) -> str:
+        return os.path.join(self.db_path, f"{self.collection_name}.bm25.json")
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index of the collection, reloaded when the collection version changes"""
+        version = self.collection_version()
+        if self._lexical_index is None or version != self._lexical_index_version:
+            with self._lock:
+                if self._lexical_index is None or version != self._lexical_index_version:
+                    self._lexical_index = self._load_lexical_index()
+                    self._lexical_index_version = version
+        return self._lexical_index
+
+    def _load_lexical_index(self) -> BM25Index:
+        if os.path.exists(self.lexical_index_path):
+            try:
+                return BM25Index.load(self.lexical_index_path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Could not load BM25 index from {self.lexical_index_path}, rebuilding it: {e}")
+        # No saved index yet (e.g. a database built before hybrid retrieval): build it from the collection
+        index = BM25Index()
+        stored = self.collection.get(include=["documents", "metadatas"])
+        index.upsert(stored["ids"], stored["documents"], stored["metadatas"])
+        logging.info(f"Built BM25 index with {len(index)} documents from collection '{self.collection_name}'")
+        return index
+
+    def save_lexical_index(self) -> None:
+        """Persist the BM25 index next to the Chroma database (called after ingestion)"""
+        if self._lexical_index is not None:
+            self._lexical_index.save(self.lexical_index_path)
+
+    def warm_up(self) -> None:
+        """Open the collection and load the embedding model so the first query does not pay for it"""
+        self.collection
+        self.embed(["warm up"])
+        if settings.HYBRID_RETRIEVAL:
+            self.lexical_index
+        logging.info(f"Retrieval engine warmed up for collection '{self.collection_name}' at {self.db_path}")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed query texts with the collection's embedding model, reusing cached embeddings"""
+        embeddings = [self.embedding_cache.get_embedding(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # One vectorized encoder call for everything that was not cached
+            computed = self.embedding_function([texts[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = [float(x) for x in embedding]
+                self.embedding_cache.put_embedding(texts[i], embeddings[i])
+        return embeddings
+
+    def collection_version(self) -> Optional[str]:
+        return read_collection_version(self.db_path, self.collection_name)
+
+    def query(
+        self,
+        query_texts: List[str],
+        n_results: int = 10,
+        search_string: str = "",
+        **kwargs,
+    ) -> Dict[str, List]:
+        """Query the collection with embeddings computed by the shared model"""
+        self.result_cache.sync_version(self.collection_version())
+
+        # the collection's embedding function is always the default one, but we want to use the one we used to create the
+        # collection. So we compute the embeddings ourselves and pass it to the query function.
+        query_embeddings = self.embed(query_texts)
+        keys = [ResultCache.make_key(embedding, n_results, search_string, **kwargs) for embedding in query_embeddings]
+        per_query = [self.result_cache.get(key) for key in keys]
+
+        missing = [i for i, result in enumerate(per_query) if result is None]
+        if missing:
+            results = self.collection.query(
+                query_embeddings=[query_embeddings[i] for i in missing],
+                n_results=n_results,
+                where_document={"$contains": search_string} if search_string else None,  # optional filter
+                **kwargs,
+            )
+            for position, i in enumerate(missing):
+                per_query[i] = {key: results[key][position] if results.get(key) else None for key in RESULT_KEYS}
+                self.result_cache.put(keys[i], per_query[i])
+
+        return {
+            key: [list(result[key]) if result[key] is not None else None for result in per_query]
+            for key in RESULT_KEYS
+        }
+
+    def save_caches(self) -> None:
+        """Persist the query embedding cache"""
+        try:
+            self.embedding_cache.save()
+        except OSError as e:
+            logging.warning(f"Could not save query embedding cache: {e}")
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            "embeddings": self.embedding_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+
+    def hybrid_query(
+        self,
+        query_texts: List[str],
+        n_results: int = 10,
+        search_string: str = "",
+        **kwargs,
+    ) -> Dict[str, List]:
+        """Dense + BM25 retrieval fused with reciprocal-rank fusion.
+
+        `search_string`, if given, is used as the lexical query instead of the query text (and is
+        not applied as a `$contains` filter). The result has the usual Chroma query format; since
+        fused results have no single distance, `distances` holds the negated fusion score so that
+        lower is still better.
+        """
+        candidates = n_results * settings.HYBRID_CANDIDATE_FACTOR
+        dense = self.query(query_texts, n_results=candidates, **kwargs)
+        index = self.lexical_index
+
+        fused_results = {key: [] for key in RESULT_KEYS}
+        for query_index, query_text in enumerate(query_texts):
+            dense_ids = dense["ids"][query_index]
+            lexical_ids = [doc_id for doc_id, _ in index.search(search_string or query_text, candidates)]
+            fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:n_results]
+
+            known = {
+                doc_id: (document, metadata)
+                for doc_id, document, metadata in zip(
+                    dense_ids, dense["documents"][query_index], dense["metadatas"][query_index]
+                )
+            }
+            lexical_only = [doc_id for doc_id, _ in fused if doc_id not in known]
+            if lexical_only:
+                stored = self.collection.get(ids=lexical_only, include=["documents", "metadatas"])
+                for doc_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                    known[doc_id] = (document, metadata)
+
+            fused = [(doc_id, score) for doc_id, score in fused if doc_id in known]
+            fused_results["ids"].append([doc_id for doc_id, _ in fused])
+            fused_results["documents"].append([known[doc_id][0] for doc_id, _ in fused])
+            fused_results["metadatas"].append([known[doc_id][1] for doc_id, _ in fused])
+            fused_results["distances"].append([-score for _, score in fused])
+        return fused_results
+
+    def query_batch(
+        self,
+        query_texts: List[str],
+        n_results: int = 10,
+        search_string: str = "",
+        max_merged: Optional[int] = None,
+        **kwargs,
+    ) -> Dict[str, object]:
+        """Run many queries with one encoder call and one collection query.
+
+        Returns the per-query results (each in the usual single-query Chroma format) and a
+        merged, de-duplicated union of all of them.
+        """
+        query = self.hybrid_query if settings.HYBRID_RETRIEVAL else self.query
+        results = query(query_texts, n_results=n_results, search_string=search_string, **kwargs)
+        return {
+            "per_query": split_query_results(results),
+            "merged": merge_query_results(results, max_results=max_merged),
+        }
+
+
+_engines: Dict[Tuple[str, str, str], RetrievalEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_retrieval_engine(
+    db_path: Optional[str] = None,
+    collection_name: Optional[str] = None,
+    model_name: Optional[str] = None,
+) -> RetrievalEngine:
+    """Return the process-wide engine for a collection, creating it on first use"""
+    key = (
+        db_path or settings.CHROMA_DB_PATH,
+        collection_name or settings.CHROMA_COLLECTION_NAME,
+        model_name or settings.EMBEDDING_MODEL_NAME,
+    )
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = RetrievalEngine(*key)
+            _engines[key] = engine
+    return engine
@@ -1,129 +1,249 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from PIL import Image
-from io import BytesIO
 import pytesseract
 import logging
-from typing import Dict, List
-import chromadb
-from chromadb.utils import embedding_functions
+import hashlib
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.retrieval_engine import get_retrieval_engine
+from utils.retrieval_cache import bump_collection_version
+from utils.chunking import chunk_sections
+from utils.crawler import CrawlEngine
+from utils.html_extract import extract_html
+from utils.http_client import create_session
+from utils.crawl_state import CrawlStateStore, VisitedSet
+from utils.ingest_writer import IngestWriter
+from utils.ocr import OCRPipeline
+from config import settings
+
+if settings.TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
 
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Common footer text patterns to remove
+FOOTER_PATTERNS = [
+    "Barclays Bank UK PLC and Barclays Bank PLC are each authorised",
+    "Protecting Your Money",
+    "Important information",
+    "Privacy policy",
+    "Cookies policy",
+    "Security",
+    "Find us",
+    "Help & FAQs"
+]
 
 class BarclayScraper:
     """Scrapes Barclays website to extract content and structure"""
     
-    def __init__(self):
+    def __init__(self, incremental: bool = True, resume: bool = True):
         self.base_url = "https://www.barclays.co.uk"
-        self.visited = set()
+        # In incremental mode unchanged pages (304 or same content hash) skip parsing, OCR and embedding
+        self.incremental = incremental
+        # An interrupted crawl picks up its saved frontier instead of starting over
+        self.resume = resume
+        self.state = CrawlStateStore(settings.CRAWL_STATE_PATH, base_url=self.base_url)
+        self.run_id = uuid.uuid4().hex
+        self.visited = VisitedSet()
         self.docs_paths = []
+        self.report = {}
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(path="F:/xx/xx/fingenie/data/chromadb")
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-mpnet-base-v2"
+        # One pooled keep-alive session shared by all fetchers
+        self.session = create_session(pool_size=settings.CRAWL_FETCH_WORKERS, headers=self.headers)
+        self.ocr = OCRPipeline(
+            self.session,
+            settings.OCR_CACHE_PATH,
+            processes=settings.OCR_PROCESSES,
+            min_bytes=settings.OCR_MIN_BYTES,
+            min_side=settings.OCR_MIN_SIDE,
+            timeout=settings.OCR_TIMEOUT,
+            request_timeout=settings.CRAWL_TIMEOUT,
+            tesseract_cmd=settings.TESSERACT_CMD
         )
-        # Create or get collection
-        self.collection = self.client.get_or_create_collection(
-            name="barclays_uk_products",
-            embedding_function=self.embedding_function
+        # Share the ChromaDB client, collection and embedding model with the RAG agents
+        self.engine = get_retrieval_engine()
+        self.client = self.engine.client
+        self.embedding_function = self.engine.embedding_function
+        self.collection = self.engine.collection
+        # Chunks are embedded and upserted in batches; full reindexes may use several encoder processes
+        self.writer = IngestWriter(
+            self.collection,
+            self.embedding_function,
+            batch_size=settings.INGEST_BATCH_SIZE,
+            lexical_index=self.engine.lexical_index,
+            processes=0 if incremental else settings.INGEST_EMBED_PROCESSES,
+            model_name=self.engine.model_name
         )
 
     def extract_text_from_image(self, img_url: str) -> str:
-        """Extract text from images using OCR"""
-        try:
-            response = requests.get(img_url, headers=self.headers)
-            img = Image.open(BytesIO(response.content))
-            return pytesseract.image_to_string(img)
-        except Exception as e:
-            logging.warning(f"Failed to extract text from image {img_url}: {e}")
-            return ""
+        """Extract text from images using OCR (cached by url and content hash)"""
+        return self.ocr.extract(img_url)
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional-GET validators from the last crawl (incremental mode only)"""
+        return self.state.conditional_headers(url) if self.incremental else {}
+
+    def parse_page(self, url: str, response: requests.Response) -> Tuple[Optional[Dict], List[str]]:
+        """Parse a fetched page into its text sections, image urls and same-site links.
+
+        Returns no page for a page that has not changed since the last crawl; its links are
+        replayed from the crawl state so the rest of the site is still reached.
+        """
+        stored = self.state.get(url) if self.incremental else None
+        content_hash = None if response.status_code == 304 else hashlib.sha256(response.content).hexdigest()
+        if stored and (response.status_code == 304 or content_hash == stored['content_hash']):
+            self.state.mark_seen(url, self.run_id)
+            return None, self.follow_links(stored['links'])
+
+        # One streaming pass drops navigation, headers, footers and scripts and collects the text
+        # blocks (with the heading each falls under), images and links
+        extracted = extract_html(
+            response.content,
+            max_bytes=settings.HTML_MAX_BYTES,
+            encoding=response.encoding or 'utf-8',
+            strip_phrases=FOOTER_PATTERNS
+        )
+        sections = extracted.sections
+        
+        # Collect images for the OCR stage
+        image_urls = []
+        for src in extracted.images:
+            img_url = urljoin(url, src)
+            if img_url.endswith(('.jpg', '.png', '.jpeg')):
+                image_urls.append(img_url)
+        
+        # Extract links for further scraping
+        site_links = [urljoin(self.base_url, href) for href in extracted.links if href.startswith('/')]
+        
+        page = {
+            'url': url,
+            'sections': sections,
+            'text_content': ' '.join(text for _, text in sections),
+            'image_urls': image_urls,
+            'image_content': '',
+            'links': site_links,
+            'content_hash': content_hash,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        return page, self.follow_links(site_links)
+
+    def follow_links(self, site_links: List[str]) -> List[str]:
+        """Return the links that have not been crawled yet and record their paths"""
+        links = []
+        for full_url in site_links:
+            if full_url not in self.visited: #and self.is_relevant_path(href):
+                self.docs_paths.append(full_url[len(self.base_url):].lstrip('/'))
+                links.append(full_url)
+        return links
+
+    def extract_page_images(self, page: Dict) -> Dict:
+        """OCR stage: extract text from the page's images"""
+        image_content = [img_text for img_text in self.ocr.extract_many(page['image_urls']) if img_text]
+        page['image_content'] = ' '.join(image_content)
+        return page
+
+    def store_page(self, page: Dict) -> None:
+        """Writer stage: add the page to ChromaDB"""
+        run_id = self.run_id
+
+        def record():
+            self.state.record_page(
+                page['url'],
+                run_id,
+                content_hash=page['content_hash'],
+                links=page['links'],
+                etag=page['etag'],
+                last_modified=page['last_modified']
+            )
+
+        # Only remember the page once its chunks are written, so an interrupted crawl re-indexes it
+        image_content = [page['image_content']] if page['image_content'] else []
+        if not self.index_page(page['url'], page['sections'], image_content, on_written=record):
+            record()
+
+    def remove_missing_pages(self) -> List[str]:
+        """Tombstone pages that were removed from the site and delete their chunks.
+
+        Nothing is removed after a run with failed fetches or one that reached clearly fewer pages
+        than the previous run: a page it did not reach may just sit behind a page that failed.
+        """
+        if not self.state.can_remove(self.run_id, settings.CRAWL_MIN_REMOVAL_SHARE):
+            report = self.state.summary(self.run_id)
+            logging.warning(
+                f"Not tombstoning pages: {report['failed']} failed fetches, {report['fetched']} pages "
+                f"fetched (previous run: {self.state.previous_run_fetched()})"
+            )
+            return []
+        removed = self.state.urls_to_remove(self.run_id)
+        for url in removed:
+            self.collection.delete(where={"url": url})
+            self.engine.lexical_index.remove(self.engine.lexical_index.ids_for_url(url))
+        self.state.tombstone(removed)
+        if removed:
+            logging.info(f"Tombstoned {len(removed)} pages that are no longer on the site")
+        return removed
 
     def scrape_page(self, url: str, depth: int = 0) -> Dict[str, str]:
-        """Scrape content from a page and its images"""
-        if depth > 2 or url in self.visited:  # Limit depth to avoid infinite recursion
+        """Scrape and index a single page and its images (use get_site_structure to crawl the site)"""
+        if depth > settings.CRAWL_MAX_DEPTH or url in self.visited:
             return {}
         
         self.visited.add(url)
         try:
-            response = requests.get(url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove navigation, footer and other unwanted elements
-            for element in soup.find_all(['footer', 'nav', 'header']):
-                element.decompose()
-            
-            # Remove elements with specific classes/IDs that contain footer/nav content
-            unwanted_selectors = [
-                'footer', '.footer', '#footer', 
-                'nav', '.navigation', '#navigation',
-                '.site-info', '.legal-info', '.copyright',
-                '.menu', '.site-header'
-            ]
-            for selector in unwanted_selectors:
-                for element in soup.select(selector):
-                    element.decompose()
-            
-            # Extract text content from remaining elements
-            text_content = ' '.join([p.get_text() for p in soup.find_all(['p', 'h1', 'h2', 'h3', 'li'])])
-            
-            # Remove common footer text patterns
-            footer_patterns = [
-                "Barclays Bank UK PLC and Barclays Bank PLC are each authorised",
-                "Protecting Your Money",
-                "Important information",
-                "Privacy policy",
-                "Cookies policy",
-                "Security",
-                "Find us",
-                "Help & FAQs"
-            ]
-            for pattern in footer_patterns:
-                text_content = text_content.replace(pattern, '')
-            
-            # Extract and process images
-            image_content = []
-            for img in soup.find_all('img'):
-                img_url = urljoin(url, img.get('src', ''))
-                if img_url.endswith(('.jpg', '.png', '.jpeg')):
-                    img_text = self.extract_text_from_image(img_url)
-                    if img_text:
-                        image_content.append(img_text)
-            
-            content = {
+            response = self.session.get(url, headers=self.request_headers(url), timeout=settings.CRAWL_TIMEOUT)
+            page, _ = self.parse_page(url, response)
+            if page is None:
+                return {'url': url, 'unchanged': True}
+            page = self.extract_page_images(page)
+            self.store_page(page)
+            self.writer.flush()
+            return {
                 'url': url,
-                'text_content': text_content.strip(),
-                'image_content': ' '.join(image_content)
+                'text_content': page['text_content'].strip(),
+                'image_content': page['image_content']
             }
-            
-            # Add to ChromaDB
-            if text_content or image_content:
-                full_content = text_content + " " + ' '.join(image_content)
-                self.collection.upsert(
-                    documents=[full_content],
-                    metadatas=[{"url": url}],
-                    ids=[url]
-                )
-            
-            # Extract links for further scraping
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href']
-                if href.startswith('/'):
-                    full_url = urljoin(self.base_url, href)
-                    if full_url not in self.visited: #and self.is_relevant_path(href):
-                        self.docs_paths.append(href.lstrip('/'))
-                        self.scrape_page(full_url, depth + 1)
-            
-            return content
-            
         except Exception as e:
             logging.error(f"Failed to scrape {url}: {e}")
             return {}
 
+    def index_page(
+        self,
+        url: str,
+        sections: List[Tuple[str, str]],
+        image_content: List[str],
+        on_written: Optional[Callable[[], None]] = None
+    ) -> int:
+        """Chunk a page and write the chunks to ChromaDB and the BM25 index, replacing older ones"""
+        if image_content:
+            sections = sections + [("Image text", ' '.join(image_content))]
+        chunks = chunk_sections(
+            url,
+            sections,
+            max_tokens=settings.CHUNK_TOKEN_SIZE,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS
+        )
+
+        # A previous ingestion of this page may have produced more chunks (or the whole page as one document).
+        # Until the new chunks are written the page must not look unchanged to a resumed crawl.
+        self.state.invalidate(url)
+        self.collection.delete(where={"url": url})
+        self.engine.lexical_index.remove(self.engine.lexical_index.ids_for_url(url))
+        if not chunks:
+            return 0
+
+        self.writer.add(
+            ids=[chunk["id"] for chunk in chunks],
+            documents=[chunk["document"] for chunk in chunks],
+            metadatas=[chunk["metadata"] for chunk in chunks],
+            on_written=on_written
+        )
+        return len(chunks)
+
     def is_relevant_path(self, path: str) -> bool:
         """Check if the path is relevant for financial products"""
         relevant_keywords = [
@@ -134,28 +254,68 @@ class BarclayScraper:
         return any(keyword in path.lower() for keyword in relevant_keywords)
 
     def get_site_structure(self) -> List[str]:
-        """Get the structure of relevant pages"""
-        self.scrape_page(self.base_url)
+        """Crawl the site breadth-first, indexing every page, and return the discovered paths"""
+        self.run_id, resumed = self.state.start_run(resume=self.resume)
+        pending = None
+        if resumed:
+            self.visited.update(self.state.visited_keys())
+            pending = self.state.pending()
+            self.docs_paths.extend(url[len(self.base_url):].lstrip('/') for url in self.state.urls_for_run(self.run_id))
+            logging.info(f"Resuming crawl {self.run_id}: {len(pending)} pending, {len(self.visited)} visited")
+
+        crawler = CrawlEngine(
+            parse=self.parse_page,
+            enrich=self.extract_page_images,
+            sink=self.store_page,
+            max_depth=settings.CRAWL_MAX_DEPTH,
+            fetch_workers=settings.CRAWL_FETCH_WORKERS,
+            min_host_interval=settings.CRAWL_MIN_HOST_INTERVAL,
+            timeout=settings.CRAWL_TIMEOUT,
+            session=self.session,
+            request_headers=self.request_headers,
+            checkpoint=self.state
+        )
+        # Share the visited set so links already crawled are not queued again
+        crawler.seen = self.visited
+        stats = crawler.crawl([self.base_url], pending=pending)
+        self.writer.close()
+        self.ocr.close()
+        stats['removed'] = len(self.remove_missing_pages())
+        self.state.finish_run()
+        self.report = self.state.summary(self.run_id)
+        logging.info(f"Crawl finished: {stats}")
+        logging.info(
+            f"Run {self.run_id}: {self.report['fetched']} fetched ({self.report['indexed']} indexed, "
+            f"{self.report['skipped']} unchanged), {self.report['failed']} failed"
+        )
+        logging.info(f"Ingestion throughput: {self.writer.stats()}")
+        logging.info(f"OCR: {self.ocr.stats}")
+        if stats['stored'] or stats['removed']:
+            self.engine.save_lexical_index()
+            # New version stamp so cached retrieval results from the old content are dropped
+            bump_collection_version(self.engine.db_path, self.engine.collection_name)
         return list(set(self.docs_paths))  # Remove duplicates
 
-def initialize_database():
+def initialize_database(incremental: bool = True, resume: bool = True):
     """Initialize and populate the ChromaDB database"""
-    scraper = BarclayScraper()
+    scraper = BarclayScraper(incremental=incremental, resume=resume)
     docs_paths = scraper.get_site_structure()
     return scraper.client, docs_paths
 
-if __name__ == "__main__":
-    # Initialize database and get paths UNCOMMENT THIS TO RUN AND UPDATE THE DATABASE
-    client, paths = initialize_database()
+def main(incremental: bool = True, resume: bool = True):
+    """Refresh the product database; incremental runs only re-index pages that changed"""
+    client, paths = initialize_database(incremental=incremental, resume=resume)
     print(f"Scraped and indexed {len(paths)} pages")
     print("Sample paths:", paths[:5])
+    return client, paths
+
+if __name__ == "__main__":
+    # Initialize database and get paths UNCOMMENT THIS TO RUN AND UPDATE THE DATABASE
+    # Pass --full to re-download and re-index every page, --restart to ignore an interrupted crawl
+    client, paths = main(incremental="--full" not in sys.argv, resume="--restart" not in sys.argv)
 
     # print sample content of the database
-    client = chromadb.PersistentClient(path="F:/xx/xx/fingenie/data/chromadb")
-    collection = client.get_or_create_collection(name="barclays_uk_products", 
-            embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-mpnet-base-v2")
-    )
+    collection = get_retrieval_engine().collection
     results = collection.query(
     query_texts=["tell me about retirement and travel products"], # Chroma will embed this for you
     n_results=2 # how many results to return
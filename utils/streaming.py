@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import requests
+from config import settings
+from utils.llm_cache import CachedClient, streaming_cache_key
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+ANTHROPIC_VERSION = "2023-06-01"
+
+# Receives the stream and stage events of the current session (None: nothing is streamed)
+_event_sink: contextvars.ContextVar = contextvars.ContextVar("fingenie_event_sink", default=None)
+
+
+@contextmanager
+def stream_events(sink: Callable[[Dict], None]):
+    """Send the events produced in this context (and in threads started with a copy of it) to `sink`"""
+    token = _event_sink.set(sink)
+    try:
+        yield
+    finally:
+        _event_sink.reset(token)
+
+
+def emit_event(event: Dict) -> None:
+    """Hand an event to the current sink, if any"""
+    sink = _event_sink.get()
+    if sink is not None:
+        sink(event)
+
+
+def enable_streaming(agent) -> None:
+    """Stream the agent's LLM replies as `stream_start`, `stream_delta` and `stream_end` events.
+
+    The reply function sits just before autogen's own LLM reply, so termination, human input and
+    tool handling run as before. Outside `stream_events`, or when streaming fails before the
+    first token, the agent falls back to its normal (non-streaming) reply.
+    """
+    from autogen import Agent
+
+    position = len(agent._reply_func_list)
+    for i, entry in enumerate(agent._reply_func_list):
+        if getattr(entry["reply_func"], "__name__", "") == "generate_oai_reply":
+            position = i
+            break
+    agent.register_reply([Agent, None], streaming_reply, position=position)
+
+
+def _llm_config(agent) -> Optional[Dict]:
+    llm_config = getattr(agent, "llm_config", None)
+    if not llm_config:
+        return None
+    config = dict(llm_config["config_list"][0]) if llm_config.get("config_list") else dict(llm_config)
+    for key in ("temperature", "max_tokens"):
+        if key not in config and key in llm_config:
+            config[key] = llm_config[key]
+    return config
+
+
+def to_anthropic_messages(messages: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Split out the system prompt and make user/assistant turns alternate, starting and ending
+    with the user (as autogen's Anthropic client does)"""
+    system = "\n\n".join(str(m["content"]) for m in messages if m.get("role") == "system" and m.get("content"))
+    turns: List[Dict] = []
+    for message in messages:
+        if message.get("role") == "system":
+            continue
+        role = "assistant" if message.get("role") == "assistant" else "user"
+        expected = "user" if len(turns) % 2 == 0 else "assistant"
+        if role != expected:
+            turns.append({"role": expected, "content": "Please continue."})
+        turns.append({"role": role, "content": str(message.get("content") or "")})
+    if not turns or turns[-1]["role"] == "assistant":
+        turns.append({"role": "user", "content": "Please continue."})
+    return system, turns
+
+
+def _sse_data(response: requests.Response) -> Iterator[Dict]:
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+def stream_openai(config: Dict, messages: List[Dict], timeout: float) -> Iterator[str]:
+    """Text deltas of a streamed OpenAI chat completion"""
+    body = {"model": config["model"], "messages": messages, "stream": True}
+    for key in ("temperature", "max_tokens"):
+        if key in config:
+            body[key] = config[key]
+    url = (config.get("base_url") or OPENAI_BASE_URL).rstrip("/") + "/chat/completions"
+    headers = {"Authorization": f"Bearer {config.get('api_key', '')}"}
+    with requests.post(url, json=body, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for chunk in _sse_data(response):
+            for choice in chunk.get("choices") or []:
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield text
+
+
+def stream_anthropic(config: Dict, messages: List[Dict], timeout: float) -> Iterator[str]:
+    """Text deltas of a streamed Anthropic message"""
+    system, turns = to_anthropic_messages(messages)
+    body = {
+        "model": config["model"],
+        "messages": turns,
+        "max_tokens": config.get("max_tokens", 4096),
+        "stream": True,
+    }
+    if system:
+        body["system"] = system
+    if "temperature" in config:
+        body["temperature"] = config["temperature"]
+    url = (config.get("base_url") or ANTHROPIC_BASE_URL).rstrip("/") + "/v1/messages"
+    headers = {"x-api-key": config.get("api_key", ""), "anthropic-version": ANTHROPIC_VERSION}
+    with requests.post(url, json=body, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for event in _sse_data(response):
+            if event.get("type") == "error":
+                raise RuntimeError(f"Anthropic stream error: {event.get('error')}")
+            if event.get("type") == "content_block_delta":
+                text = (event.get("delta") or {}).get("text")
+                if text:
+                    yield text
+
+
+def streaming_reply(recipient, messages: Optional[List[Dict]] = None, sender=None, config: Any = None):
+    """Reply function that streams the LLM completion to the current event sink"""
+    sink = _event_sink.get()
+    llm_config = _llm_config(recipient)
+    if sink is None or not settings.LLM_STREAMING or llm_config is None or "model" not in llm_config:
+        return False, None
+    if llm_config.get("tools") or llm_config.get("functions"):
+        return False, None
+    if messages is None:
+        messages = recipient._oai_messages[sender]
+    messages = recipient._oai_system_message + messages
+    if any(m.get("tool_calls") or m.get("tool_responses") or m.get("function_call") for m in messages):
+        return False, None
+
+    # Streamed replies share the agent's response cache (and its opt-out for creative turns)
+    client = getattr(recipient, "client", None)
+    cache = client.cache if isinstance(client, CachedClient) and client.caches(llm_config.get("temperature")) else None
+    cache_key = streaming_cache_key(llm_config, messages) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            sink({"type": "stream_start", "agent": recipient.name})
+            sink({"type": "stream_delta", "agent": recipient.name, "content": cached})
+            sink({"type": "stream_end", "agent": recipient.name})
+            return True, cached
+
+    stream = stream_anthropic if llm_config.get("api_type") == "anthropic" else stream_openai
+    parts: List[str] = []
+    started = time.monotonic()
+    try:
+        for text in stream(llm_config, messages, settings.LLM_STREAM_TIMEOUT):
+            if not parts:
+                logging.info(f"{recipient.name}: first token after {time.monotonic() - started:.2f}s")
+                sink({"type": "stream_start", "agent": recipient.name})
+            parts.append(text)
+            sink({"type": "stream_delta", "agent": recipient.name, "content": text})
+    except Exception as e:
+        if not parts:
+            logging.warning(f"Streaming failed for {recipient.name}, using the regular reply: {e}")
+            return False, None
+        sink({"type": "stream_end", "agent": recipient.name, "error": str(e)})
+        raise
+    if not parts:
+        return False, None
+    sink({"type": "stream_end", "agent": recipient.name})
+    reply = "".join(parts)
+    if cache is not None:
+        cache.set(cache_key, reply)
+    return True, reply
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+from config import settings
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def parse_domain_ttls(spec: str) -> Dict[str, float]:
+    """Parse "bankofengland.co.uk=86400,ons.gov.uk=43200" into a domain -> seconds map"""
+    ttls = {}
+    for item in spec.split(","):
+        if "=" in item:
+            domain, seconds = item.split("=", 1)
+            ttls[domain.strip().lower()] = float(seconds)
+    return ttls
+
+
+def ttl_for_url(url: str, domain_ttls: Dict[str, float], default: float) -> float:
+    """TTL of the most specific configured domain the url's host belongs to"""
+    host = urlparse(url).netloc.lower().split(":")[0]
+    best, best_len = default, -1
+    for domain, ttl in domain_ttls.items():
+        if (host == domain or host.endswith("." + domain)) and len(domain) > best_len:
+            best, best_len = ttl, len(domain)
+    return best
+
+
+class TTLCache:
+    """Disk-backed cache of JSON values with per-entry TTLs, kept in a local SQLite file.
+
+    An entry is fresh until its TTL runs out and stale for `stale_ttl` seconds after that. A stale
+    entry is still served by `get_or_fetch`, which refreshes it in the background
+    (stale-while-revalidate); older entries are misses. The least recently used entries are
+    evicted once the cache holds more than `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 2000,
+        stale_ttl: float = 7 * 86400,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT,
+                    key TEXT,
+                    value TEXT,
+                    expires_at REAL,
+                    last_access REAL,
+                    PRIMARY KEY (namespace, key)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ttl-refresh")
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self.stats = {FRESH: 0, STALE: 0, MISS: 0, "refreshed": 0, "evicted": 0}
+
+    def get(self, namespace: str, key: str) -> Tuple[Any, str]:
+        """Return `(value, state)` where state is fresh, stale or miss"""
+        now = self.clock()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None or now > row[1] + self.stale_ttl:
+                return None, MISS
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+        return json.loads(row[0]), FRESH if now <= row[1] else STALE
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        now = self.clock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl, now),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats["evicted"] += overflow
+
+    def get_or_fetch(self, namespace: str, key: str, fetch: Callable[[], Any], ttl: float) -> Any:
+        """Serve from the cache, fetching on a miss and refreshing stale entries in the background.
+
+        Empty results (failed searches or downloads) are returned but not cached.
+        """
+        value, state = self.get(namespace, key)
+        self.stats[state] += 1
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self._refresh(namespace, key, fetch, ttl)
+            return value
+        value = fetch()
+        if value:
+            self.put(namespace, key, value, ttl)
+        return value
+
+    def _refresh(self, namespace: str, key: str, fetch: Callable[[], Any], ttl: float) -> None:
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return
+            self._refreshing.add((namespace, key))
+
+        def refresh():
+            try:
+                value = fetch()
+                if value:
+                    self.put(namespace, key, value, ttl)
+                    self.stats["refreshed"] += 1
+            except Exception as e:
+                logging.warning(f"Background refresh of {namespace} {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard((namespace, key))
+
+        self._refresher.submit(refresh)
+
+    def close(self) -> None:
+        self._refresher.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+_web_cache: Optional[TTLCache] = None
+_web_cache_lock = threading.Lock()
+
+
+def get_web_cache() -> Optional[TTLCache]:
+    """The process-wide cache for web search results and pages, or None when it is disabled.
+
+    It is also off while the HTTP archive records or replays, so benchmarks measure the network path.
+    """
+    global _web_cache
+    if not settings.WEB_CACHE_ENABLED or settings.HTTP_ARCHIVE_MODE:
+        return None
+    with _web_cache_lock:
+        if _web_cache is None:
+            _web_cache = TTLCache(
+                settings.WEB_CACHE_PATH,
+                max_entries=settings.WEB_CACHE_MAX_ENTRIES,
+                stale_ttl=settings.WEB_CACHE_STALE_TTL,
+            )
+        return _web_cache
@@ -8,13 +8,18 @@ import asyncio
 import json
 import logging
 import threading
-from queue import Queue, Empty
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.customer_chatbot import create_customer_chatbot, create_human_proxy
-from agents.financial_advisor import run_conversation_financial_advisor
-from agents.boss_manager import create_boss_human_loop
-from orchestrator_direct import run_conversation_boss_manager
+from agents.registry import agent_registry
+from agents.advisory_pipeline import run_advisory_pipeline
+from agents.macro_snapshot import get_macro_snapshot_service
+from utils.retrieval_engine import get_retrieval_engine
+from utils.llm_cache import get_llm_cache
+from utils.message_events import MessageEventBus, attach_message_tap, log_message_event, message_content
+from utils.pipeline import PipelineCancelled
+from utils.streaming import stream_events
+from webapp.sessions import SessionClosed, SessionLimitError, SessionManager, run_bridge
+from config import settings
 
 # Create required directories if they don't exist
 os.makedirs("webapp/static", exist_ok=True)
@@ -32,180 +37,238 @@ templates = Jinja2Templates(directory="webapp/templates")
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Global variables for message handling
-message_queue = Queue()
-response_queue = Queue()
+# Every websocket gets its own session (channels and worker thread); sessions beyond the limit wait
+session_manager = SessionManager(
+    max_sessions=settings.WEBAPP_MAX_SESSIONS,
+    max_queued=settings.WEBAPP_MAX_QUEUED_SESSIONS,
+    queue_timeout=settings.WEBAPP_SESSION_QUEUE_TIMEOUT,
+)
+
+# Agents whose replies are streamed, by the agent keys the page styles
+STREAMING_AGENTS = {
+    "FinGenie_Customer_Bot": "customer_chatbot",
+    "Relationship_Manager": "relationship_manager",
+    "FinGenie_Financial_Advisor_Bot": "financial_advisor",
+}
+# Status shown to the customer when an advisory pipeline stage starts
+STAGE_LABELS = {
+    "product_query": "Relationship Manager is reviewing your needs...",
+    "retrieval": "Searching for suitable products...",
+    "rm_recommendation": "Relationship Manager is preparing recommendations...",
+    "macro_analysis": "Reviewing current economic conditions...",
+    "advice": "Financial Advisor is assessing the recommendations...",
+    "boss_review": "Finalising your recommendations...",
+}
+
+@app.on_event("startup")
+async def warm_up_retrieval():
+    # Load the embedding model and open the product collection before the first customer arrives
+    if not settings.WARM_UP_RETRIEVAL:
+        return
+
+    def warm_up():
+        try:
+            get_retrieval_engine().warm_up()
+        except Exception as e:
+            logging.warning(f"Retrieval warm-up failed: {str(e)}")
+
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
+@app.on_event("startup")
+async def build_agent_templates():
+    # Sessions only clone these, so the first customer does not pay for building the agents
+    def build():
+        for name in ("customer_chatbot", "human_proxy", "relationship_manager", "rm_junior_analyst", "financial_advisor"):
+            try:
+                agent_registry.template(name)
+            except Exception as e:
+                logging.warning(f"Building the {name} agent failed: {str(e)}")
+
+    asyncio.get_running_loop().run_in_executor(None, build)
+
+@app.on_event("startup")
+async def start_macro_snapshots():
+    # Keep the shared macro-economic analysis fresh so advisor sessions never wait for it
+    if settings.MACRO_SNAPSHOT_REFRESHER:
+        get_macro_snapshot_service().start()
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/sessions")
+async def session_stats():
+    return session_manager.stats()
+
+@app.get("/llm-cache")
+async def llm_cache_stats():
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
 @app.websocket("/ws/chat")
 async def chat_ws(websocket: WebSocket):
     await websocket.accept()
+
+    async def notify_queued(position):
+        await websocket.send_text(json.dumps({
+            "type": "status",
+            "content": f"All our advisors are busy at the moment. You are number {position} in the queue, please wait..."
+        }))
+
     try:
-        # Create agents
-        customer_chatbot = create_customer_chatbot()
-        human_proxy = create_human_proxy()
-        
-        # Send initial welcome message
-        welcome_msg = "Hello, I'm here to help you with your financial goals and recommend you products that may suit you best."
+        session = await session_manager.open(on_queued=notify_queued)
+    except SessionLimitError as e:
+        logging.warning(f"Rejected chat session: {str(e)}")
         await websocket.send_text(json.dumps({
-            "type": "bot",
-            "agent": "customer_chatbot",
-            "content": welcome_msg
+            "type": "error",
+            "content": "FinGenie is at capacity right now. Please try again in a few minutes."
         }))
+        await websocket.close(code=1013)
+        return
+    except WebSocketDisconnect:
+        return
 
-        def get_human_input(prompt):
-            # Debug: Log the incoming prompt
-            logging.info(f"Raw prompt received: {prompt}")
-            
-            # Split the prompt into sections by the separator
-            sections = prompt.split("--------------------------------------------------------------------------------")
-            bot_message = None
-            
-            # Process each section to find the most recent bot message
-            for section in reversed(sections):  # Process sections in reverse to get the most recent message
-                if not section.strip():
-                    continue
-                
-                lines = section.strip().split('\n')
-                for i, line in enumerate(lines):
-                    if "FinGenie_Customer_Bot (to human_proxy):" in line:
-                        # Get the next non-empty line as the message
-                        for j in range(i + 1, len(lines)):
-                            potential_message = lines[j].strip()
-                            if potential_message and not potential_message.startswith("Replying as") and not potential_message.startswith(">>>>>>>> USING AUTO REPLY"):
-                                bot_message = potential_message
-                                break
-                        if bot_message:  # If we found a message, break out of the outer loop
-                            break
-                if bot_message:  # If we found a message, break out of the sections loop
-                    break
-            
-            # Debug: Log the extracted bot message
-            logging.info(f"Extracted bot message: {bot_message}")
-            
-            # If we found a message and it's not empty
-            if bot_message:
-                logging.info(f"Sending bot message to queue: {bot_message}")
-                message_queue.put({
-                    "type": "bot",
-                    "agent": "customer_chatbot",
-                    "content": bot_message
-                })
+    try:
+        # Reset clones of the process-wide agents: each session has its own conversation state
+        customer_chatbot = agent_registry.get("customer_chatbot")
+        human_proxy = agent_registry.get("human_proxy")
+        
+        # The welcome message reaches the page through the message tap when the chat starts
+        welcome_msg = "Hello, I'm here to help you with your financial goals and recommend you products that may suit you best."
+
+        # Set once a reply has been streamed, so it is not sent again as a whole message
+        reply_streamed = threading.Event()
+
+        def forward_event(event):
+            # Streamed tokens and stage progress from the agents, called from their threads
+            if event["type"] == "stage":
+                if event["status"] == "finished" or event["stage"] not in STAGE_LABELS:
+                    return
+                event = dict(event, content=STAGE_LABELS[event["stage"]])
             else:
-                logging.warning("No valid bot message found in the conversation")
-            
-            # Then send the input prompt
-            message_queue.put({
+                event = dict(event, agent=STREAMING_AGENTS.get(event["agent"], event["agent"]))
+                if event["type"] == "stream_end" and event["agent"] == "customer_chatbot":
+                    reply_streamed.set()
+            session.send(event)
+
+        def forward_message(event):
+            # The customer chatbot's messages, each delivered once as it is sent
+            if event.sender != customer_chatbot.name or event.recipient != human_proxy.name:
+                return
+            if reply_streamed.is_set():
+                # The customer has already seen this reply token by token
+                reply_streamed.clear()
+                return
+            session.send({
+                "type": "bot",
+                "agent": "customer_chatbot",
+                "content": event.content
+            })
+
+        # Messages are published by the agents as they send them, no transcript parsing needed
+        messages = MessageEventBus()
+        messages.subscribe(forward_message)
+        messages.subscribe(log_message_event)
+        attach_message_tap([customer_chatbot, human_proxy], messages)
+
+        def get_human_input(prompt):
+            session.send({
                 "type": "input_prompt",
                 "content": "Please provide your response:"
             })
-            
+
             # Wait for and return the response
-            return response_queue.get()
+            return session.receive()
 
         # Override get_human_input with our version
         human_proxy.get_human_input = get_human_input
         
-        # Create a thread for running the chat
+        # Create a thread for running the chat and then the advisory steps. Everything it sends,
+        # including the pipeline's streamed replies and stage progress, is delivered by the bridge
+        # while it runs; the final ("DONE", outputs) message comes last.
         def run_chat():
             try:
-                result = customer_chatbot.initiate_chat(
-                    human_proxy,
-                    message=welcome_msg,
-                    summary_prompt="Summarize the details of the customer's profile including information about their income, savings, and goals. Do not add any introductory phrases.",
-                    summary_method="reflection_with_llm"
-                )
-                message_queue.put(("DONE", result))
+                with stream_events(forward_event):
+                    result = customer_chatbot.initiate_chat(
+                        human_proxy,
+                        message=welcome_msg,
+                        summary_prompt="Summarize the details of the customer's profile including information about their income, savings, and goals. Do not add any introductory phrases.",
+                        summary_method="reflection_with_llm"
+                    )
+                    # With reflection_with_llm the summary is a message dict; the pipeline takes its text
+                    customer_profile = message_content(result.summary)
+                    if session.closed.is_set():
+                        raise SessionClosed(f"Session {session.id} was closed")
+
+                    # Step 2: Relationship manager, macro analysis and financial advisor on the
+                    # collected profile, without any further conversation rounds or console prompts.
+                    # No new stage is started once the customer has left.
+                    session.send({
+                        "type": "status",
+                        "content": "Analyzing profile with Financial Advisor..."
+                    })
+                    outputs = run_advisory_pipeline(customer_profile, cancelled=session.closed.is_set)
+                session.send(("DONE", outputs))
+            except (SessionClosed, PipelineCancelled):
+                logging.info(f"Chat session {session.id} closed before the advice was ready")
             except Exception as e:
                 logging.error(f"Error in chat thread: {str(e)}")
-                message_queue.put(("ERROR", str(e)))
+                session.send(("ERROR", str(e)))
 
-        chat_thread = threading.Thread(target=run_chat)
-        chat_thread.start()
+        session.start(run_chat)
 
-        # Main event loop for handling WebSocket messages
-        while True:
-            try:
-                # Check for prompts from the chat thread
-                try:
-                    message = message_queue.get_nowait()
-                    if isinstance(message, tuple):
-                        status, content = message
-                        if status == "ERROR":
-                            await websocket.send_text(json.dumps({
-                                "type": "error",
-                                "content": f"Error in chat process: {content}"
-                            }))
-                            break
-                        elif status == "DONE":
-                            customer_profile = content.summary if hasattr(content, 'summary') else str(content)
-                            
-                            # Step 2: Financial Advisor Analysis
-                            await websocket.send_text(json.dumps({
-                                "type": "status",
-                                "content": "Analyzing profile with Financial Advisor..."
-                            }))
-                            
-                            advisor_result = await asyncio.to_thread(run_conversation_financial_advisor)
-                            
-                            # Step 3: Boss Manager Review
-                            await websocket.send_text(json.dumps({
-                                "type": "status",
-                                "content": "Getting final approval from Boss Manager..."
-                            }))
-                            
-                            final_result = await asyncio.to_thread(run_conversation_boss_manager, advisor_result)
-                            
-                            # Send final results
-                            await websocket.send_text(json.dumps({
-                                "type": "bot",
-                                "agent": "system",
-                                "content": "Based on our analysis, here are the final recommendations:"
-                            }))
-                            
-                            await websocket.send_text(json.dumps({
-                                "type": "bot",
-                                "agent": "financial_advisor",
-                                "content": f"Financial Analysis:\n{advisor_result}"
-                            }))
-                            
-                            await websocket.send_text(json.dumps({
-                                "type": "bot",
-                                "agent": "boss_manager",
-                                "content": f"Final Approved Recommendations:\n{final_result.summary if hasattr(final_result, 'summary') else str(final_result)}"
-                            }))
-                            break
-                    else:
-                        # It's either a bot message or input prompt
-                        # Debug: Log the message being sent
-                        logging.info(f"Sending message to websocket: {message}")
-                        await websocket.send_text(json.dumps(message))
-                        # Add a small delay to ensure messages are processed in order
-                        await asyncio.sleep(0.1)
-                except Empty:
-                    pass
-
-                # Check for user messages
-                try:
-                    user_message = await asyncio.wait_for(websocket.receive_text(), timeout=0.1)
-                    logging.info(f"Received message: {user_message}")
-                    response_queue.put(user_message)
-                except asyncio.TimeoutError:
-                    pass
-
-            except WebSocketDisconnect:
-                logging.info("WebSocket disconnected")
-                break
-            except Exception as e:
-                logging.error(f"Error in WebSocket loop: {str(e)}")
+        async def deliver(message):
+            # Forward the worker's messages until it posts the advisory results
+            if not isinstance(message, tuple):
+                # It's a bot message, input prompt, status or streaming/stage event
+                if message.get("type") != "stream_delta":
+                    logging.info(f"Sending message to websocket: {message}")
+                await websocket.send_text(json.dumps(message))
+                return True
+
+            status, content = message
+            if status == "ERROR":
                 await websocket.send_text(json.dumps({
                     "type": "error",
-                    "content": f"Error occurred: {str(e)}"
+                    "content": f"Error in chat process: {content}"
+                }))
+                return False
+
+            outputs = content
+            advisor_result = outputs["advice"]
+            # Only present when a reviewer approved (or corrected) the advice
+            final_result = outputs.get("boss_review")
+
+            # Send final results
+            await websocket.send_text(json.dumps({
+                "type": "bot",
+                "agent": "system",
+                "content": "Based on our analysis, here are the final recommendations:"
+                if final_result is not None else "Based on our analysis, here are our recommendations:"
+            }))
+
+            await websocket.send_text(json.dumps({
+                "type": "bot",
+                "agent": "financial_advisor",
+                "content": f"Financial Analysis:\n{advisor_result}"
+            }))
+
+            if final_result is not None and final_result != advisor_result:
+                await websocket.send_text(json.dumps({
+                    "type": "bot",
+                    "agent": "boss_manager",
+                    "content": f"Final Approved Recommendations:\n{final_result}"
                 }))
-                break
+            return False
+
+        async def receive():
+            user_message = await websocket.receive_text()
+            logging.info(f"Received message: {user_message}")
+            return user_message
+
+        # Messages go out as soon as the worker produces them while answers are received
+        # concurrently; an idle session just waits on both
+        await run_bridge(session, deliver, receive)
 
     except WebSocketDisconnect:
         logging.info("WebSocket disconnected")
@@ -218,6 +281,9 @@ async def chat_ws(websocket: WebSocket):
             }))
         except:
             pass
+    finally:
+        # Ends the session's worker if it still waits for input, and frees the slot once it has stopped
+        await session_manager.close(session)
 
 if __name__ == "__main__":
     import uvicorn
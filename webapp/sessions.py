@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from queue import Queue
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SessionClosed(Exception):
+    """Raised in a session's worker when it waits for input after the session was closed"""
+
+
+class SessionLimitError(Exception):
+    """No session slot is free and the waiting queue is full (or the wait timed out)"""
+
+
+_CLOSED = object()
+
+
+class ChatSession:
+    """One websocket conversation with its own channels and worker thread.
+
+    The worker hands messages for the browser to `send`, which puts them on the event loop's
+    `outgoing` queue, and waits for the customer's answers with `receive`, which raises
+    `SessionClosed` once the websocket is gone so the worker ends. Long-running work in the
+    worker should check `closed` and stop early; `wait_finished` waits for the worker to exit.
+    """
+
+    def __init__(self, session_id: str, loop: asyncio.AbstractEventLoop):
+        self.id = session_id
+        self.created_at = time.time()
+        self.loop = loop
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+        self.incoming: Queue = Queue()
+        self.closed = threading.Event()
+        self.worker: Optional[threading.Thread] = None
+        self._finished = asyncio.Event()
+
+    def send(self, message: Any) -> None:
+        """Queue a message for the browser; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self.outgoing.put_nowait, message)
+        except RuntimeError:
+            # The event loop is gone, so is the websocket
+            pass
+
+    def receive(self) -> str:
+        answer = self.incoming.get()
+        if answer is _CLOSED:
+            raise SessionClosed(f"Session {self.id} was closed")
+        return answer
+
+    def start(self, target: Callable[..., Any], *args) -> None:
+        def run():
+            try:
+                target(*args)
+            finally:
+                try:
+                    self.loop.call_soon_threadsafe(self._finished.set)
+                except RuntimeError:
+                    pass
+
+        self.worker = threading.Thread(target=run, name=f"chat-session-{self.id}", daemon=True)
+        self.worker.start()
+
+    async def wait_finished(self) -> None:
+        """Wait until the worker has exited (returns at once for a session that never started one)"""
+        if self.worker is not None:
+            await self._finished.wait()
+
+    def close(self) -> None:
+        if not self.closed.is_set():
+            self.closed.set()
+            # Wake a worker blocked on input
+            self.incoming.put(_CLOSED)
+
+
+class SessionManager:
+    """Admits websocket sessions up to `max_sessions` at a time.
+
+    Further connections wait in FIFO order, at most `max_queued` of them and for up to
+    `queue_timeout` seconds; beyond that `open` raises `SessionLimitError`. A session keeps its
+    slot until its worker has exited, not just until its websocket is gone, so the limit caps
+    the work actually running. Use from the event loop only.
+    """
+
+    def __init__(self, max_sessions: int = 8, max_queued: int = 16, queue_timeout: Optional[float] = 120):
+        self.max_sessions = max_sessions
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active: Dict[str, ChatSession] = {}
+        self.queued = 0
+        self.counters = {"opened": 0, "rejected": 0, "timed_out": 0}
+        self._ids = itertools.count(1)
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _has_slot(self) -> bool:
+        return len(self.active) < self.max_sessions
+
+    async def open(self, on_queued: Optional[Callable[[int], Any]] = None) -> ChatSession:
+        """Start a session, waiting for a free slot if needed.
+
+        `on_queued(position)` is awaited once if the connection has to wait.
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        if self._has_slot() and not self.queued:
+            return self._start()
+        if self.queued >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise SessionLimitError(f"{len(self.active)} sessions active and {self.queued} waiting")
+        self.queued += 1
+        try:
+            if on_queued is not None:
+                await on_queued(self.queued)
+            async with self._condition:
+                await asyncio.wait_for(self._condition.wait_for(self._has_slot), self.queue_timeout)
+                return self._start()
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise SessionLimitError(f"No session slot became free within {self.queue_timeout}s")
+        finally:
+            self.queued -= 1
+
+    def _start(self) -> ChatSession:
+        session = ChatSession(str(next(self._ids)), asyncio.get_running_loop())
+        self.active[session.id] = session
+        self.counters["opened"] += 1
+        logging.info(f"Opened chat session {session.id} ({len(self.active)} active, {self.queued} queued)")
+        return session
+
+    async def close(self, session: ChatSession) -> None:
+        """Close the session and free its slot once its worker has finished"""
+        session.close()
+        if session.worker is not None and session.worker.is_alive():
+            logging.info(f"Chat session {session.id} closed, waiting for its worker to stop")
+        await session.wait_finished()
+        async with self._condition:
+            if self.active.pop(session.id, None) is not None:
+                self._condition.notify_all()
+        logging.info(f"Closed chat session {session.id} ({len(self.active)} active, {self.queued} queued)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self.active),
+            "queued": self.queued,
+            "max_sessions": self.max_sessions,
+            "max_queued": self.max_queued,
+            **self.counters,
+        }
+
+
+async def run_bridge(
+    session: ChatSession,
+    send: Callable[[Any], Awaitable[Optional[bool]]],
+    receive: Callable[[], Awaitable[str]],
+) -> None:
+    """Pass messages between a session's worker and its websocket until either side is done.
+
+    Outgoing messages are handed to `send` as soon as the worker produces them, while `receive`
+    is awaited concurrently for the customer's answers, so an idle session just waits on both.
+    The bridge ends when `send` returns False or `receive` raises (e.g. on disconnect); errors
+    are re-raised. Nothing is delivered while `send` runs, so long work (such as the advisory
+    pipeline) belongs in the worker, which posts its result as its last message.
+    """
+
+    async def deliver():
+        while True:
+            message = await session.outgoing.get()
+            if await send(message) is False:
+                return
+
+    async def collect():
+        while True:
+            session.incoming.put(await receive())
+
+    tasks = [asyncio.ensure_future(deliver()), asyncio.ensure_future(collect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        task.result()